@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+IVF index (LOCAL_INDEX_ANN=ivf): recall@k vs. latency across nprobe.
+
+Usage (from backend/):
+  python -m benchmarks.bench_ann --n 1000000 --dim 256 --nprobe 1,4,8,16,32,64
+  python -m benchmarks.bench_ann --n 1000000 --nlist 2000 --append 0.1
+
+Vectors are clustered synthetic rows held in memory (n * dim * 4 bytes),
+queries perturbed copies of stored rows. Ground truth is exact search over
+the same matrix. With --append, the index is trained on the first part of
+the corpus and the rest is added without retraining, as after an
+incremental ingest.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_quantized import clustered
+from benchmarks.bench_vectordb import report
+from persian_linux_rag.app.adapters.ann_index import IVFIndex
+from persian_linux_rag.app.adapters.local_index import LocalIndex
+from persian_linux_rag.app.core.config import settings
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep IVF nprobe: recall against latency.")
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--k", type=int, default=settings.RETRIEVE_K)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--nlist", type=int, default=0, help="0 = 4 * sqrt(n)")
+    ap.add_argument("--nprobe", default="1,4,8,16,32,64")
+    ap.add_argument("--sample", type=int, default=settings.IVF_TRAIN_SAMPLE)
+    ap.add_argument("--append", type=float, default=0.0, help="Share of rows added after training")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    vectors = clustered(args.n, args.dim, rng, clusters=1024)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    print(f"data:   {time.perf_counter() - t0:.1f}s  ({vectors.nbytes / 2**20:.0f} MiB)")
+
+    trained = int(args.n * (1 - args.append))
+    t0 = time.perf_counter()
+    ivf = IVFIndex.build(vectors[:trained], nlist=args.nlist, sample=args.sample)
+    print(f"build:  {time.perf_counter() - t0:.1f}s  nlist={ivf.nlist} trained_on={trained}")
+    if trained < args.n:
+        t0 = time.perf_counter()
+        ivf.add(vectors[trained:])
+        print(f"append: {time.perf_counter() - t0:.1f}s  rows={args.n - trained}")
+
+    ids = [str(i) for i in range(args.n)]
+    exact = LocalIndex(ids, ids, [{}] * args.n, vectors)
+    index = LocalIndex(ids, ids, exact.metadatas, vectors, ann=ivf)
+    rows = rng.integers(0, args.n, args.queries)
+    queries = vectors[rows] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    truth, ms = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        idx, _ = exact.top_k(q, args.k)
+        ms.append((time.perf_counter() - t0) * 1000.0)
+        truth.append(set(idx.tolist()))
+    report("exact", ms)
+
+    for nprobe in (int(p) for p in args.nprobe.split(",")):
+        index.nprobe = nprobe
+        hits, ms = 0, []
+        for q, gt in zip(queries, truth):
+            t0 = time.perf_counter()
+            idx, _ = index.top_k(q, args.k)
+            ms.append((time.perf_counter() - t0) * 1000.0)
+            hits += len(gt & set(idx.tolist()))
+        print(f"nprobe={nprobe:<4} recall@{args.k}={hits / (args.k * len(queries)):.4f}  "
+              f"rows scanned ~{args.n * nprobe / ivf.nlist:,.0f}")
+        report("ivf", ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-request setup cost: rebuilding chain/LLM/embedder vs. the process registry.
+
+Usage:
+  python -m benchmarks.bench_components --iterations 50   (from backend/)
+
+No network calls are made; only object construction is timed.
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("COHERE_API_KEY", "bench-dummy-key")
+
+from langchain_cohere import ChatCohere  # noqa: E402
+from persian_linux_rag.app.core.config import settings  # noqa: E402
+from persian_linux_rag.app.core.deps import get_components, init_components  # noqa: E402
+from persian_linux_rag.app.adapters.embeddings_lc import get_query_embedder  # noqa: E402
+from persian_linux_rag.app.graphs.query_chain import build_chain  # noqa: E402
+
+
+def setup_per_request():
+    # What every /ask + /ask/stream request did before the registry existed.
+    build_chain()
+    get_query_embedder()
+    ChatCohere(
+        model=settings.COHERE_CHAT_MODEL,
+        temperature=0.2,
+        streaming=True,
+        cohere_api_key=settings.COHERE_API_KEY,
+    )
+
+
+def setup_registry():
+    comps = get_components()
+    comps.chain
+    comps.embedder
+    comps.stream_llm
+
+
+def timed(fn, iterations: int) -> list[float]:
+    out = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<14} mean={statistics.fmean(samples):9.3f} ms  "
+        f"p50={statistics.median(samples):9.3f} ms  p99={p99:9.3f} ms"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark per-request component setup.")
+    ap.add_argument("--iterations", type=int, default=50)
+    args = ap.parse_args()
+
+    settings.COHERE_API_KEY = settings.COHERE_API_KEY or os.environ["COHERE_API_KEY"]
+    init_components()
+    setup_registry()  # the lifespan hook pays this once at startup
+
+    report("per-request", timed(setup_per_request, args.iterations))
+    report("registry", timed(setup_registry, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Normalize + split throughput (pages/s) at 1, 4 and N worker processes.
+
+Usage (from backend/):
+  python -m benchmarks.bench_ingest_split --pages 4000
+  python -m benchmarks.bench_ingest_split --pdf ../data/justforfun_persian.pdf --repeat 20
+
+Synthetic pages mimic extracted PDF text: Persian prose with Arabic letter
+variants, diacritics, soft line breaks and ZWNJ compounds. Timings include
+process-pool start-up (each spawned worker imports LangChain once), so use
+enough pages for that to amortize.
+"""
+import argparse
+import os
+import random
+import time
+
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.ingest.pipeline import split_groups
+
+WORDS = (
+    "لينوكس سیستم\u200cعامل آزاد است كه توسط لینوس توروالدز نوشته شد و "
+    "نرم\u200cافزار آزاد به کاربران آزادی می\u200cدهد. فایل\u200cها را با chmod و "
+    "chown مدیریت کنید؛ systemd-resolved نام\u200cها را ترجمه می\u200cکند؟ "
+    "ك\u064eتاب «جاست فور فان» ، داستان هسته است"
+).split()
+
+
+def synthetic_pages(n: int, seed: int = 0) -> list[Document]:
+    rng = random.Random(seed)
+    pages = []
+    for i in range(n):
+        lines = [" ".join(rng.choices(WORDS, k=rng.randint(8, 16))) for _ in range(60)]
+        pages.append(Document(page_content="\n".join(lines), metadata={"source": f"doc{i // 20}", "page": i % 20}))
+    return pages
+
+
+def pdf_pages(path: str, repeat: int) -> list[Document]:
+    from langchain_community.document_loaders import PyPDFium2Loader
+
+    pages = list(PyPDFium2Loader(path).lazy_load())
+    return [
+        Document(page_content=p.page_content, metadata={**p.metadata, "source": f"{path}#{r}"})
+        for r in range(repeat)
+        for p in pages
+    ]
+
+
+def groups_of(pages: list[Document]):
+    by_source: dict[str, list[Document]] = {}
+    for p in pages:
+        by_source.setdefault(p.metadata["source"], []).append(p)
+    return list(by_source.items())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark parallel normalization and splitting.")
+    ap.add_argument("--pages", type=int, default=4000)
+    ap.add_argument("--pdf", default=None, help="Use pages from this PDF instead of synthetic text")
+    ap.add_argument("--repeat", type=int, default=10, help="Copies of --pdf to process")
+    ap.add_argument("--workers", type=int, nargs="*", default=None, help="Default: 1 4 N")
+    args = ap.parse_args()
+
+    pages = pdf_pages(args.pdf, args.repeat) if args.pdf else synthetic_pages(args.pages)
+    groups = groups_of(pages)
+    n_cpu = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 4, n_cpu})
+    print(f"{len(pages)} pages in {len(groups)} sources, {n_cpu} CPUs")
+
+    baseline = None
+    for w in workers:
+        t0 = time.perf_counter()
+        chunks = sum(len(c) for _, c in split_groups(groups, workers=w))
+        dt = time.perf_counter() - t0
+        rate = len(pages) / dt
+        baseline = baseline or rate
+        print(f"workers={w:<3d} {rate:8.0f} pages/s  {chunks} chunks  {dt:6.2f}s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
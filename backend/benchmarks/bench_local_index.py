@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+RETRIEVER_IMPL=local vs. Chroma: recall@k against exact search, and latency.
+
+Usage (from backend/):
+  python -m benchmarks.bench_local_index --n 100000 --dim 1024 --queries 200
+
+Queries are perturbed copies of stored vectors, so neighbourhoods are
+realistic rather than uniformly random.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vectordb import build_collection, report
+from persian_linux_rag.app.adapters.local_index import export_collection, LocalIndex
+from persian_linux_rag.app.core.config import settings
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the local NumPy index against Chroma.")
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--k", type=int, default=settings.RETRIEVE_K)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--path", default=None, help="Reuse/persist the synthetic store here")
+    args = ap.parse_args()
+
+    path = args.path or tempfile.mkdtemp(prefix="bench_chroma_")
+    client = build_collection(path, args.n, args.dim)
+    col = client.get_collection(settings.CHROMA_COLLECTION)
+
+    export_dir = os.path.join(path, "local_index")
+    t0 = time.perf_counter()
+    export_collection(col, export_dir)
+    print(f"export: {time.perf_counter() - t0:.1f}s")
+    t0 = time.perf_counter()
+    index = LocalIndex.load(export_dir)
+    print(f"load:   {(time.perf_counter() - t0) * 1000:.1f} ms  ({index.vectors.nbytes / 2**20:.0f} MiB mapped)")
+
+    rng = np.random.default_rng(2)
+    rows = rng.integers(0, len(index), args.queries)
+    queries = np.asarray(index.vectors[rows]) + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    exact = np.asarray(index.vectors, dtype=np.float64)
+
+    truth = []
+    for q in queries:
+        sims = exact @ (q / np.linalg.norm(q))
+        truth.append({index.ids[i] for i in np.argsort(-sims)[: args.k]})
+
+    chroma_ms, local_ms, chroma_hits, local_hits = [], [], 0, 0
+    for q, gt in zip(queries, truth):
+        t0 = time.perf_counter()
+        out = col.query(query_embeddings=[q.tolist()], n_results=args.k, include=["documents", "metadatas"])
+        chroma_ms.append((time.perf_counter() - t0) * 1000.0)
+        chroma_hits += len(gt & set(out["ids"][0]))
+
+        t0 = time.perf_counter()
+        docs = index.search(q, args.k)
+        local_ms.append((time.perf_counter() - t0) * 1000.0)
+        local_hits += len(gt & {d.metadata["id"] for d in docs})
+
+    total = args.k * args.queries
+    report("chroma", chroma_ms)
+    report("local", local_ms)
+    print(f"recall@{args.k}: chroma={chroma_hits / total:.4f} local={local_hits / total:.4f}")
+
+
+if __name__ == "__main__":
+    main()
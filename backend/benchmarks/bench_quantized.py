@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Quantized local index: recall@k vs. memory vs. latency.
+
+Usage (from backend/):
+  python -m benchmarks.bench_quantized --n 200000 --dim 1024 --queries 200
+  python -m benchmarks.bench_quantized --n 200000 --rescore 60,120,240
+
+Exports one synthetic clustered corpus in each LOCAL_INDEX_QUANTIZATION
+mode (no Chroma needed) and compares every mode and rescoring pool size
+against exact float32 search. "scan MiB" is what a query reads in full and
+so what must stay in the page cache; rescoring touches only the candidate
+rows of the float32 matrix.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vectordb import report
+from persian_linux_rag.app.adapters.local_index import LocalIndex, export_collection
+from persian_linux_rag.app.core.config import settings
+
+
+class ArrayCollection:
+    """Just enough of a Chroma collection for ``export_collection``."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def count(self):
+        return len(self.vectors)
+
+    def get(self, offset=0, limit=1, include=()):
+        rows = range(offset, min(len(self.vectors), offset + limit))
+        return {
+            "ids": [f"c{i}" for i in rows],
+            "embeddings": self.vectors[offset : offset + limit],
+            "documents": [""] * len(rows),
+            "metadatas": [{}] * len(rows),
+        }
+
+
+def clustered(n: int, dim: int, rng, clusters: int = 256) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 50_000):
+        m = min(50_000, n - start)
+        out[start : start + m] = centers[rng.integers(0, clusters, m)] + 0.6 * rng.standard_normal(
+            (m, dim), dtype=np.float32
+        )
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark int8 / binary quantization of the local index.")
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--k", type=int, default=settings.RETRIEVE_K)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--rescore", default="60,120,240", help="Float32 rescoring pool sizes to sweep")
+    ap.add_argument("--path", default=None)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered(args.n, args.dim, rng)
+    root = args.path or tempfile.mkdtemp(prefix="bench_quantized_")
+    indexes = {}
+    for mode in ("none", "int8", "binary"):
+        path = os.path.join(root, mode)
+        t0 = time.perf_counter()
+        export_collection(ArrayCollection(vectors), path, page_size=10_000, quantization=mode)
+        indexes[mode] = path
+        print(f"export {mode:<6} {time.perf_counter() - t0:6.1f}s")
+    del vectors
+
+    exact = LocalIndex.load(indexes["none"])
+    rows = rng.integers(0, len(exact), args.queries)
+    queries = np.asarray(exact.vectors[rows]) + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    truth, exact_ms = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        idx, _ = exact.top_k(q, args.k)
+        exact_ms.append((time.perf_counter() - t0) * 1000.0)
+        truth.append(set(idx.tolist()))
+    print(f"\nexact   scan={exact.scan_bytes / 2**20:8.1f} MiB  ({exact.scan_bytes / len(exact):.0f} B/vector)")
+    report("exact", exact_ms)
+
+    for mode in ("int8", "binary"):
+        for rescore_k in (int(r) for r in args.rescore.split(",")):
+            index = LocalIndex.load(indexes[mode], rescore_k=rescore_k)
+            hits, ms = 0, []
+            for q, gt in zip(queries, truth):
+                t0 = time.perf_counter()
+                idx, _ = index.top_k(q, args.k)
+                ms.append((time.perf_counter() - t0) * 1000.0)
+                hits += len(gt & set(idx.tolist()))
+            print(
+                f"\n{mode:<6} rescore={rescore_k:<4} recall@{args.k}={hits / (args.k * len(queries)):.4f}  "
+                f"scan={index.scan_bytes / 2**20:8.1f} MiB  ({index.scan_bytes / len(index):.0f} B/vector)"
+            )
+            report(mode, ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+retrieve_by_embedding latency: legacy 4-call path vs. cached handle + single query().
+
+Usage (from backend/):
+  python -m benchmarks.bench_vectordb --n 100000 --dim 1024 --queries 200
+
+Builds a synthetic persistent Chroma collection in a temp dir (or --path).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from persian_linux_rag.app.core import deps
+from persian_linux_rag.app.core.config import settings
+from persian_linux_rag.app.adapters import vectordb
+
+
+def build_collection(path: str, n: int, dim: int, batch: int = 5000):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+    try:
+        col = client.get_collection(settings.CHROMA_COLLECTION)
+        if col.count() >= n:
+            return client
+        client.delete_collection(settings.CHROMA_COLLECTION)
+    except Exception:
+        pass
+    col = client.create_collection(settings.CHROMA_COLLECTION)
+    rng = np.random.default_rng(0)
+    for start in range(0, n, batch):
+        m = min(batch, n - start)
+        vecs = rng.standard_normal((m, dim), dtype=np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)  # unit-norm, like Cohere v3
+        col.add(
+            ids=[f"c{start + i}" for i in range(m)],
+            embeddings=vecs.tolist(),
+            documents=[f"synthetic chunk {start + i}" for i in range(m)],
+            metadatas=[{"source": "synthetic"} for _ in range(m)],
+        )
+    return client
+
+
+def legacy_retrieve(client, q: list[float], k: int):
+    # The pre-cache path: list + get + count + query on every request.
+    [c.name for c in client.list_collections()]
+    col = client.get_collection(settings.CHROMA_COLLECTION)
+    if col.count() == 0:
+        return []
+    return col.query(query_embeddings=[q], n_results=k)
+
+
+def timed(fn, queries) -> list[float]:
+    out = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<8} mean={statistics.fmean(samples):8.3f} ms  "
+        f"p50={statistics.median(samples):8.3f} ms  p99={p99:8.3f} ms"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark Chroma retrieval overhead.")
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--k", type=int, default=settings.RETRIEVE_K)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--path", default=None, help="Reuse/persist the synthetic store here")
+    args = ap.parse_args()
+
+    path = args.path or tempfile.mkdtemp(prefix="bench_chroma_")
+    os.makedirs(path, exist_ok=True)
+    t0 = time.perf_counter()
+    client = build_collection(path, args.n, args.dim)
+    print(f"collection ready: n={args.n} dim={args.dim} ({time.perf_counter() - t0:.1f}s)")
+
+    settings.CHROMA_PATH = path
+    deps._chroma_client = client
+    deps.init_components()
+    vectordb.refresh_collection_count()
+
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+    # warm both paths once
+    legacy_retrieve(client, queries[0], args.k)
+    vectordb.retrieve_by_embedding(queries[0], args.k)
+
+    report("legacy", timed(lambda q: legacy_retrieve(client, q, args.k), queries))
+    report("cached", timed(lambda q: vectordb.retrieve_by_embedding(q, args.k), queries))
+
+
+if __name__ == "__main__":
+    main()
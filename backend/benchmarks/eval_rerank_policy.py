@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Adaptive reranking, offline: rerank latency saved vs. recall lost.
+
+Usage (from backend/, MODE=live with Cohere + Chroma, or a fake via COHERE_BASE_URL):
+  python -m benchmarks.eval_rerank_policy --questions eval/questions.jsonl
+  python -m benchmarks.eval_rerank_policy --questions q.jsonl --skip-margin 0.1 --max-candidates 6
+
+Each line of the question set is {"question": "...", "relevant": ["<chunk id or source>", ...]}.
+Every question is retrieved once; the same candidates are then ranked by the
+full rerank call and by the adaptive policy. Recall@RERANK_TOP_N is measured
+against the relevant chunks that retrieval found, so only the reranking
+step is compared.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from persian_linux_rag.app.adapters.cohere_client import rerank_with_cohere
+from persian_linux_rag.app.adapters.rerank_policy import RerankPolicy
+from persian_linux_rag.app.adapters.vectordb import retrieve_by_embedding
+from persian_linux_rag.app.core.config import settings
+from persian_linux_rag.app.core.deps import get_components
+
+
+def is_relevant(doc, relevant: set) -> bool:
+    meta = doc.metadata or {}
+    return meta.get("id") in relevant or meta.get("source") in relevant
+
+
+def rank(question, docs, policy=None):
+    """(ranked docs, seconds spent in the rerank call)."""
+    indices = list(range(len(docs)))
+    if policy is not None:
+        plan = policy.plan(question, docs)
+        indices = plan.indices
+        if not plan.rerank:
+            return [docs[i] for i in indices[: settings.RERANK_TOP_N]], 0.0
+    shortlist = [docs[i] for i in indices]
+    t0 = time.perf_counter()
+    resp = rerank_with_cohere(question, [d.page_content for d in shortlist], settings.RERANK_TOP_N)
+    return [shortlist[r.index] for r in resp.results], time.perf_counter() - t0
+
+
+def recall(ranked, relevant, found) -> float:
+    return sum(is_relevant(d, relevant) for d in ranked) / found
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", required=True, help="JSONL labeled question set")
+    ap.add_argument("--skip-margin", type=float, default=None)
+    ap.add_argument("--score-window", type=float, default=None)
+    ap.add_argument("--max-candidates", type=int, default=None)
+    ap.add_argument("--no-lexical", action="store_true")
+    args = ap.parse_args()
+
+    settings.RERANK_ADAPTIVE = True
+    if args.skip_margin is not None:
+        settings.RERANK_SKIP_MARGIN = args.skip_margin
+    if args.score_window is not None:
+        settings.RERANK_SCORE_WINDOW = args.score_window
+    if args.max_candidates is not None:
+        settings.RERANK_MAX_CANDIDATES = args.max_candidates
+    if args.no_lexical:
+        settings.RERANK_LEXICAL_PREFILTER = False
+
+    with open(args.questions, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    embedder = get_components().embedder
+    policy = RerankPolicy()
+    full_t, adapt_t, full_r, adapt_r = [], [], [], []
+    unanswerable = 0
+    for item in items:
+        question, relevant = item["question"], set(item["relevant"])
+        docs = retrieve_by_embedding(embedder.embed_query(question), settings.RETRIEVE_K)
+        found = min(sum(is_relevant(d, relevant) for d in docs), settings.RERANK_TOP_N)
+        ranked, dt = rank(question, docs)
+        full_t.append(dt)
+        ranked_a, dt_a = rank(question, docs, policy)
+        adapt_t.append(dt_a)
+        if not found:
+            unanswerable += 1  # retrieval missed; the reranker cannot help
+            continue
+        full_r.append(recall(ranked, relevant, found))
+        adapt_r.append(recall(ranked_a, relevant, found))
+
+    def ms(xs):
+        return f"mean {1000 * statistics.mean(xs):.1f} ms, p50 {1000 * statistics.median(xs):.1f} ms"
+
+    n = len(items)
+    print(f"questions={n} (retrieval missed all relevant chunks for {unanswerable})")
+    print(f"policy: {json.dumps(policy.stats(), ensure_ascii=False)}")
+    print(f"rerank latency  full:     {ms(full_t)}")
+    print(f"rerank latency  adaptive: {ms(adapt_t)}")
+    saved = sum(full_t) - sum(adapt_t)
+    print(f"latency saved:  {1000 * saved / n:.1f} ms/question ({100 * saved / (sum(full_t) or 1):.0f}%)")
+    if full_r:
+        rf, ra = statistics.mean(full_r), statistics.mean(adapt_r)
+        print(f"recall@{settings.RERANK_TOP_N}  full {rf:.3f}  adaptive {ra:.3f}  lost {rf - ra:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the Cohere HTTP API (v1/embed, v2/rerank, v2/chat).
+
+Run it with uvicorn and point the backend at it via COHERE_BASE_URL:
+  FAKE_COHERE_DIM=1024 uvicorn benchmarks.fake_cohere:app --port 8765
+
+Latencies are configurable through env vars (seconds):
+  FAKE_COHERE_EMBED_LATENCY, FAKE_COHERE_RERANK_LATENCY,
+  FAKE_COHERE_TOKEN_LATENCY, FAKE_COHERE_TOKENS
+Embeddings are deterministic per input text.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DIM = int(os.getenv("FAKE_COHERE_DIM", "1024"))
+EMBED_LATENCY = float(os.getenv("FAKE_COHERE_EMBED_LATENCY", "0.05"))
+RERANK_LATENCY = float(os.getenv("FAKE_COHERE_RERANK_LATENCY", "0.08"))
+TOKEN_LATENCY = float(os.getenv("FAKE_COHERE_TOKEN_LATENCY", "0.02"))
+TOKENS = int(os.getenv("FAKE_COHERE_TOKENS", "40"))
+
+app = FastAPI()
+
+
+def fake_vector(text: str, dim: int = DIM) -> list[float]:
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    v /= np.linalg.norm(v) or 1.0
+    return v.tolist()
+
+
+def _usage() -> dict:
+    return {"billed_units": {"input_tokens": 1, "output_tokens": TOKENS}, "tokens": {"input_tokens": 1, "output_tokens": TOKENS}}
+
+
+@app.post("/v1/embed")
+@app.post("/v2/embed")
+async def embed(request: Request):
+    body = await request.json()
+    await asyncio.sleep(EMBED_LATENCY)
+    texts = body.get("texts") or []
+    return {
+        "response_type": "embeddings_by_type",
+        "id": str(uuid.uuid4()),
+        "texts": texts,
+        "embeddings": {"float": [fake_vector(t) for t in texts]},
+        "meta": {"api_version": {"version": "2"}, "billed_units": {"input_tokens": len(texts), "search_units": 1}},
+    }
+
+
+@app.post("/v2/rerank")
+@app.post("/v1/rerank")
+async def rerank(request: Request):
+    body = await request.json()
+    await asyncio.sleep(RERANK_LATENCY)
+    docs = body.get("documents") or []
+    top_n = body.get("top_n") or len(docs)
+    q = set(str(body.get("query", "")).lower().split())
+    scored = []
+    for i, d in enumerate(docs):
+        text = d if isinstance(d, str) else json.dumps(d)
+        overlap = len(q & set(text.lower().split()))
+        scored.append((overlap / (len(q) or 1), i))
+    scored.sort(key=lambda t: (-t[0], t[1]))
+    return {
+        "id": str(uuid.uuid4()),
+        "results": [{"index": i, "relevance_score": s} for s, i in scored[:top_n]],
+        "meta": {"api_version": {"version": "2"}, "billed_units": {"search_units": 1}},
+    }
+
+
+def _sse(obj: dict) -> str:
+    return f"event: {obj['type']}\ndata: {json.dumps(obj)}\n\n"
+
+
+@app.post("/v2/chat")
+async def chat(request: Request):
+    body = await request.json()
+    msg_id = str(uuid.uuid4())
+    if not body.get("stream"):
+        await asyncio.sleep(TOKEN_LATENCY * TOKENS)
+        return {
+            "id": msg_id,
+            "finish_reason": "COMPLETE",
+            "message": {"role": "assistant", "content": [{"type": "text", "text": "tok " * TOKENS}]},
+            "usage": _usage(),
+        }
+
+    async def events():
+        yield _sse({"type": "message-start", "id": msg_id, "delta": {"message": {"role": "assistant"}}})
+        yield _sse({"type": "content-start", "index": 0, "delta": {"message": {"content": {"type": "text", "text": ""}}}})
+        for i in range(TOKENS):
+            await asyncio.sleep(TOKEN_LATENCY)
+            yield _sse({"type": "content-delta", "index": 0, "delta": {"message": {"content": {"text": f"tok{i} "}}}})
+        yield _sse({"type": "content-end", "index": 0})
+        yield _sse({"type": "message-end", "delta": {"finish_reason": "COMPLETE", "usage": _usage()}})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Load test for /ask/stream against a local fake Cohere server.
+
+Usage (from backend/):
+  python -m benchmarks.loadtest_stream --concurrency 200 --requests 400
+
+Starts benchmarks.fake_cohere and the backend (MODE=live) with uvicorn,
+seeds a small synthetic Chroma collection, then opens --concurrency
+simultaneous SSE streams and reports time-to-first-byte, time-to-first-token
+and total latency percentiles.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_cohere import fake_vector
+
+
+def seed_collection(path: str, n: int, dim: int) -> None:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+    col = client.get_or_create_collection("llm_corpus")
+    if col.count() >= n:
+        return
+    for start in range(0, n, 1000):
+        ids = [f"c{i}" for i in range(start, min(n, start + 1000))]
+        texts = [f"linux chunk {i} about the kernel and gnu tools" for i in range(start, start + len(ids))]
+        col.add(
+            ids=ids,
+            documents=texts,
+            embeddings=[fake_vector(t, dim) for t in texts],
+            metadatas=[{"source": f"synthetic:{i}"} for i in ids],
+        )
+
+
+def spawn(args: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+
+
+async def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as c:
+        while time.monotonic() < deadline:
+            try:
+                await c.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def one_stream(client: httpx.AsyncClient, url: str, question: str):
+    t0 = time.perf_counter()
+    ttfb = ttft = None
+    async with client.stream("POST", url, json={"question": question, "top_k": 6}) as r:
+        r.raise_for_status()
+        failed = False
+        async for line in r.aiter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - t0
+            if ttft is None and line.startswith("event: token"):
+                ttft = time.perf_counter() - t0
+            elif line.startswith("event: error"):
+                failed = True
+            elif failed and line.startswith("data:"):
+                raise RuntimeError(line[5:].strip())
+    return ttfb or float("nan"), ttft or float("nan"), time.perf_counter() - t0
+
+
+def pct(samples: list[float], q: float) -> float:
+    s = sorted(x for x in samples if x == x)  # drop NaN (no token seen)
+    if not s:
+        return float("nan")
+    return s[min(len(s) - 1, int(len(s) * q))] * 1000.0
+
+
+async def run(base: str, concurrency: int, total: int) -> None:
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results, errors = [], {}
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+
+        async def worker(i: int):
+            async with sem:
+                try:
+                    results.append(await one_stream(client, f"{base}/ask/stream", f"what is linux {i % 50}?"))
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(total)))
+        wall = time.perf_counter() - t0
+
+    ttfb = [r[0] for r in results]
+    ttft = [r[1] for r in results]
+    lat = [r[2] for r in results]
+    print(f"concurrency={concurrency} requests={total} ok={len(results)} errors={errors or 0} wall={wall:.2f}s rps={len(results) / wall:.1f}")
+    print(f"ttfb   p50={pct(ttfb, 0.50):8.1f} ms  p99={pct(ttfb, 0.99):8.1f} ms")
+    print(f"ttft   p50={pct(ttft, 0.50):8.1f} ms  p99={pct(ttft, 0.99):8.1f} ms")
+    print(f"total  p50={pct(lat, 0.50):8.1f} ms  p99={pct(lat, 0.99):8.1f} ms")
+    async with httpx.AsyncClient() as client:
+        print("server stats:", (await client.get(f"{base}/stats")).text)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent /ask/stream load test with a fake Cohere.")
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--chunks", type=int, default=2000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--fake-port", type=int, default=8765)
+    ap.add_argument("--app-port", type=int, default=8766)
+    args = ap.parse_args()
+
+    chroma_path = tempfile.mkdtemp(prefix="loadtest_chroma_")
+    seed_collection(chroma_path, args.chunks, args.dim)
+
+    fake = spawn(["benchmarks.fake_cohere:app", "--port", str(args.fake_port)], {"FAKE_COHERE_DIM": str(args.dim)})
+    backend = spawn(
+        ["persian_linux_rag.main:app", "--port", str(args.app_port)],
+        {
+            "MODE": "live",
+            "COHERE_API_KEY": "fake",
+            "COHERE_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+            "CHROMA_PATH": chroma_path,
+            "HTTP_MAX_CONNECTIONS": str(args.concurrency),
+            "ANONYMIZED_TELEMETRY": "false",
+        },
+    )
+    base = f"http://127.0.0.1:{args.app_port}"
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.fake_port}/docs"))
+        asyncio.run(wait_ready(f"{base}/health"))
+        asyncio.run(run(base, args.concurrency, args.requests))
+    finally:
+        for p in (backend, fake):
+            p.terminate()
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
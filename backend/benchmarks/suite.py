@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: /ask, /ask/stream and ingestion, results as JSON.
+
+Usage (from backend/):
+  python -m benchmarks.suite --sizes 10000 --concurrency 1,8,32 --out bench.json
+  python -m benchmarks.suite --sizes 10000,100000,1000000 --requests 200 --out bench.json
+  python -m benchmarks.suite --compare old.json bench.json
+
+Nothing leaves the machine: benchmarks.fake_cohere stands in for Cohere
+(embed, rerank, streaming chat with FAKE_COHERE_* latencies) and a
+synthetic corpus (benchmarks.synthetic_corpus) fills Chroma at each size.
+For every size the backend runs under uvicorn (MODE=live, answer cache off
+so every request takes the full path) and each scenario is driven at each
+concurrency level. Ingestion runs in-process against a fresh collection
+with a local embed function, once per INGEST_EMBED_CONCURRENCY level.
+
+Each result records throughput, latency p50/p95/p99 (and time-to-first-token
+for streams), and the backend's RSS before/after, so a later run can be
+diffed against this one with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_cohere import fake_vector
+from benchmarks.loadtest_stream import pct, spawn, wait_ready
+from benchmarks.synthetic_corpus import build_collection, make_chunk
+
+QUESTIONS = [
+    "لینوکس چیست و چه تفاوتی با گنو دارد؟",
+    "How do I change file permissions with chmod?",
+    "مجوز عمومی گنو چه آزادی‌هایی می‌دهد؟",
+    "What does systemd do at boot?",
+    "چطور یک بسته را از مخزن نصب کنم؟",
+]
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Resident set size from /proc (None where that is unavailable)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def summarize(latencies: list, wall: float, errors: int, extra: Optional[dict] = None) -> dict:
+    out = {
+        "requests": len(latencies) + errors,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {f"p{q}": round(pct(latencies, q / 100), 1) for q in (50, 95, 99)},
+    }
+    out.update(extra or {})
+    return out
+
+
+async def _ask(client: httpx.AsyncClient, base: str, question: str):
+    t0 = time.perf_counter()
+    r = await client.post(f"{base}/ask", json={"question": question, "top_k": 6})
+    r.raise_for_status()
+    return time.perf_counter() - t0, None
+
+
+async def _ask_stream(client: httpx.AsyncClient, base: str, question: str):
+    t0 = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", f"{base}/ask/stream", json={"question": question, "top_k": 6}) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if ttft is None and line.startswith("event: token"):
+                ttft = time.perf_counter() - t0
+            elif line.startswith("event: error"):
+                raise RuntimeError("stream error event")
+    return time.perf_counter() - t0, ttft
+
+
+SCENARIOS = {"ask": _ask, "ask_stream": _ask_stream}
+
+
+async def drive(base: str, scenario: str, concurrency: int, total: int) -> dict:
+    call = SCENARIOS[scenario]
+    sem = asyncio.Semaphore(concurrency)
+    lat, ttft, errors = [], [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+
+        async def one(i: int):
+            nonlocal errors
+            async with sem:
+                try:
+                    dt, first = await call(client, base, f"{QUESTIONS[i % len(QUESTIONS)]} #{i}")
+                    lat.append(dt)
+                    if first is not None:
+                        ttft.append(first)
+                except Exception:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - t0
+    extra = {}
+    if ttft:
+        extra["ttft_ms"] = {f"p{q}": round(pct(ttft, q / 100), 1) for q in (50, 95, 99)}
+    return summarize(lat, wall, errors, extra)
+
+
+def run_http_scenarios(size: int, chroma_path: str, args) -> list:
+    results = []
+    env = {
+        "MODE": "live",
+        "COHERE_API_KEY": "fake",
+        "COHERE_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "CHROMA_PATH": chroma_path,
+        "ANSWER_CACHE_BACKEND": "off",
+        "QUERY_EMBED_CACHE_SIZE": "0",
+        "HTTP_MAX_CONNECTIONS": str(max(args.concurrency)),
+        "ANONYMIZED_TELEMETRY": "false",
+    }
+    fake = spawn(["benchmarks.fake_cohere:app", "--port", str(args.fake_port)], {"FAKE_COHERE_DIM": str(args.dim)})
+    backend = spawn(["persian_linux_rag.main:app", "--port", str(args.app_port)], env)
+    base = f"http://127.0.0.1:{args.app_port}"
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.fake_port}/docs"))
+        asyncio.run(wait_ready(f"{base}/health"))
+        asyncio.run(drive(base, "ask", 1, 3))  # warm-up: first query builds lazy state
+        for scenario in args.scenarios:
+            if scenario not in SCENARIOS:
+                continue
+            for conc in args.concurrency:
+                before = rss_mb(backend.pid)
+                res = asyncio.run(drive(base, scenario, conc, max(args.requests, conc)))
+                after = rss_mb(backend.pid)
+                res.update(scenario=scenario, corpus_chunks=size, concurrency=conc)
+                res.update(_rss(before, after))
+                results.append(res)
+                print(_line(res))
+    finally:
+        for p in (backend, fake):
+            p.terminate()
+            p.wait()
+    return results
+
+
+def _rss(before: Optional[float], after: Optional[float]) -> dict:
+    growth = round(after - before, 1) if before is not None and after is not None else None
+    return {"rss_mb_before": before and round(before, 1), "rss_mb_after": after and round(after, 1), "rss_growth_mb": growth}
+
+
+def run_ingest_scenario(args) -> list:
+    import numpy as np
+
+    from persian_linux_rag.app.core.config import settings
+    from persian_linux_rag.app.ingest.manifest import IngestManifest
+    from persian_linux_rag.app.ingest.pipeline import run_ingest
+
+    import chromadb
+
+    rng = np.random.default_rng(1)
+    root = tempfile.mkdtemp(prefix="bench_ingest_src_")
+    for i in range(args.ingest_files):
+        with open(os.path.join(root, f"doc{i}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(make_chunk(rng, 900) for _ in range(8)))
+
+    def embed_fn(texts):
+        time.sleep(args.embed_latency)
+        return [fake_vector(t, args.dim) for t in texts]
+
+    results = []
+    for conc in args.concurrency:
+        settings.INGEST_EMBED_CONCURRENCY = conc
+        store = tempfile.mkdtemp(prefix="bench_ingest_db_")
+        collection = chromadb.PersistentClient(path=store).get_or_create_collection("bench")
+        manifest = IngestManifest(os.path.join(store, "manifest.sqlite3"))
+        before = rss_mb()
+        t0 = time.perf_counter()
+        stats = run_ingest([root], collection=collection, embed_fn=embed_fn, manifest=manifest)
+        wall = time.perf_counter() - t0
+        manifest.close()
+        res = {
+            "scenario": "ingest",
+            "concurrency": conc,
+            "files": args.ingest_files,
+            "chunks": stats.chunks,
+            "wall_s": round(wall, 3),
+            "throughput_chunks_per_s": round(stats.chunks / wall, 1) if wall > 0 else 0.0,
+        }
+        res.update(_rss(before, rss_mb()))
+        results.append(res)
+        print(_line(res))
+    return results
+
+
+def _line(res: dict) -> str:
+    lat = res.get("latency_ms", {})
+    rate = res.get("throughput_rps", res.get("throughput_chunks_per_s"))
+    return (
+        f"{res['scenario']:<11} chunks={res.get('corpus_chunks', res.get('chunks'))!s:<8} "
+        f"c={res['concurrency']:<4} rate={rate:<8} p50={lat.get('p50', '-')} p95={lat.get('p95', '-')} "
+        f"p99={lat.get('p99', '-')} rss+={res.get('rss_growth_mb')}"
+    )
+
+
+def _key(res: dict) -> tuple:
+    return res["scenario"], res.get("corpus_chunks"), res["concurrency"]
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print per-scenario throughput and p95 changes between two result files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {_key(r): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    for res in new:
+        prev = old.get(_key(res))
+        if prev is None:
+            continue
+        rate_key = "throughput_rps" if "throughput_rps" in res else "throughput_chunks_per_s"
+        r0, r1 = prev[rate_key], res[rate_key]
+        p0 = prev.get("latency_ms", {}).get("p95")
+        p1 = res.get("latency_ms", {}).get("p95")
+        change = f"{100 * (r1 - r0) / r0:+.1f}%" if r0 else "n/a"
+        p95 = f"  p95 {p0} -> {p1} ms" if p0 is not None else ""
+        print(f"{res['scenario']:<11} chunks={res.get('corpus_chunks')} c={res['concurrency']}: "
+              f"{rate_key} {r0} -> {r1} ({change}){p95}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline /ask, /ask/stream and ingestion benchmarks.")
+    ap.add_argument("--sizes", default="10000", help="Corpus sizes in chunks, comma-separated")
+    ap.add_argument("--concurrency", default="1,8,32")
+    ap.add_argument("--requests", type=int, default=100, help="Requests per scenario and level")
+    ap.add_argument("--scenarios", default="ask,ask_stream,ingest")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "rag_bench"),
+                    help="Synthetic collections are built here once and reused")
+    ap.add_argument("--ingest-files", type=int, default=200)
+    ap.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per ingest embed call")
+    ap.add_argument("--fake-port", type=int, default=8765)
+    ap.add_argument("--app-port", type=int, default=8766)
+    ap.add_argument("--out", default=None, help="Write results JSON here")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Diff two result files and exit")
+    args = ap.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.scenarios = [s.strip() for s in args.scenarios.split(",")]
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        if not set(args.scenarios) & set(SCENARIOS):
+            break
+        path = os.path.join(args.work_dir, f"chroma_{size}_{args.dim}")
+        build_collection(path, size, args.dim)
+        results.extend(run_http_scenarios(size, path, args))
+    if "ingest" in args.scenarios:
+        results.extend(run_ingest_scenario(args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_cohere": {k: v for k, v in os.environ.items() if k.startswith("FAKE_COHERE_")},
+        "args": {k: v for k, v in vars(args).items() if k != "compare"},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
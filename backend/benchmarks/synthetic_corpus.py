@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Synthetic Persian/English corpus for offline benchmarks.
+
+Usage (from backend/):
+  python -m benchmarks.synthetic_corpus --chunks 100000 --dim 256 --path /tmp/bench_chroma_100k
+
+Chunks mix Persian prose (with the Arabic letter variants, ZWNJ compounds
+and punctuation the normalizer handles) and English command-line snippets,
+at roughly the ingestion chunk size. Vectors are unit-norm and drawn from
+a seeded RNG, so a given --seed always builds the same collection; query
+vectors come from benchmarks.fake_cohere and are just as arbitrary, which
+is fine for latency and memory, not for relevance.
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from persian_linux_rag.app.core.config import settings
+
+FA_WORDS = (
+    "لینوکس سیستم‌عامل آزاد هسته پردازه فایل مجوز کاربر گروه ترمینال "
+    "نرم‌افزار توزیع بسته مخزن شبکه سرویس پیکربندی راه‌اندازی حافظه "
+    "ديسك كاربر ريشه مسیر دستور خروجی ورودی خطا گزارش امنیت رمز کلید "
+    "استالمن گنو پروژه آزادی کد منبع مجوز عمومی توسعه‌دهنده جامعه"
+).split()
+EN_WORDS = (
+    "kernel process file permission user group shell package repository "
+    "network service config boot memory disk root path command output "
+    "error log security key chmod chown systemd grep sed awk ssh mount"
+).split()
+FA_PUNCT = ["، ", "؛ ", ". ", "؟ ", " "]
+EN_PUNCT = [", ", ". ", "; ", " "]
+
+
+def make_chunk(rng: np.random.Generator, target_chars: int) -> str:
+    """One chunk: mostly Persian sentences with an occasional English snippet."""
+    parts: List[str] = []
+    size = 0
+    while size < target_chars:
+        if rng.random() < 0.2:
+            words, punct = EN_WORDS, EN_PUNCT
+        else:
+            words, punct = FA_WORDS, FA_PUNCT
+        n = int(rng.integers(6, 18))
+        sentence = " ".join(words[i] for i in rng.integers(0, len(words), n))
+        sentence += punct[int(rng.integers(0, len(punct)))]
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)[:target_chars]
+
+
+def iter_batches(
+    n: int, dim: int, batch: int = 5000, seed: int = 0, chunk_chars: int = 0
+) -> Iterator[Tuple[List[str], List[str], List[dict], np.ndarray]]:
+    """(ids, texts, metadatas, unit vectors) batches for ``n`` chunks."""
+    chunk_chars = chunk_chars or settings.INGEST_CHUNK_SIZE
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, batch):
+        m = min(batch, n - start)
+        ids = [f"syn{start + i}" for i in range(m)]
+        texts = [make_chunk(rng, int(rng.integers(chunk_chars // 2, chunk_chars))) for _ in range(m)]
+        metas = [
+            {"source": f"synthetic/doc{(start + i) // 20}.txt", "start_index": ((start + i) % 20) * chunk_chars}
+            for i in range(m)
+        ]
+        vecs = rng.standard_normal((m, dim), dtype=np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        yield ids, texts, metas, vecs
+
+
+def build_collection(path: str, n: int, dim: int, seed: int = 0, quiet: bool = False):
+    """Persistent Chroma collection with ``n`` synthetic chunks (reused if already built)."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+    try:
+        col = client.get_collection(settings.CHROMA_COLLECTION)
+        if col.count() == n:
+            return client
+        client.delete_collection(settings.CHROMA_COLLECTION)
+    except Exception:
+        pass
+    col = client.create_collection(settings.CHROMA_COLLECTION)
+    t0 = time.perf_counter()
+    done = 0
+    for ids, texts, metas, vecs in iter_batches(n, dim, seed=seed):
+        col.add(ids=ids, documents=texts, metadatas=metas, embeddings=vecs.tolist())
+        done += len(ids)
+        if not quiet:
+            print(f"\rseeded {done}/{n} chunks ({time.perf_counter() - t0:.0f}s)", end="", flush=True)
+    if not quiet:
+        print()
+    return client
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fill a Chroma collection with a synthetic Persian/English corpus.")
+    ap.add_argument("--chunks", type=int, default=10_000, help="e.g. 10000, 100000, 1000000")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--path", default=None, help="Chroma directory (default: <tmp>/bench_chroma_<chunks>_<dim>)")
+    args = ap.parse_args()
+    path = args.path or os.path.join(tempfile.gettempdir(), f"bench_chroma_{args.chunks}_{args.dim}")
+    build_collection(path, args.chunks, args.dim, seed=args.seed)
+    print(f"collection {settings.CHROMA_COLLECTION!r} at {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGN_FILE = "ivf_assign.npy"
+IVF_INFO_FILE = "ivf_info.json"
+BLOCK_ROWS = 16384  # rows assigned per matrix product while building
+
+
+def default_nlist(n: int) -> int:
+    """About 4 * sqrt(n) lists: a few hundred rows each at 1M vectors."""
+    return max(1, min(n, int(4 * math.sqrt(n))))
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by inner product) for every row, block by block."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = np.asarray(vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+        out[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(
+    vectors: np.ndarray, nlist: int, iters: int = 10, sample: int = 100_000, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on a row sample; empty lists are reseeded from random rows."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    rows = np.sort(rng.choice(n, min(n, max(sample, nlist)), replace=False))
+    x = np.asarray(vectors[rows], dtype=np.float32)
+    centroids = x[rng.choice(len(x), nlist, replace=False)].copy()
+    for _ in range(iters):
+        labels = assign_lists(x, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        # reduceat over the non-empty lists only: each start then ends where the next begins
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[~empty]
+        sums = np.zeros((nlist, x.shape[1]), dtype=np.float32)
+        sums[~empty] = np.add.reduceat(x[order], starts, axis=0)
+        sums[empty] = x[rng.choice(len(x), int(empty.sum()))]
+        centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over the rows of a LocalIndex export.
+
+    A k-means coarse quantizer splits the (unit-norm) rows into ``nlist``
+    lists; a query scores only the rows of its ``nprobe`` nearest lists, so
+    cost grows with ``n * nprobe / nlist`` instead of ``n``. ``nprobe`` is a
+    per-query knob: raising it trades latency for recall. New rows are
+    appended with ``add`` against the existing centroids (no retraining);
+    only a full rebuild re-clusters.
+    """
+
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray):
+        self.centroids = centroids
+        self.assign = assign
+        self._index_lists()
+
+    def _index_lists(self) -> None:
+        self.order = np.argsort(self.assign, kind="stable")
+        counts = np.bincount(self.assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self) -> int:
+        return len(self.assign)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls, vectors: np.ndarray, nlist: int = 0, iters: int = 10, sample: int = 100_000, seed: int = 0
+    ) -> "IVFIndex":
+        nlist = nlist or default_nlist(len(vectors))
+        centroids = train_centroids(vectors, min(nlist, len(vectors)), iters, sample, seed)
+        return cls(centroids, assign_lists(vectors, centroids))
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Append rows ``len(self) ..`` to their nearest lists."""
+        if len(vectors):
+            self.assign = np.concatenate((self.assign, assign_lists(vectors, self.centroids)))
+            self._index_lists()
+
+    def probe(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row numbers in the ``nprobe`` lists nearest to the unit query ``q``."""
+        nprobe = min(max(nprobe, 1), self.nlist)
+        sims = self.centroids @ q
+        lists = np.argpartition(-sims, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        return np.concatenate([self.order[self.offsets[i] : self.offsets[i + 1]] for i in lists])
+
+    def save(self, path: str, trained_on: Optional[int] = None) -> None:
+        for name, arr in ((CENTROIDS_FILE, self.centroids), (ASSIGN_FILE, self.assign)):
+            tmp = os.path.join(path, name + ".tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(path, name))
+        info = read_ivf_info(path)
+        info.update(count=len(self), nlist=self.nlist)
+        if trained_on is not None:
+            info["trained_on"] = trained_on
+        with open(os.path.join(path, IVF_INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        centroids = np.load(os.path.join(path, CENTROIDS_FILE))
+        assign = np.load(os.path.join(path, ASSIGN_FILE))
+        return cls(centroids, assign)
+
+
+def read_ivf_info(path: str) -> dict:
+    try:
+        with open(os.path.join(path, IVF_INFO_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remove_ivf(path: str) -> None:
+    """Drop a persisted IVF index (its row numbers no longer match the export)."""
+    for name in (CENTROIDS_FILE, ASSIGN_FILE, IVF_INFO_FILE):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+
+
+def load_or_build_ivf(path: str, vectors: np.ndarray, nlist: int = 0, sample: int = 100_000) -> IVFIndex:
+    """The persisted index, extended with rows appended since it was saved.
+
+    Built from scratch when missing, when the export shrank, or when
+    ``nlist`` changed.
+    """
+    info = read_ivf_info(path)
+    n = len(vectors)
+    if info and info.get("count", n + 1) <= n and (not nlist or info.get("nlist") == nlist):
+        index = IVFIndex.load(path)
+        if len(index) < n:
+            index.add(vectors[len(index) :])
+            index.save(path)
+        return index
+    index = IVFIndex.build(vectors, nlist=nlist, sample=sample)
+    index.save(path, trained_on=n)
+    return index
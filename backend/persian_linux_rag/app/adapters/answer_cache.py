@@ -0,0 +1,342 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Protocol
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.textnorm import query_key
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    citations: List[dict]
+    embedding: Optional[np.ndarray] = None  # float32
+    generation: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+
+class AnswerCacheBackend(Protocol):
+    """Key/value store for answers; implementations own LRU eviction.
+
+    ``on_evict``, when set, is called with the keys removed by eviction.
+    """
+
+    on_evict: Optional[Callable[[Iterable[str]], None]]
+
+    def get(self, key: str) -> Optional[CachedAnswer]: ...
+    def put(self, key: str, entry: CachedAnswer) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def clear(self) -> None: ...
+    def items(self) -> Iterator[tuple[str, CachedAnswer]]: ...
+    def __len__(self) -> int: ...
+
+
+class MemoryAnswerBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.on_evict = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        evicted = []
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                evicted.append(self._data.popitem(last=False)[0])
+                self.evictions += 1
+        if evicted and self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        with self._lock:
+            return iter(list(self._data.items()))
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _decode(payload: str, blob: Optional[bytes]) -> CachedAnswer:
+    data = json.loads(payload)
+    legacy = data.pop("embedding", None)  # rows written before the BLOB column
+    if blob is not None:
+        data["embedding"] = np.frombuffer(blob, dtype=np.float32)
+    elif legacy:
+        data["embedding"] = np.asarray(legacy, dtype=np.float32)
+    return CachedAnswer(**data)
+
+
+class SQLiteAnswerBackend:
+    """On-disk backend so cached answers survive restarts.
+
+    Embeddings live in a float32 BLOB column next to the JSON payload.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.on_evict = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, accessed REAL NOT NULL, "
+                "embedding BLOB)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+            if "embedding" not in columns:
+                self._conn.execute("ALTER TABLE answers ADD COLUMN embedding BLOB")
+
+    def get(self, key):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT payload, embedding FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE answers SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return _decode(*row)
+
+    def put(self, key, entry):
+        payload = json.dumps(asdict(replace(entry, embedding=None)), ensure_ascii=False)
+        blob = None
+        if entry.embedding is not None:
+            blob = np.asarray(entry.embedding, dtype=np.float32).tobytes()
+        evicted = []
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, payload, accessed, embedding) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, time.time(), blob),
+            )
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            if n > self.max_entries:
+                evicted = [
+                    k
+                    for (k,) in self._conn.execute(
+                        "SELECT key FROM answers ORDER BY accessed ASC LIMIT ?",
+                        (n - self.max_entries,),
+                    )
+                ]
+                self._conn.executemany(
+                    "DELETE FROM answers WHERE key = ?", [(k,) for k in evicted]
+                )
+                self.evictions += len(evicted)
+        if evicted and self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+
+    def items(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT key, payload, embedding FROM answers").fetchall()
+        return ((k, _decode(p, e)) for k, p, e in rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+class AnswerCache:
+    """Exact (normalized text) + semantic (query-embedding cosine) answer cache.
+
+    Entries expire after ``ttl`` seconds and are dropped when the corpus
+    ``generation`` they were stored under no longer matches. The semantic
+    index is a float32 matrix kept in step with the backend: ``put`` appends
+    or overwrites a row, drops and evictions mask it, and dead rows are
+    compacted away when the matrix would otherwise have to grow.
+    """
+
+    def __init__(self, backend: AnswerCacheBackend, ttl: float, threshold: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []  # row -> key, None once masked
+        self._matrix: Optional[np.ndarray] = None  # L2-normalized rows
+        self._live: Optional[np.ndarray] = None
+        self._loaded = False
+        backend.on_evict = self._forget
+
+    def _fresh(self, entry: CachedAnswer, generation: Optional[str]) -> bool:
+        if self.ttl and time.time() - entry.created > self.ttl:
+            return False
+        return generation is None or entry.generation in (None, generation)
+
+    def get_exact(self, question: str, generation: Optional[str] = None):
+        key = query_key(question)
+        entry = self.backend.get(key)
+        if entry is not None and not self._fresh(entry, generation):
+            self._drop(key)
+            entry = None
+        if entry is not None:
+            self.hits_exact += 1
+        return entry
+
+    def get_similar(self, embedding: List[float], generation: Optional[str] = None):
+        """Best entry with cosine >= threshold; counts a miss otherwise."""
+        if self.threshold < 1.0:
+            key = self._nearest(_unit(embedding))
+            if key is not None:
+                entry = self.backend.get(key)
+                if entry is not None and self._fresh(entry, generation):
+                    self.hits_semantic += 1
+                    return entry
+                self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        question: str,
+        answer: str,
+        citations: List[dict],
+        embedding: Optional[List[float]] = None,
+        generation: Optional[str] = None,
+    ) -> None:
+        emb = None if embedding is None else np.asarray(embedding, dtype=np.float32)
+        key = query_key(question)
+        self.backend.put(key, CachedAnswer(answer, citations, emb, generation))
+        if emb is not None:
+            with self._lock:
+                if self._loaded:
+                    self._set_row(key, _unit(emb))
+        else:
+            self._forget([key])
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self._rows, self._keys = {}, []
+            self._matrix = self._live = None
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.backend),
+            "hits_exact": self.hits_exact,
+            "hits_semantic": self.hits_semantic,
+            "misses": self.misses,
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
+
+    def _drop(self, key: str) -> None:
+        self.backend.delete(key)
+        self._forget([key])
+
+    def _forget(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is not None:
+                    self._live[row] = False
+                    self._keys[row] = None
+
+    def _nearest(self, q: np.ndarray) -> Optional[str]:
+        with self._lock:
+            if not self._loaded:
+                # One full read per process; afterwards rows are kept in step.
+                for key, entry in self.backend.items():
+                    if entry.embedding is not None and len(entry.embedding):
+                        self._set_row(key, _unit(entry.embedding))
+                self._loaded = True
+            n = len(self._keys)
+            if not self._rows or self._matrix.shape[1] != len(q):
+                return None
+            sims = self._matrix[:n] @ q
+            sims[~self._live[:n]] = -np.inf
+            best = int(np.argmax(sims))
+            return self._keys[best] if sims[best] >= self.threshold else None
+
+    def _set_row(self, key: str, vec: np.ndarray) -> None:
+        # Caller holds self._lock.
+        if self._matrix is not None and self._matrix.shape[1] != len(vec):
+            self._rows, self._keys = {}, []  # embedding model changed
+            self._matrix = self._live = None
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if self._matrix is None or row == len(self._matrix):
+                self._make_room(len(vec))
+                row = len(self._keys)
+            self._keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = vec
+        self._live[row] = True
+
+    def _make_room(self, dim: int) -> None:
+        if self._matrix is not None and len(self._rows) <= len(self._keys) // 2:
+            live = np.flatnonzero(self._live[: len(self._keys)])
+            n = len(live)
+            self._matrix[:n] = self._matrix[live]
+            self._live[:n] = True
+            self._live[n:] = False
+            self._keys = [self._keys[i] for i in live]
+            self._rows = {key: i for i, key in enumerate(self._keys)}
+            return
+        capacity = max(64, 2 * len(self._keys))
+        matrix = np.zeros((capacity, dim), dtype=np.float32)
+        live = np.zeros(capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[: len(self._matrix)] = self._matrix
+            live[: len(self._live)] = self._live
+        self._matrix, self._live = matrix, live
+
+
+def _unit(vec) -> np.ndarray:
+    v = np.array(vec, dtype=np.float32)
+    return v / (np.linalg.norm(v) or 1.0)
+
+
+def build_answer_cache() -> Optional[AnswerCache]:
+    kind = settings.ANSWER_CACHE_BACKEND.lower()
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        backend = SQLiteAnswerBackend(
+            settings.ANSWER_CACHE_PATH, settings.ANSWER_CACHE_MAX_ENTRIES
+        )
+    else:
+        backend = MemoryAnswerBackend(settings.ANSWER_CACHE_MAX_ENTRIES)
+    return AnswerCache(
+        backend,
+        ttl=settings.ANSWER_CACHE_TTL,
+        threshold=settings.ANSWER_CACHE_SIM_THRESHOLD,
+    )
@@ -1,5 +1,9 @@
-from ..core.deps import get_cohere_client
+import asyncio
+from dataclasses import dataclass
+from typing import List
+from ..core.deps import get_async_cohere_client, get_cohere_client, get_components
 from ..core.config import settings
+from .batching import MicroBatcher
 
 def rerank_with_cohere(query: str, docs: list[str], top_n: int):
     co = get_cohere_client()
@@ -12,3 +16,68 @@ def rerank_with_cohere(query: str, docs: list[str], top_n: int):
         top_n=min(top_n, len(docs)),
     )
     return resp
+
+async def _arerank_direct(query: str, docs: list[str], top_n: int):
+    co = get_async_cohere_client()
+    if not co:
+        raise RuntimeError("Cohere client not configured. Set COHERE_API_KEY and MODE=live.")
+    resp = await co.rerank(
+        model=settings.COHERE_RERANK_MODEL,
+        query=query,
+        documents=docs,
+        top_n=min(top_n, len(docs)),
+    )
+    return resp
+
+async def arerank_with_cohere(query: str, docs: list[str], top_n: int):
+    batcher = get_components().rerank_batcher
+    if batcher is None:
+        return await _arerank_direct(query, docs, top_n)
+    return await batcher.submit((query, docs, top_n))
+
+
+@dataclass
+class RerankItem:
+    index: int
+    relevance_score: float
+
+
+@dataclass
+class RerankResult:
+    results: List[RerankItem]
+
+
+async def _rerank_batch(requests: list[tuple[str, list[str], int]]) -> list[RerankResult]:
+    """Rerank takes one query per call, so group requests by query.
+
+    Requests sharing a query are answered by one call over the union of
+    their documents; scores are per (query, doc), so each caller's ranking
+    is the union ranking filtered to its own documents.
+    """
+    groups: dict[str, list[int]] = {}
+    for i, (query, _, _) in enumerate(requests):
+        groups.setdefault(query, []).append(i)
+    out: list[RerankResult | None] = [None] * len(requests)
+
+    async def run_group(query: str, members: list[int]) -> None:
+        if len(members) == 1:
+            out[members[0]] = await _arerank_direct(*requests[members[0]])
+            return
+        union = list(dict.fromkeys(d for i in members for d in requests[i][1]))
+        resp = await _arerank_direct(query, union, len(union))
+        scores = {union[r.index]: r.relevance_score for r in resp.results}
+        for i in members:
+            _, docs, top_n = requests[i]
+            ranked = sorted(range(len(docs)), key=lambda j: -scores.get(docs[j], float("-inf")))
+            out[i] = RerankResult([RerankItem(j, scores.get(docs[j], 0.0)) for j in ranked[:top_n]])
+
+    await asyncio.gather(*(run_group(q, m) for q, m in groups.items()))
+    return out
+
+
+def build_rerank_batcher() -> MicroBatcher | None:
+    if settings.RERANK_BATCH_MAX <= 1:
+        return None
+    return MicroBatcher(
+        _rerank_batch, settings.RERANK_BATCH_MAX, settings.RERANK_BATCH_WAIT_MS / 1000.0
+    )
@@ -1,5 +1,14 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
 from langchain_cohere import CohereEmbeddings
+from langchain_core.embeddings import Embeddings
 from ..core.config import settings
+from ..core.textnorm import normalize_persian
+from .batching import MicroBatcher
 
 
 def get_query_embedder() -> CohereEmbeddings:
@@ -7,4 +16,131 @@ def get_query_embedder() -> CohereEmbeddings:
     return CohereEmbeddings(
         model=settings.COHERE_EMBED_MODEL,
         cohere_api_key=settings.COHERE_API_KEY,
+        base_url=settings.COHERE_BASE_URL,
+    )
+
+
+class BatchingQueryEmbedder(Embeddings):
+    """Groups concurrent ``aembed_query`` calls into one embed request."""
+
+    def __init__(self, base: CohereEmbeddings, max_batch: int, max_wait: float):
+        self.base = base
+        self.batcher = MicroBatcher(self._embed_batch, max_batch, max_wait)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        unique = list(dict.fromkeys(texts))
+        vecs = await self.base.aembed(unique, input_type="search_query")
+        by_text = dict(zip(unique, vecs))
+        return [by_text[t] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.batcher.submit(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+
+class CachingQueryEmbedder(Embeddings):
+    """LRU cache of query embeddings in front of another embedder.
+
+    Questions are Persian-normalized before lookup *and* before embedding,
+    so "لينوكس" and "لینوکس" share one vector and match how documents were
+    normalized at ingestion. Vectors are kept as float32; with ``path`` set
+    the cache is loaded on start and written back by ``save()``.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int, path: Optional[str] = None):
+        self.base = base
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vec.tolist()
+
+    def _put(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self._data[key] = np.asarray(vec, dtype=np.float32)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_persian(text)
+        vec = self._get(key)
+        if vec is None:
+            vec = self.base.embed_query(key)
+            self._put(key, vec)
+        return vec
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_persian(text)
+        vec = self._get(key)
+        if vec is None:
+            vec = await self.base.aembed_query(key)
+            self._put(key, vec)
+        return vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            keys = list(self._data.keys())
+            matrix = np.stack(list(self._data.values())) if keys else np.zeros((0, 0), np.float32)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, model=settings.COHERE_EMBED_MODEL, keys=np.array(keys, dtype=str), vectors=matrix)
+        os.replace(tmp, self.path)
+
+    def _load(self, path: str) -> None:
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                if str(z["model"]) != settings.COHERE_EMBED_MODEL:
+                    return  # vectors from another model are useless
+                for key, vec in zip(z["keys"].tolist(), z["vectors"]):
+                    self._data[key] = vec.astype(np.float32, copy=True)
+        except Exception:
+            self._data.clear()  # a corrupt snapshot just means a cold cache
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+def get_cached_query_embedder(base: Optional[Embeddings] = None) -> CachingQueryEmbedder:
+    base = base or get_query_embedder()
+    if settings.EMBED_BATCH_MAX > 1 and isinstance(base, CohereEmbeddings):
+        base = BatchingQueryEmbedder(
+            base, settings.EMBED_BATCH_MAX, settings.EMBED_BATCH_WAIT_MS / 1000.0
+        )
+    return CachingQueryEmbedder(
+        base,
+        max_entries=settings.QUERY_EMBED_CACHE_SIZE,
+        path=settings.QUERY_EMBED_CACHE_PATH,
     )
@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ..core.config import settings
+from .ann_index import load_or_build_ivf, remove_ivf
+from .mmr import mmr_select
+
+if TYPE_CHECKING:
+    from .ann_index import IVFIndex
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.jsonl"
+INFO_FILE = "info.json"
+INT8_FILE = "vectors_int8.npy"
+SCALES_FILE = "scales.npy"
+BITS_FILE = "vectors_bits.npy"
+
+QUANTIZATIONS = ("none", "int8", "binary")
+BLOCK_ROWS = 16384  # rows decoded per step of a quantized scan
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vecs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 codes with one float32 scale per row (row ~= codes * scale)."""
+    scales = np.abs(vecs).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vecs / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(vecs: np.ndarray) -> np.ndarray:
+    """Sign bits, packed 8 dimensions per byte."""
+    return np.packbits(vecs > 0, axis=1)
+
+
+def _best(sims: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest values, best first."""
+    n = len(sims)
+    k = min(k, n)
+    idx = np.argpartition(-sims, k - 1)[:k] if k < n else np.arange(n)
+    return idx[np.argsort(-sims[idx], kind="stable")]
+
+
+def _unit(query_embedding) -> np.ndarray:
+    """The query as a float32 unit vector; never touches the caller's array."""
+    q = np.asarray(query_embedding, dtype=np.float32)
+    return q / (np.linalg.norm(q) or 1.0)
+
+
+def _open(path: str, name: str) -> np.ndarray:
+    try:
+        return np.load(os.path.join(path, name), mmap_mode="r")
+    except ValueError:  # zero-length arrays cannot be mmapped
+        return np.load(os.path.join(path, name))
+
+
+class LocalIndex:
+    """Top-k over all chunk embeddings held in one float32 matrix.
+
+    Rows are L2-normalized at export time, so a single matrix-vector
+    product gives cosine scores and ``argpartition`` picks the top k. The
+    matrix is memory-mapped, so several workers share the page cache.
+
+    With ``quantization`` "int8" (per-row scale) or "binary" (sign bits) the
+    full scan reads only the compact codes, 4x or 32x smaller, block by
+    block; the best ``rescore_k`` rows are then rescored exactly from the
+    float32 matrix, which is touched only for those rows.
+
+    With an ``ann`` index (ann_index.IVFIndex) only the rows of the
+    ``nprobe`` nearest lists are scored, straight from the float32 matrix.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict],
+        vectors: np.ndarray,
+        quantization: str = "none",
+        codes: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        rescore_k: int = 0,
+        ann: Optional["IVFIndex"] = None,
+        nprobe: int = 16,
+    ):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.quantization = quantization
+        self.codes = codes  # int8 rows or packed sign bits
+        self.scales = scales
+        self.rescore_k = rescore_k
+        self.ann = ann
+        self.nprobe = nprobe
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def scan_bytes(self) -> int:
+        """Bytes read by one full scan (what has to stay hot in the page cache)."""
+        if self.codes is None:
+            return self.vectors.nbytes
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query_embedding) -> np.ndarray:
+        q = _unit(query_embedding)
+        return self.vectors @ q
+
+    def _candidates(self, q: np.ndarray, n_keep: int) -> np.ndarray:
+        """Rows of the ``n_keep`` best approximate scores, from the codes only."""
+        qbits = quantize_binary(q[None, :])[0] if self.quantization == "binary" else None
+        picked = []
+        for start in range(0, len(self.ids), BLOCK_ROWS):
+            block = self.codes[start : start + BLOCK_ROWS]
+            if qbits is not None:
+                approx = -_POPCOUNT[np.bitwise_xor(block, qbits)].sum(axis=1, dtype=np.int32)
+            else:
+                approx = (block.astype(np.float32) @ q) * self.scales[start : start + BLOCK_ROWS]
+            best = _best(approx, n_keep)
+            picked.append((best + start, approx[best]))
+        rows = np.concatenate([r for r, _ in picked])
+        approx = np.concatenate([a for _, a in picked]).astype(np.float32)
+        return rows[_best(approx, n_keep)]
+
+    def top_k(self, query_embedding, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """(row indices, scores) of the k best rows, best first."""
+        n = len(self.ids)
+        if n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.ann is not None:
+            q = _unit(query_embedding)
+            rows = np.sort(self.ann.probe(q, self.nprobe))
+            if len(rows) >= min(k, n):
+                sims = np.asarray(self.vectors[rows]) @ q
+                best = _best(sims, k)
+                return rows[best], sims[best]
+            # too few rows in the probed lists: fall through to a full scan
+        if self.codes is None:
+            sims = self.scores(query_embedding)
+            idx = _best(sims, k)
+            return idx, sims[idx]
+        q = _unit(query_embedding)
+        rows = np.sort(self._candidates(q, max(k, self.rescore_k)))  # ascending: mmap-friendly reads
+        sims = np.asarray(self.vectors[rows]) @ q
+        best = _best(sims, k)
+        return rows[best], sims[best]
+
+    def document(self, row: int) -> Document:
+        meta = dict(self.metadatas[row] or {})
+        meta.setdefault("id", self.ids[row])
+        return Document(page_content=self.texts[row], metadata=meta)
+
+    def search(self, query_embedding, k: int) -> list[Document]:
+        idx, sims = self.top_k(query_embedding, k)
+        docs = [self.document(int(i)) for i in idx]
+        for doc, sim in zip(docs, sims):
+            doc.metadata["score"] = float(sim)
+        return docs
+
+    def search_mmr(self, query_embedding, k: int, fetch_k: int, lambda_mult: float) -> list[Document]:
+        idx, sims = self.top_k(query_embedding, fetch_k)
+        picked = mmr_select(query_embedding, self.vectors[idx], k, lambda_mult)
+        docs = []
+        for j in picked:
+            doc = self.document(int(idx[j]))
+            doc.metadata["score"] = float(sims[j])
+            docs.append(doc)
+        return docs
+
+    @classmethod
+    def load(cls, path: str, rescore_k: int = 0) -> "LocalIndex":
+        vectors = _open(path, VECTORS_FILE)
+        quantization = read_export_info(path).get("quantization", "none")
+        codes = scales = None
+        if quantization == "int8":
+            codes, scales = _open(path, INT8_FILE), _open(path, SCALES_FILE)
+        elif quantization == "binary":
+            codes = _open(path, BITS_FILE)
+        ids, texts, metadatas = [], [], []
+        with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+            for line in f:
+                cid, text, meta = json.loads(line)
+                ids.append(cid)
+                texts.append(text)
+                metadatas.append(meta)
+        if len(ids) != vectors.shape[0] or (codes is not None and len(codes) != len(ids)):
+            raise RuntimeError(f"Local index at {path!r} is inconsistent; re-export it.")
+        return cls(ids, texts, metadatas, vectors, quantization, codes, scales, rescore_k)
+
+
+def _fingerprint(ids: Iterable[str], start: int = 0) -> int:
+    """Order-independent digest of chunk ids: extendable as rows are appended."""
+    for cid in ids:
+        start += int.from_bytes(hashlib.blake2b(cid.encode("utf-8"), digest_size=8).digest(), "big")
+    return start % 2**64
+
+
+def collection_fingerprint(collection, page_size: int = 10000) -> str:
+    """Fingerprint of the ids stored in ``collection`` (ids only, no embeddings).
+
+    Chunk ids are hashes of the chunk text, so a same-count re-ingest that
+    replaced chunks still changes it.
+    """
+    n, fp = collection.count(), 0
+    for offset in range(0, n, page_size):
+        fp = _fingerprint(collection.get(offset=offset, limit=page_size, include=[])["ids"], fp)
+    return f"{fp:016x}"
+
+
+def read_export_info(path: str) -> dict:
+    try:
+        with open(os.path.join(path, INFO_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_collection(
+    collection, path: str, page_size: int = 2000, quantization: Optional[str] = None
+) -> dict:
+    """Stream a Chroma collection into ``path`` without holding it all in memory.
+
+    ``quantization`` (default LOCAL_INDEX_QUANTIZATION) also writes the
+    int8 codes and scales, or the packed sign bits, next to the float32 rows.
+    """
+    quantization = (quantization or settings.LOCAL_INDEX_QUANTIZATION).lower()
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"LOCAL_INDEX_QUANTIZATION must be one of {QUANTIZATIONS}, got {quantization!r}")
+    os.makedirs(path, exist_ok=True)
+    n = collection.count()
+    first = collection.get(limit=1, include=["embeddings"]) if n else {"embeddings": []}
+    dim = len(first["embeddings"][0]) if n else 0
+    vec_tmp = os.path.join(path, VECTORS_FILE + ".tmp")
+    chunks_tmp = os.path.join(path, CHUNKS_FILE + ".tmp")
+    matrix = np.lib.format.open_memmap(vec_tmp, mode="w+", dtype=np.float32, shape=(n, dim))
+    shapes = {
+        "int8": {INT8_FILE: (np.int8, (n, dim)), SCALES_FILE: (np.float32, (n,))},
+        "binary": {BITS_FILE: (np.uint8, (n, (dim + 7) // 8))},
+    }.get(quantization, {})
+    codes = {
+        name: np.lib.format.open_memmap(os.path.join(path, name + ".tmp"), mode="w+", dtype=dtype, shape=shape)
+        for name, (dtype, shape) in shapes.items()
+    }
+    row, fp = 0, 0
+    with open(chunks_tmp, "w", encoding="utf-8") as f:
+        for offset in range(0, n, page_size):
+            page = collection.get(
+                offset=offset,
+                limit=page_size,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            vecs = np.asarray(page["embeddings"], dtype=np.float32)
+            if not len(vecs):
+                break
+            vecs = vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+            matrix[row : row + len(vecs)] = vecs
+            if quantization == "int8":
+                codes[INT8_FILE][row : row + len(vecs)], codes[SCALES_FILE][row : row + len(vecs)] = quantize_int8(vecs)
+            elif quantization == "binary":
+                codes[BITS_FILE][row : row + len(vecs)] = quantize_binary(vecs)
+            row += len(vecs)
+            fp = _fingerprint(page["ids"], fp)
+            for cid, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                f.write(json.dumps([cid, text or "", meta or {}], ensure_ascii=False) + "\n")
+    matrix.flush()
+    for arr in codes.values():
+        arr.flush()
+    del matrix, codes
+    if row != n:
+        raise RuntimeError(f"Collection changed during export ({row} of {n} rows read).")
+    os.replace(vec_tmp, os.path.join(path, VECTORS_FILE))
+    for name in shapes:
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+    os.replace(chunks_tmp, os.path.join(path, CHUNKS_FILE))
+    remove_ivf(path)
+    info = {
+        "collection": settings.CHROMA_COLLECTION,
+        "count": n,
+        "dim": dim,
+        "quantization": quantization,
+        "last_id": _last_id(collection, n),
+        "fingerprint": f"{fp:016x}",
+    }
+    _write_info(path, info)
+    return info
+
+
+def _write_info(path: str, info: dict) -> None:
+    with open(os.path.join(path, INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+
+
+def _last_id(collection, n: int) -> Optional[str]:
+    return collection.get(offset=n - 1, limit=1, include=[])["ids"][0] if n else None
+
+
+def _grow(path: str, name: str, rows: np.ndarray) -> None:
+    """Rewrite ``name`` with ``rows`` appended (sequential copy, old file stays valid until replaced)."""
+    old = _open(path, name)
+    tmp = os.path.join(path, name + ".tmp")
+    out = np.lib.format.open_memmap(
+        tmp, mode="w+", dtype=old.dtype, shape=(len(old) + len(rows),) + old.shape[1:]
+    )
+    for start in range(0, len(old), BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, len(old))
+        out[start:stop] = old[start:stop]
+    out[len(old) :] = rows
+    out.flush()
+    del out, old
+    os.replace(tmp, os.path.join(path, name))
+
+
+def append_collection(
+    collection, path: str, page_size: int = 2000, fingerprint: Optional[str] = None
+) -> Optional[dict]:
+    """Add chunks stored after the last export, or None if a full export is needed.
+
+    Chroma pages in insertion order, so when the export's last id is still
+    at the same offset, everything after it is new. With ``fingerprint``
+    (collection_fingerprint of the collection) nothing is written unless the
+    exported ids plus the new ones add up to it, i.e. no exported chunk was
+    replaced meanwhile. Row numbers of existing chunks are unchanged, so an
+    IVF index stays valid and only assigns the new rows.
+    """
+    info = read_export_info(path)
+    old_n, n = info.get("count"), collection.count()
+    if not old_n or n <= old_n or info.get("last_id") != _last_id(collection, old_n):
+        return None
+    if fingerprint is not None and "fingerprint" not in info:
+        return None
+    quantization = info.get("quantization", "none")
+    vec_parts, lines = [], []
+    for offset in range(old_n, n, page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["embeddings", "documents", "metadatas"])
+        vecs = np.asarray(page["embeddings"], dtype=np.float32)
+        if not len(vecs):
+            break
+        vecs = vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+        vec_parts.append(vecs)
+        for cid, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+            lines.append(json.dumps([cid, text or "", meta or {}], ensure_ascii=False) + "\n")
+    vecs = np.concatenate(vec_parts)
+    if len(vecs) != n - old_n:
+        return None
+    fp = None
+    if "fingerprint" in info:
+        fp = f"{_fingerprint((json.loads(line)[0] for line in lines), int(info['fingerprint'], 16)):016x}"
+    if fingerprint is not None and fp != fingerprint:
+        return None
+    _grow(path, VECTORS_FILE, vecs)
+    if quantization == "int8":
+        codes, scales = quantize_int8(vecs)
+        _grow(path, INT8_FILE, codes)
+        _grow(path, SCALES_FILE, scales)
+    elif quantization == "binary":
+        _grow(path, BITS_FILE, quantize_binary(vecs))
+    with open(os.path.join(path, CHUNKS_FILE), "a", encoding="utf-8") as f:
+        f.writelines(lines)
+    info.update(count=n, last_id=_last_id(collection, n))
+    if fp is not None:
+        info["fingerprint"] = fp
+    _write_info(path, info)
+    return info
+
+
+def load_local_index(collection=None) -> LocalIndex:
+    """Load the export, re-exporting (or appending new chunks) first if it is missing or stale.
+
+    The export is current when its id fingerprint matches the collection's,
+    so a re-ingest that replaced chunks without changing the count is caught.
+    """
+    path = settings.LOCAL_INDEX_PATH
+    info = read_export_info(path)
+    if collection is not None:
+        stale = (
+            info.get("collection") != settings.CHROMA_COLLECTION
+            or info.get("quantization", "none") != settings.LOCAL_INDEX_QUANTIZATION.lower()
+        )
+        fingerprint = None if stale else collection_fingerprint(collection)
+        if stale or info.get("fingerprint") != fingerprint:
+            if stale or append_collection(collection, path, fingerprint=fingerprint) is None:
+                export_collection(collection, path)
+    index = LocalIndex.load(path, rescore_k=settings.LOCAL_INDEX_RESCORE_K or settings.FETCH_K)
+    if settings.LOCAL_INDEX_ANN.lower() == "ivf" and len(index):
+        index.ann = load_or_build_ivf(path, index.vectors, settings.IVF_NLIST, settings.IVF_TRAIN_SAMPLE)
+        index.nprobe = settings.IVF_NPROBE
+    return index
@@ -0,0 +1,34 @@
+from typing import List
+
+import numpy as np
+
+
+def mmr_select(query_embedding, vectors, k: int, lambda_mult: float = 0.7) -> List[int]:
+    """Maximal marginal relevance: indices of ``k`` rows of ``vectors``, in pick order.
+
+    Each step scores every candidate as ``lambda * sim(query) - (1 - lambda) *
+    max sim(already picked)``. The max-similarity column is updated with one
+    matrix-vector product per pick, so the cost is O(k * n * dim) in NumPy
+    with no pairwise Python loop.
+    """
+    v = np.asarray(vectors, dtype=np.float32)
+    n = len(v)
+    if n == 0 or k <= 0:
+        return []
+    v = v / (np.linalg.norm(v, axis=1, keepdims=True) + 1e-12)
+    q = np.asarray(query_embedding, dtype=np.float32)
+    q = q / (np.linalg.norm(q) or 1.0)
+    relevance = v @ q
+    k = min(k, n)
+    picked = [int(np.argmax(relevance))]
+    max_sim = v @ v[picked[0]]
+    chosen = np.zeros(n, dtype=bool)
+    chosen[picked[0]] = True
+    while len(picked) < k:
+        score = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        score[chosen] = -np.inf
+        best = int(np.argmax(score))
+        picked.append(best)
+        chosen[best] = True
+        np.maximum(max_sim, v @ v[best], out=max_sim)
+    return picked
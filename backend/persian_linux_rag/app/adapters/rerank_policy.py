@@ -0,0 +1,98 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.textnorm import tokenize
+
+
+@dataclass
+class RerankPlan:
+    decision: str  # "full" | "shortlist" | "skip_margin" | "skip_few"
+    indices: List[int]  # candidates to send to the reranker (or, when skipped, the final order)
+
+    @property
+    def rerank(self) -> bool:
+        return not self.decision.startswith("skip")
+
+
+def _dense_scores(docs: List[Document]) -> Optional[List[float]]:
+    scores = [(d.metadata or {}).get("score") for d in docs]
+    return scores if all(isinstance(s, (int, float)) for s in scores) else None
+
+
+def lexical_overlap(query_tokens: set, text: str) -> float:
+    """Share of the query's distinct tokens that occur in ``text``."""
+    if not query_tokens:
+        return 0.0
+    return len(query_tokens & set(tokenize(text))) / len(query_tokens)
+
+
+class RerankPolicy:
+    """Decides how much of a retrieval result the remote reranker has to see.
+
+    With RERANK_ADAPTIVE off every candidate goes to the reranker, as before.
+    With it on, using the dense similarity in ``metadata["score"]``:
+
+    - a top hit that leads the runner-up by RERANK_SKIP_MARGIN is trusted and
+      the dense order is used as is (no rerank call);
+    - candidates scoring more than RERANK_SCORE_WINDOW below the top hit are
+      dropped, keeping at least RERANK_MIN_CANDIDATES;
+    - the rest are ordered by query-token overlap (RERANK_LEXICAL_PREFILTER)
+      and cut to RERANK_MAX_CANDIDATES before the remote call.
+
+    Hits without a dense score (sparse-only or LangChain retriever results)
+    are never dropped by score. Decisions are counted for /stats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._candidates = 0
+        self._sent = 0
+
+    def plan(self, question: str, docs: List[Document]) -> RerankPlan:
+        plan = self._plan(question, docs)
+        metrics.inc("rerank_decisions", decision=plan.decision)
+        with self._lock:
+            self._counts[plan.decision] = self._counts.get(plan.decision, 0) + 1
+            self._candidates += len(docs)
+            self._sent += len(plan.indices) if plan.rerank else 0
+        return plan
+
+    def _plan(self, question: str, docs: List[Document]) -> RerankPlan:
+        order = list(range(len(docs)))
+        if not settings.RERANK_ADAPTIVE:
+            return RerankPlan("full", order)
+        if len(docs) <= 1:
+            return RerankPlan("skip_few", order)
+        scores = _dense_scores(docs)
+        if scores is not None:
+            order.sort(key=lambda i: -scores[i])
+            top, second = scores[order[0]], scores[order[1]]
+            if top - second >= settings.RERANK_SKIP_MARGIN:
+                return RerankPlan("skip_margin", order)
+            keep = max(settings.RERANK_MIN_CANDIDATES, 1)
+            floor = top - settings.RERANK_SCORE_WINDOW
+            order = [i for n, i in enumerate(order) if n < keep or scores[i] >= floor]
+        if settings.RERANK_LEXICAL_PREFILTER:
+            q = set(tokenize(question))
+            overlap = {i: lexical_overlap(q, docs[i].page_content) for i in order}
+            order.sort(key=lambda i: -overlap[i])  # stable: dense order breaks ties
+        if settings.RERANK_MAX_CANDIDATES > 0:
+            order = order[: settings.RERANK_MAX_CANDIDATES]
+        if len(order) <= 1:
+            return RerankPlan("skip_few", order)
+        return RerankPlan("shortlist" if len(order) < len(docs) else "full", order)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.RERANK_ADAPTIVE,
+                "decisions": dict(self._counts),
+                "candidates": self._candidates,
+                "sent_to_reranker": self._sent,
+            }
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+
+class SingleFlight:
+    """Share one in-flight computation between callers asking for the same key.
+
+    The first caller (the leader) starts ``fn``; callers arriving before it
+    finishes wait for the same result or exception instead of starting
+    their own. Nothing is remembered afterwards; that is the answer cache's
+    job. The async computation runs as a task, so a leader whose client goes
+    away does not cancel it for the others.
+    """
+
+    def __init__(self, name: str = "answer"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, leader: bool) -> None:
+        with self._lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.followers += 1
+        metrics.inc("single_flight", flight=self.name, role="leader" if leader else "follower")
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not settings.SINGLE_FLIGHT:
+            return await fn()
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.SINGLE_FLIGHT,
+                "in_flight": len(self._tasks),
+                "leaders": self.leaders,
+                "coalesced": self.followers,
+            }
+
+
+class Broadcast:
+    """Append-only event log that any number of subscribers can follow.
+
+    A subscriber first replays everything published so far, then receives
+    new events as they arrive, until ``close``. When the last subscriber
+    leaves before ``close``, ``on_idle`` is called.
+    """
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.closed = False
+        self.subscribers = 0
+        self.on_idle: Optional[Callable[[], None]] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Any) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        """Close the iterator (``contextlib.aclosing``) so leaving is noticed at once."""
+        self.subscribers += 1
+        try:
+            seen = 0
+            while True:
+                changed = self._changed
+                while seen < len(self.events):
+                    yield self.events[seen]
+                    seen += 1
+                if self.closed:
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.closed and self.on_idle is not None:
+                self.on_idle()
+
+
+class StreamFlight(SingleFlight):
+    """Single-flight for event streams: one producer, every caller subscribes.
+
+    A producer whose subscribers have all gone away is cancelled, so nobody
+    pays for tokens no client reads.
+    """
+
+    def __init__(self, name: str = "stream"):
+        super().__init__(name)
+        self._streams: Dict[Hashable, Broadcast] = {}
+        self.abandoned = 0
+
+    def join(self, key: Hashable, produce: Callable[[Broadcast], Awaitable[None]]) -> Broadcast:
+        """The live broadcast for ``key``, starting ``produce`` if there is none."""
+        if settings.SINGLE_FLIGHT:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self._count(False)
+                return stream
+        stream = Broadcast()
+        self._count(True)
+
+        async def runner():
+            try:
+                await produce(stream)
+            finally:
+                stream.close()
+                if self._streams.get(key) is stream:
+                    del self._streams[key]
+
+        if settings.SINGLE_FLIGHT:
+            self._streams[key] = stream
+        task = asyncio.ensure_future(runner())
+        self._tasks[(key, id(task))] = task
+        task.add_done_callback(lambda t: self._tasks.pop((key, id(t)), None))
+
+        def abandon():
+            if self._streams.get(key) is stream:
+                del self._streams[key]  # a new caller starts afresh
+            self.abandoned += 1
+            metrics.inc("single_flight", flight=self.name, role="abandoned")
+            task.cancel()
+
+        stream.on_idle = abandon
+        return stream
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out["in_flight"] = len(self._streams)
+        out["abandoned"] = self.abandoned
+        return out
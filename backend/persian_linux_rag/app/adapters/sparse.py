@@ -0,0 +1,236 @@
+import json
+import math
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ..core.config import settings
+from ..core.textnorm import tokenize
+
+POSTINGS_FILE = "postings.npz"
+VOCAB_FILE = "vocab.json"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+class BM25Index:
+    """Inverted index over chunk texts with BM25 scoring.
+
+    Postings live in CSR form (``offsets`` into flat ``docs``/``tfs``
+    arrays). Documents added since the last ``compact()`` sit in a small
+    per-term delta that search merges in, so the index grows incrementally
+    without rebuilding. Removed chunks are tombstoned until compaction.
+    The per-row length norm is recomputed when rows change, not per query.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.doc_len = np.zeros(0, dtype=np.int32)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.norm = np.zeros(0, dtype=np.float32)
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self._row: Dict[str, int] = {}
+        self._delta: Dict[int, List[tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids) - int(self.deleted.sum())
+
+    def __contains__(self, chunk_id: str) -> bool:
+        row = self._row.get(chunk_id)
+        return row is not None and not self.deleted[row]
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict]) -> int:
+        """Index new chunks; ids already present are replaced."""
+        with self._lock:
+            self._tombstone([i for i in ids if i in self._row])
+            lens = []
+            for cid, text, meta in zip(ids, texts, metadatas):
+                row = len(self.ids)
+                self.ids.append(cid)
+                self.texts.append(text)
+                self.metadatas.append(meta or {})
+                self._row[cid] = row
+                counts = Counter(tokenize(text))
+                lens.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    tid = self.vocab.setdefault(term, len(self.vocab))
+                    self._delta.setdefault(tid, []).append((row, min(tf, 65535)))
+            self.doc_len = np.concatenate([self.doc_len, np.asarray(lens, dtype=np.int32)])
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(lens), dtype=bool)])
+            self._update_norm()
+            return len(lens)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._tombstone(ids)
+            self._update_norm()
+
+    def _update_norm(self) -> None:
+        # k1 * (1 - b + b * dl / avgdl); avgdl is over live rows only
+        alive = self.doc_len[~self.deleted]
+        avgdl = float(alive.mean()) if len(alive) else 1.0
+        self.norm = (self.k1 * (1.0 - self.b + self.b * self.doc_len / (avgdl or 1.0))).astype(np.float32)
+
+    def _tombstone(self, ids: Iterable[str]) -> None:
+        for cid in ids:
+            row = self._row.pop(cid, None)
+            if row is not None:
+                self.deleted[row] = True
+
+    def _postings(self, tid: int) -> tuple[np.ndarray, np.ndarray]:
+        if tid + 1 < len(self.offsets):
+            lo, hi = self.offsets[tid], self.offsets[tid + 1]
+            docs, tfs = self.docs[lo:hi], self.tfs[lo:hi]
+        else:
+            docs, tfs = self.docs[:0], self.tfs[:0]
+        extra = self._delta.get(tid)
+        if extra:
+            d, t = zip(*extra)
+            docs = np.concatenate([docs, np.asarray(d, dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(t, dtype=np.uint16)])
+        return docs, tfs
+
+    def scores(self, query: str) -> np.ndarray:
+        n_rows = len(self.ids)
+        scores = np.zeros(n_rows, dtype=np.float32)
+        live = len(self)
+        if not live:
+            return scores
+        alive = ~self.deleted
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            docs, tfs = self._postings(tid)
+            if not len(docs):
+                continue
+            df = int(alive[docs].sum())
+            idf = math.log(1.0 + (live - df + 0.5) / (df + 0.5))
+            tf = tfs.astype(np.float32)
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + self.norm[docs])
+        scores[self.deleted] = 0.0
+        return scores
+
+    def search(self, query: str, k: int) -> List[Document]:
+        with self._lock:
+            scores = self.scores(query)
+            hits = np.flatnonzero(scores > 0)
+            if not len(hits):
+                return []
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            out = []
+            for row in hits:
+                meta = dict(self.metadatas[row])
+                meta.setdefault("id", self.ids[row])
+                out.append(Document(page_content=self.texts[row], metadata=meta))
+            return out
+
+    def compact(self) -> None:
+        """Fold the delta into CSR arrays and drop tombstoned rows."""
+        with self._lock:
+            keep = np.flatnonzero(~self.deleted)
+            remap = np.full(len(self.ids), -1, dtype=np.int64)
+            remap[keep] = np.arange(len(keep))
+            offsets, docs, tfs = [0], [], []
+            for tid in range(len(self.vocab)):
+                d, t = self._postings(tid)
+                d = remap[d]
+                mask = d >= 0
+                docs.append(d[mask].astype(np.int32))
+                tfs.append(t[mask])
+                offsets.append(offsets[-1] + int(mask.sum()))
+            self.offsets = np.asarray(offsets, dtype=np.int64)
+            self.docs = np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32)
+            self.tfs = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.uint16)
+            self.doc_len = self.doc_len[keep]
+            self.deleted = np.zeros(len(keep), dtype=bool)
+            self.ids = [self.ids[i] for i in keep]
+            self.texts = [self.texts[i] for i in keep]
+            self.metadatas = [self.metadatas[i] for i in keep]
+            self._row = {cid: i for i, cid in enumerate(self.ids)}
+            self._delta = {}
+            self._update_norm()
+
+    def save(self, path: str) -> None:
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, POSTINGS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, offsets=self.offsets, docs=self.docs, tfs=self.tfs, doc_len=self.doc_len)
+        os.replace(tmp, os.path.join(path, POSTINGS_FILE))
+        with open(os.path.join(path, VOCAB_FILE), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": list(self.vocab)}, f, ensure_ascii=False)
+        with open(os.path.join(path, CHUNKS_FILE), "w", encoding="utf-8") as f:
+            for row in zip(self.ids, self.texts, self.metadatas):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, VOCAB_FILE), encoding="utf-8") as f:
+            vocab = json.load(f)
+        index = cls(k1=vocab["k1"], b=vocab["b"])
+        index.vocab = {t: i for i, t in enumerate(vocab["terms"])}
+        with np.load(os.path.join(path, POSTINGS_FILE)) as z:
+            index.offsets, index.docs, index.tfs, index.doc_len = (
+                z["offsets"], z["docs"], z["tfs"], z["doc_len"],
+            )
+        with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+            for line in f:
+                cid, text, meta = json.loads(line)
+                index.ids.append(cid)
+                index.texts.append(text)
+                index.metadatas.append(meta)
+        index.deleted = np.zeros(len(index.ids), dtype=bool)
+        index._row = {cid: i for i, cid in enumerate(index.ids)}
+        index._update_norm()
+        return index
+
+
+def sync_with_collection(index: BM25Index, collection, page_size: int = 2000) -> bool:
+    """Add chunks missing from the index and tombstone vanished ones."""
+    all_ids = set(collection.get(include=[])["ids"])
+    gone = [cid for cid in index._row if cid not in all_ids]
+    missing = [cid for cid in all_ids if cid not in index]
+    index.remove(gone)
+    for start in range(0, len(missing), page_size):
+        page = collection.get(ids=missing[start : start + page_size], include=["documents", "metadatas"])
+        index.add(page["ids"], [d or "" for d in page["documents"]], page["metadatas"])
+    return bool(gone or missing)
+
+
+def load_bm25_index(collection=None, path: Optional[str] = None) -> BM25Index:
+    path = path or settings.BM25_INDEX_PATH
+    try:
+        index = BM25Index.load(path)
+    except (OSError, ValueError, KeyError):
+        index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+    if collection is not None and sync_with_collection(index, collection):
+        index.save(path)
+    return index
+
+
+def rrf_fuse(rankings: Sequence[List[Document]], k: int, rrf_k: Optional[int] = None) -> List[Document]:
+    """Reciprocal rank fusion keyed on chunk id (falls back to the text)."""
+    rrf_k = settings.RRF_K if rrf_k is None else rrf_k
+    scores: Dict[str, float] = {}
+    first: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = (doc.metadata or {}).get("id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            first.setdefault(key, doc)
+    best = sorted(scores, key=lambda key: -scores[key])[:k]
+    return [first[key] for key in best]
@@ -1,56 +1,315 @@
-from typing import List
+import asyncio
+import math
+import time
+from typing import List, Optional
 from langchain_core.documents import Document
-from ..core.deps import get_chroma_client
+from ..core.deps import get_chroma_client, get_chroma_executor, get_components, on_chroma_executor
 from ..core.config import settings
+from ..core.metrics import metrics
+from ..ingest.manifest import read_corpus_version
+from .mmr import mmr_select
+from .sparse import rrf_fuse
 
-def retrieve_by_embedding(query_embedding: List[float], k: int) -> list[Document]:
+# (checked_at, count) for the focus collection (or all shards); refreshed at most every
+# CHROMA_COUNT_TTL seconds instead of on every query.
+_count_cache: tuple[float, int] | None = None
+# (checked_at, version) from the ingest manifest, shared by every worker and
+# kept across restarts; refreshed like the count.
+_version_cache: tuple[float, Optional[str]] | None = None
+
+
+def _available_collections() -> list[str]:
+    """Diagnostics only: called lazily when something has already failed."""
     client = get_chroma_client()
     if not client:
-        raise RuntimeError(f"Chroma client not available. CHROMA_PATH={settings.CHROMA_PATH!r}")
-
-    # List collections for diagnostics
+        return []
     try:
-        available = [c.name for c in client.list_collections()]
+        return [c.name for c in client.list_collections()]
     except Exception as e:
-        available = [f"<error listing collections: {e}>"]
+        return [f"<error listing collections: {e}>"]
+
 
+def get_collection():
+    client = get_chroma_client()
+    if not client:
+        raise RuntimeError(f"Chroma client not available. CHROMA_PATH={settings.CHROMA_PATH!r}")
     # Strict: do NOT create a new collection by accident
     try:
-        collection = client.get_collection(settings.CHROMA_COLLECTION)
+        return get_components().collection
     except Exception as e:
         raise RuntimeError(
             f"Collection '{settings.CHROMA_COLLECTION}' not found at CHROMA_PATH={settings.CHROMA_PATH!r}. "
-            f"Available: {available}. Original error: {e}"
+            f"Available: {_available_collections()}. Original error: {e}"
         )
 
-    # Sanity: count first
+
+def refresh_collection_count(collection=None) -> int:
+    """Chunks in the focus collection, or in every shard when CHROMA_SHARDS is set."""
+    global _count_cache
+    if collection is None and settings.CHROMA_SHARDS:
+        try:
+            n = sum(c.count() for c in get_components().shard_collections.values())
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed counting docs in shards {settings.CHROMA_SHARDS!r}. "
+                f"CHROMA_PATH={settings.CHROMA_PATH!r} available={_available_collections()} error={e}"
+            )
+        _count_cache = (time.monotonic(), n)
+        return n
+    collection = collection or get_collection()
     try:
         n = collection.count()
     except Exception as e:
         raise RuntimeError(
             f"Failed counting docs in collection '{settings.CHROMA_COLLECTION}'. "
-            f"CHROMA_PATH={settings.CHROMA_PATH!r} available={available} error={e}"
+            f"CHROMA_PATH={settings.CHROMA_PATH!r} available={_available_collections()} error={e}"
         )
-    if n == 0:
-        # Graceful: empty index
-        return []
+    _count_cache = (time.monotonic(), n)
+    return n
+
+
+def collection_count(collection=None) -> int:
+    if _count_cache is not None:
+        checked_at, n = _count_cache
+        if time.monotonic() - checked_at < settings.CHROMA_COUNT_TTL:
+            return n
+    return refresh_collection_count(collection)
+
+
+def reset_collection_handle() -> None:
+    """Forget only the cached handles and count; the corpus itself is unchanged."""
+    global _count_cache
+    _count_cache = None
+    get_components().reset("collection", "shard_collections")
+
+
+def corpus_version() -> Optional[str]:
+    """Changes on every ingest that changed the collection, even at the same count."""
+    global _version_cache
+    if _version_cache is not None:
+        checked_at, version = _version_cache
+        if time.monotonic() - checked_at < settings.CHROMA_COUNT_TTL:
+            return version
+    version = read_corpus_version(settings.INGEST_MANIFEST_PATH)
+    _version_cache = (time.monotonic(), version)
+    return version
+
+
+def invalidate_collection() -> None:
+    """Forget the cached handle, count, corpus version and side indices after the corpus changed."""
+    global _count_cache, _version_cache
+    _count_cache = None
+    _version_cache = None
+    get_components().reset(
+        "collection", "shard_collections", "local_index", "bm25_index", "shard_bm25_indexes"
+    )
+
+
+def _similarity(distance: float, space: str) -> float:
+    # Cohere v3 vectors are unit-norm: squared L2 = 2 - 2 cos; cosine/ip = 1 - sim
+    return 1.0 - distance / 2.0 if space == "l2" else 1.0 - distance
+
+
+def _mmr_fetch_k(k: int) -> int:
+    """Candidate pool for MMR, or 0 when plain top-k similarity is wanted."""
+    if settings.RETRIEVER_SEARCH_TYPE.lower() != "mmr" or settings.FETCH_K <= k:
+        return 0
+    return settings.FETCH_K
+
+
+def shard_specs() -> list[tuple[str, Optional[str]]]:
+    """CHROMA_SHARDS ("collection=lang,...") as (name, lang or None for every language)."""
+    specs = []
+    for item in settings.CHROMA_SHARDS.split(","):
+        name, _, lang = item.partition("=")
+        name, lang = name.strip(), lang.strip().lower()
+        if name:
+            specs.append((name, None if lang in ("", "*") else lang))
+    return specs
+
 
+def route_shards(lang: Optional[str] = None) -> list[str]:
+    """Shards worth searching for a question in ``lang``.
+
+    Shards tagged with another language are skipped; untagged shards are
+    always searched. If routing would leave nothing, every shard is searched.
+    """
+    specs = shard_specs()
+    if lang and settings.CHROMA_SHARD_ROUTING:
+        routed = [name for name, shard_lang in specs if shard_lang in (None, lang)]
+        if routed:
+            return routed
+    return [name for name, _ in specs]
+
+
+def _query_collection(collection, name: str, query_embedding: List[float], n: int, with_embeddings: bool):
+    """(docs carrying ``metadata["score"]``, their embeddings or None) from one collection."""
     try:
-        out = collection.query(query_embeddings=[query_embedding], n_results=k)
+        out = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n,
+            include=["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else []),
+        )
     except Exception as e:
+        # The handle may be stale (collection dropped/recreated); refetch next time.
+        reset_collection_handle()
         raise RuntimeError(
-            f"Chroma query failed for collection '{settings.CHROMA_COLLECTION}' at "
-            f"CHROMA_PATH={settings.CHROMA_PATH!r}. Available={available}. Original error: {e}"
+            f"Chroma query failed for collection '{name}' at "
+            f"CHROMA_PATH={settings.CHROMA_PATH!r}. Available={_available_collections()}. Original error: {e}"
         )
 
     docs = out.get("documents", [[]])[0]
     metadatas = out.get("metadatas", [[]])[0]
     ids = out.get("ids", [[]])[0]
+    distances = (out.get("distances") or [[]])[0] or []
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
     results: list[Document] = []
     for i, text in enumerate(docs):
         meta = metadatas[i] if i < len(metadatas) else {}
         if not isinstance(meta, dict):
             meta = {}
         meta.setdefault("id", ids[i] if i < len(ids) else None)
+        if i < len(distances) and distances[i] is not None:
+            meta["score"] = _similarity(distances[i], space)
         results.append(Document(page_content=text, metadata=meta))
+    vectors = out["embeddings"][0] if with_embeddings and results else None
+    return results, vectors
+
+
+def _search_shard(name: str, query_embedding: List[float], n: int, with_embeddings: bool):
+    t0 = time.perf_counter()
+    collection = get_components().shard_collections[name]
+    docs, vectors = _query_collection(collection, name, query_embedding, n, with_embeddings)
+    metrics.observe("shard_search", time.perf_counter() - t0, collection=name)
+    for d in docs:
+        d.metadata["collection"] = name
+    return docs, vectors
+
+
+def merge_shard_hits(hits: list, n: int, quota: int = 0) -> list[int]:
+    """Positions into the flattened ``hits`` of the ``n`` best by score.
+
+    ``hits`` holds one list of Documents per shard. With ``quota`` > 0 no
+    shard contributes more than ``quota`` of the first picks; remaining
+    slots are then filled by score regardless of shard.
+    """
+    flat = []
+    for shard, docs in enumerate(hits):
+        for d in docs:
+            flat.append((-(d.metadata.get("score") or 0.0), shard))
+    order = sorted(range(len(flat)), key=lambda i: flat[i])
+    if quota <= 0:
+        return order[:n]
+    taken: dict = {}
+    picked, overflow = [], []
+    for i in order:
+        shard = flat[i][1]
+        if taken.get(shard, 0) < quota:
+            taken[shard] = taken.get(shard, 0) + 1
+            picked.append(i)
+        else:
+            overflow.append(i)
+        if len(picked) == n:
+            return picked
+    return picked + overflow[: n - len(picked)]
+
+
+def _merge_shards(results: list, query_embedding: List[float], k: int, fetch_k: int) -> list[Document]:
+    hits = [docs for docs, _ in results]
+    docs = [d for shard in hits for d in shard]
+    quota = settings.CHROMA_SHARD_QUOTA
+    if not fetch_k:
+        return [docs[i] for i in merge_shard_hits(hits, k, quota)]
+    # MMR over the best fetch_k of all shards, the quota scaled to that pool
+    vectors = [v for _, vecs in results for v in (vecs if vecs is not None else [])]
+    pool = merge_shard_hits(hits, fetch_k, math.ceil(quota * fetch_k / k) if quota > 0 else 0)
+    if not pool:
+        return []
+    picked = mmr_select(query_embedding, [vectors[i] for i in pool], k, settings.MMR_LAMBDA)
+    return [docs[pool[i]] for i in picked]
+
+
+def retrieve_by_embedding(query_embedding: List[float], k: int, lang: Optional[str] = None) -> list[Document]:
+    """Top ``k`` chunks; with RETRIEVER_SEARCH_TYPE=mmr, an MMR pick from FETCH_K.
+
+    With CHROMA_SHARDS set, the shards routed for ``lang`` are searched in
+    parallel and merged by score (see ``merge_shard_hits``).
+    """
+    fetch_k = _mmr_fetch_k(k)
+    if settings.RETRIEVER_IMPL.lower() == "local":
+        index = get_components().local_index
+        if fetch_k:
+            return index.search_mmr(query_embedding, k, fetch_k, settings.MMR_LAMBDA)
+        return index.search(query_embedding, k)
+    if settings.CHROMA_SHARDS:
+        if collection_count() == 0:
+            return []
+        args = (query_embedding, fetch_k or k, bool(fetch_k))
+        shards = route_shards(lang)
+        if on_chroma_executor():
+            # waiting here on tasks queued behind this one could deadlock the pool
+            results = [_search_shard(name, *args) for name in shards]
+        else:
+            pool = get_chroma_executor()
+            results = [f.result() for f in [pool.submit(_search_shard, name, *args) for name in shards]]
+        return _merge_shards(results, query_embedding, k, fetch_k)
+    collection = get_collection()
+    if collection_count(collection) == 0:
+        # Graceful: empty index
+        return []
+
+    # one round-trip: MMR needs the candidates' embeddings, not a second fetch
+    results, vectors = _query_collection(
+        collection, settings.CHROMA_COLLECTION, query_embedding, fetch_k or k, bool(fetch_k)
+    )
+    if fetch_k and results:
+        picked = mmr_select(query_embedding, vectors, k, settings.MMR_LAMBDA)
+        results = [results[i] for i in picked]
     return results
+
+
+def retrieve_sparse(question: str, k: int, lang: Optional[str] = None) -> list[Document]:
+    """BM25 top ``k``; with CHROMA_SHARDS, each routed shard's index fused by rank.
+
+    BM25 scores depend on each index's own statistics, so shards are merged
+    with RRF rather than by score.
+    """
+    if not settings.CHROMA_SHARDS:
+        return get_components().bm25_index.search(question, k)
+    indexes = get_components().shard_bm25_indexes
+    rankings = []
+    for name in route_shards(lang):
+        docs = indexes[name].search(question, k)
+        for d in docs:
+            d.metadata["collection"] = name
+        rankings.append(docs)
+    return rrf_fuse(rankings, k)
+
+
+async def aretrieve_by_embedding(
+    query_embedding: List[float], k: int, lang: Optional[str] = None
+) -> list[Document]:
+    """Async wrapper: Chroma (and the local matmul) block, so use the bounded executor.
+
+    Shards are fanned out as one executor job each, so latency follows the
+    slowest shard rather than the sum.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_chroma_executor()
+    if settings.CHROMA_SHARDS and settings.RETRIEVER_IMPL.lower() != "local":
+        if await loop.run_in_executor(executor, collection_count) == 0:
+            return []
+        fetch_k = _mmr_fetch_k(k)
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, _search_shard, name, query_embedding, fetch_k or k, bool(fetch_k))
+                for name in route_shards(lang)
+            )
+        )
+        return _merge_shards(list(results), query_embedding, k, fetch_k)
+    return await loop.run_in_executor(executor, retrieve_by_embedding, query_embedding, k, lang)
+
+
+async def aretrieve_sparse(question: str, k: int, lang: Optional[str] = None) -> list[Document]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_chroma_executor(), retrieve_sparse, question, k, lang)
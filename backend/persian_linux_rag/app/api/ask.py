@@ -1,22 +1,39 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from ..models.schemas import AskRequest, AskResponse
-from ..core.deps import get_mode
-from ..graphs.query_chain import answer_question_lc, mock_answer
+from ..core.admission import Overloaded, retry_after_header, start_deadline
+from ..core.deps import get_components, get_mode
+from ..core.metrics import metrics, server_timing, start_request
+from ..graphs.query_chain import aanswer_question_lc, mock_answer
 import traceback, sys
 
 router = APIRouter()
 
 
 @router.post("/ask", response_model=AskResponse)
-def ask(payload: AskRequest):
+async def ask(payload: AskRequest, response: Response):
     mode = get_mode()
+    stages = start_request()
+    metrics.inc("requests", endpoint="ask")
     try:
         if mode == "mock":
             return mock_answer(payload.question, payload.top_k)
-        return answer_question_lc(question=payload.question, top_k=payload.top_k)
+        wait = get_components().admission.admit("ask")
+        if wait:
+            raise HTTPException(status_code=429, detail="rate limited", headers=retry_after_header(wait))
+        start_deadline()
+        out = await aanswer_question_lc(question=payload.question, top_k=payload.top_k)
+        if stages:
+            response.headers["Server-Timing"] = server_timing(stages)
+        return out
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(e.retry_after))
     except NotImplementedError as e:
+        metrics.inc("errors", endpoint="ask")
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
+        metrics.inc("errors", endpoint="ask")
         tb = traceback.format_exc()
         print(tb, file=sys.stderr)
         raise HTTPException(
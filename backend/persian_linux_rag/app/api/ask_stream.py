@@ -1,11 +1,25 @@
 import json
-from typing import Iterator
+import re
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Iterator, Optional
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from langchain_cohere import ChatCohere
 from langchain_core.messages import BaseMessage
+from ..adapters.singleflight import Broadcast
+from ..core.admission import Overloaded, retry_after_header, start_deadline
 from ..core.config import settings
-from ..graphs.query_chain import prepare_prompt_bundle
+from ..core.deps import get_components
+from ..core.metrics import metrics, record_stage, start_request
+from ..core.textnorm import query_key
+from ..graphs.query_chain import (
+    CacheLookup,
+    alookup_cached_answer,
+    alookup_exact_answer,
+    aprepare_prompt_bundle,
+    astore_cached_answer,
+    record_llm_usage,
+)
 
 router = APIRouter()
 
@@ -16,8 +30,93 @@ def _sse(data: str, event: str | None = None) -> str:
     return f"data: {data}\n\n"
 
 
+def _meta(citations: list, top_k: int, **extra) -> str:
+    shown = citations[:top_k]
+    meta = {"citations": shown, "used_k": len(shown), "mode": "live", **extra}
+    return _sse(json.dumps(meta), event="meta")
+
+
+class _Clock:
+    """Milliseconds since the request arrived, reported in the ``timing`` event."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: dict = {}
+        self.stages: dict[str, float] | None = None  # per-stage seconds (METRICS_ENABLED)
+
+    def mark(self, name: str) -> None:
+        self.marks.setdefault(name, round(1000 * (time.perf_counter() - self.t0), 1))
+
+    def event(self) -> str:
+        self.mark("total_ms")
+        if self.stages:
+            self.marks["stages_ms"] = {k: round(1000 * v, 1) for k, v in self.stages.items()}
+        return _sse(json.dumps(self.marks), event="timing")
+
+
+def _replay(lookup: CacheLookup, top_k: int, clock: _Clock) -> Iterator[str]:
+    """Serve a cached answer as the same meta/token/timing/done event sequence."""
+    yield _meta(lookup.entry.citations, top_k, cache=lookup.layer)
+    for piece in re.findall(r"\S+\s*|\s+", lookup.entry.answer):
+        clock.mark("ttft_ms")
+        yield _sse(piece, event="token")
+    yield clock.event()
+    yield _sse("done", event="done")
+
+
+async def _produce(question: str, out: Broadcast, cached: Optional[CacheLookup] = None) -> None:
+    """Run the pipeline once and publish raw events for every subscriber.
+
+    Events are ("cached", lookup), ("meta", citations), ("token", text),
+    ("end", None), ("overloaded", Overloaded) and ("error", message); each
+    client formats them with its own top_k and clock. ``cached`` is a hit
+    the caller already looked up.
+    """
+    try:
+        lookup = cached if cached is not None else await alookup_cached_answer(question)
+        if lookup.entry is not None:
+            out.publish(("cached", lookup))
+            return
+        bundle = await aprepare_prompt_bundle(question, lookup.embedding)
+        messages: list[BaseMessage] = bundle["messages"]
+        citations = bundle["citations"]
+    except Overloaded as e:
+        out.publish(("overloaded", e))
+        return
+    except Exception as e:
+        out.publish(("error", f"Failed to prepare context: {e}"))
+        return
+    out.publish(("meta", [c.model_dump() for c in citations]))
+
+    components = get_components()
+    llm = components.stream_llm
+    parts: list[str] = []
+    try:
+        async with components.admission.slot("llm"):
+            t_llm = time.perf_counter()
+            async for chunk in llm.astream(messages):
+                record_llm_usage(chunk)
+                # chunk.text is a method on recent langchain-core; read content.
+                txt = getattr(chunk, "content", None)
+                if not isinstance(txt, str):
+                    txt = str(chunk)
+                if txt:
+                    if not parts:
+                        record_stage("llm_first_token", time.perf_counter() - t_llm)
+                    parts.append(txt)
+                    out.publish(("token", txt))
+            record_stage("llm", time.perf_counter() - t_llm)
+        await astore_cached_answer(question, "".join(parts), citations, lookup)
+        out.publish(("end", None))
+    except Overloaded as e:
+        out.publish(("overloaded", e))
+    except Exception as e:
+        out.publish(("error", str(e)))
+
+
 @router.post("/ask/stream")
-def ask_stream(payload: dict):
+async def ask_stream(payload: dict):
+    clock = _Clock()
     question = payload.get("question")
     top_k = int(payload.get("top_k", 8))
     if not isinstance(question, str) or not question.strip():
@@ -25,42 +124,61 @@ def ask_stream(payload: dict):
             status_code=400, detail="'question' must be a non-empty string"
         )
 
-    try:
-        bundle = prepare_prompt_bundle(question)
-        messages: list[BaseMessage] = bundle["messages"]
-        citations = bundle["citations"]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to prepare context: {e}")
-
-    llm = ChatCohere(
-        model=settings.COHERE_CHAT_MODEL,
-        temperature=0.2,
-        streaming=True,
-        cohere_api_key=settings.COHERE_API_KEY,
-    )
-
-    def token_stream() -> Iterator[str]:
-        try:
-            for chunk in llm.stream(messages):
-                try:
-                    txt = (
-                        getattr(chunk, "text", None)
-                        or getattr(chunk, "content", None)
-                        or str(chunk)
-                    )
-                except Exception:
-                    txt = str(chunk)
-                if txt:
-                    yield _sse(txt, event="token")
-            meta = {
-                "citations": [c.model_dump() for c in citations[:top_k]],
-                "used_k": min(top_k, len(citations)),
-                "mode": "live",
-            }
-            yield _sse(json.dumps(meta), event="meta")
-            yield _sse("done", event="done")
-        except Exception as e:
-            err = {"error": str(e)}
-            yield _sse(json.dumps(err), event="error")
-
-    return StreamingResponse(token_stream(), media_type="text/event-stream")
+    # Shed before the 200 is sent: a rate-limited route, or no room left
+    # for another LLM stream, is cheaper to refuse than to queue. A question
+    # with a cached answer needs no LLM, so it is still served.
+    admission = get_components().admission
+    wait = admission.admit("ask_stream")
+    if wait:
+        raise HTTPException(status_code=429, detail="rate limited", headers=retry_after_header(wait))
+    cached = None
+    if admission.saturated("llm"):
+        cached = await alookup_exact_answer(question)
+    if cached is not None and cached.entry is None:
+        admission.record_shed("llm", "rejected")
+        raise HTTPException(
+            status_code=503,
+            detail="llm overloaded",
+            headers=retry_after_header(settings.ADMISSION_RETRY_AFTER_S),
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        # Open the stream before retrieval: the client gets its first byte
+        # now, citations once reranking is done, then the tokens.
+        yield ": stream open\n\n"
+        clock.mark("ttfb_ms")
+        clock.stages = start_request()
+        start_deadline()
+        metrics.inc("requests", endpoint="ask_stream")
+        # identical questions in flight share one producer; a late joiner
+        # replays the events published so far, then follows live
+        stream = get_components().stream_flights.join(
+            query_key(question), lambda out: _produce(question, out, cached)
+        )
+        # aclosing: a client that disconnects unsubscribes right away, so a
+        # producer nobody listens to any more is cancelled
+        async with aclosing(stream.subscribe()) as events:
+            async for kind, data in events:
+                if kind == "cached":
+                    for event in _replay(data, top_k, clock):
+                        yield event
+                    return
+                if kind == "error":
+                    metrics.inc("errors", endpoint="ask_stream")
+                    yield _sse(json.dumps({"error": data}), event="error")
+                    return
+                if kind == "overloaded":
+                    err = {"error": str(data), "retry_after": data.retry_after}
+                    yield _sse(json.dumps(err), event="error")
+                    return
+                if kind == "meta":
+                    clock.mark("retrieval_ms")
+                    yield _meta(data, top_k)
+                elif kind == "token":
+                    clock.mark("ttft_ms")
+                    yield _sse(data, event="token")
+                elif kind == "end":
+                    yield clock.event()
+                    yield _sse("done", event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from ..core.deps import get_components
+
+router = APIRouter()
+
+
+@router.get("/cache")
+def cache_stats():
+    cache = get_components().answer_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.delete("/cache")
+def cache_clear():
+    cache = get_components().answer_cache
+    if cache is not None:
+        cache.clear()
+    return {"ok": True}
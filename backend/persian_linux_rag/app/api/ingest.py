@@ -1,7 +1,70 @@
-from fastapi import APIRouter
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from ..core.config import settings
+from ..core.deps import get_ingest_jobs, get_mode
+from ..ingest.loaders import _is_url
 
 router = APIRouter()
 
-@router.post("/ingest")
-def ingest_stub():
-    return {"status": "queued", "note": "Ingestion will arrive in Phase 2."}
+
+class IngestRequest(BaseModel):
+    sources: Optional[List[str]] = None  # paths under INGEST_SOURCES; defaults to all of it
+    dry_run: bool = False  # report the diff against the manifest, write nothing
+
+
+def _configured_sources() -> List[str]:
+    return [s.strip() for s in settings.INGEST_SOURCES.split(",") if s.strip()]
+
+
+def _allowed_source(source: str) -> str:
+    """``source`` spelled under its INGEST_SOURCES root, or a 400.
+
+    The endpoint must not become an arbitrary file read or a proxy for
+    fetching URLs, so requests may only narrow the configured local roots.
+    """
+    if _is_url(source):
+        raise HTTPException(status_code=400, detail=f"URL sources are not accepted: {source!r}")
+    real = os.path.realpath(source)
+    for root in _configured_sources():
+        if _is_url(root):
+            continue
+        real_root = os.path.realpath(root)
+        if real == real_root:
+            return root
+        if real.startswith(os.path.join(real_root, "")):
+            # keep the manifest keys a run over ``root`` itself would use
+            return os.path.join(root, os.path.relpath(real, real_root))
+    raise HTTPException(status_code=400, detail=f"Source is outside INGEST_SOURCES: {source!r}")
+
+
+@router.post("/ingest", status_code=202)
+def ingest(payload: Optional[IngestRequest] = None):
+    payload = payload or IngestRequest()
+    if not payload.dry_run and (get_mode() != "live" or not settings.COHERE_API_KEY):
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion needs MODE=live and COHERE_API_KEY to embed chunks.",
+        )
+    if payload.sources:
+        sources = [_allowed_source(s) for s in payload.sources]
+    else:
+        sources = _configured_sources()
+    job = get_ingest_jobs().submit(sources, dry_run=payload.dry_run)
+    return job.to_dict()
+
+
+@router.get("/ingest")
+def ingest_jobs():
+    return {"jobs": [job.to_dict() for job in get_ingest_jobs().list()]}
+
+
+@router.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    job = get_ingest_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id!r}")
+    return job.to_dict()
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..core.config import settings
+from ..core.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of stage latencies and counters."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("# metrics disabled (METRICS_ENABLED=false)\n")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from ..core.deps import get_chroma_client
 from ..core.config import settings
+from ..adapters.vectordb import shard_specs
 
 router = APIRouter()
 
@@ -31,6 +32,7 @@ def sources():
         return {
             "path": settings.CHROMA_PATH,
             "collection": settings.CHROMA_COLLECTION,
+            "shards": [{"name": name, "lang": lang} for name, lang in shard_specs()],
             "available": items,
             "focus_count": focus_count,
         }
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from ..core.deps import get_components
+
+router = APIRouter()
+
+
+@router.get("/stats")
+def stats():
+    """Runtime counters for components that have been built (nothing is built here)."""
+    built = get_components().__dict__
+    out = {}
+    embedder = built.get("embedder")
+    if embedder is not None:
+        if hasattr(embedder, "stats"):
+            out["query_embeddings"] = embedder.stats()
+        batcher = getattr(getattr(embedder, "base", None), "batcher", None)
+        if batcher is not None:
+            out["embed_batching"] = batcher.stats()
+    if built.get("rerank_batcher") is not None:
+        out["rerank_batching"] = built["rerank_batcher"].stats()
+    if built.get("rerank_policy") is not None:
+        out["rerank_policy"] = built["rerank_policy"].stats()
+    if built.get("admission") is not None:
+        out["admission"] = built["admission"].stats()
+    for name in ("flights", "stream_flights"):
+        if built.get(name) is not None:
+            out[f"single_flight_{built[name].name}"] = built[name].stats()
+    if built.get("answer_cache") is not None:
+        out["answer_cache"] = built["answer_cache"].stats()
+    return out
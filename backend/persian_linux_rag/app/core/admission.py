@@ -0,0 +1,208 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from .config import settings
+from .metrics import metrics
+
+STAGES = ("embed", "rerank", "llm")
+
+# monotonic time by which the current request should be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("admission_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """A stage could not be entered in time; the request should be shed."""
+
+    def __init__(self, stage: str, reason: str, retry_after: float):
+        super().__init__(f"{stage} overloaded ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def start_deadline() -> None:
+    """Start the ADMISSION_DEADLINE_S clock for this request."""
+    _deadline.set(time.monotonic() + settings.ADMISSION_DEADLINE_S)
+
+
+def remaining() -> float:
+    deadline = _deadline.get()
+    if deadline is None:
+        return settings.ADMISSION_DEADLINE_S
+    return max(0.0, deadline - time.monotonic())
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class StageLimiter:
+    """At most ``limit`` calls in a stage, at most ``max_queue`` waiting (FIFO).
+
+    Callers wait only until the request deadline; a full queue or a missed
+    deadline raises ``Overloaded`` instead of letting latency pile up. A
+    released slot is handed straight to the next waiter.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_in_flight", self.active, stage=self.name)
+        metrics.set_gauge("admission_queue_depth", len(self._waiters), stage=self.name)
+
+    async def acquire(self, timeout: float) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._publish()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded(self.name, "queue full", settings.ADMISSION_RETRY_AFTER_S)
+        if timeout <= 0:
+            raise Overloaded(self.name, "deadline", settings.ADMISSION_RETRY_AFTER_S)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._publish()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                self.release()  # the slot arrived as we gave up: pass it on
+            else:
+                fut.cancel()
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            self._publish()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Overloaded(self.name, "deadline", settings.ADMISSION_RETRY_AFTER_S) from None
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # slot transferred; active count unchanged
+                self._publish()
+                return
+        self.active -= 1
+        self._publish()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.active, "queued": len(self._waiters)}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """0 if a token was taken, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate if self.rate > 0 else float(settings.ADMISSION_RETRY_AFTER_S)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, TokenBucket]:
+    """RATE_LIMITS ("route=rate:burst,...") as one bucket per route."""
+    buckets = {}
+    for item in spec.split(","):
+        route, _, limit = item.partition("=")
+        if not route.strip() or not limit.strip():
+            continue
+        rate, _, burst = limit.partition(":")
+        buckets[route.strip()] = TokenBucket(float(rate), float(burst or rate))
+    return buckets
+
+
+class Admission:
+    """Per-route rate limits and per-stage concurrency limits for the live pipeline.
+
+    Everything is a no-op while ADMISSION_ENABLED is off. Cache hits never
+    take a stage slot, so cached answers are still served under overload.
+    """
+
+    def __init__(self):
+        self.stages = {
+            name: StageLimiter(
+                name,
+                getattr(settings, f"{name.upper()}_MAX_CONCURRENCY"),
+                getattr(settings, f"{name.upper()}_MAX_QUEUE"),
+            )
+            for name in STAGES
+        }
+        self.buckets = parse_rate_limits(settings.RATE_LIMITS)
+        self._lock = threading.Lock()
+        self.shed: Dict[str, int] = {}
+
+    def record_shed(self, stage: str, action: str) -> None:
+        key = f"{stage}:{action}"
+        with self._lock:
+            self.shed[key] = self.shed.get(key, 0) + 1
+        metrics.inc("shed", stage=stage, action=action)
+
+    def admit(self, route: str) -> float:
+        """0 if ``route`` may proceed, else the Retry-After in seconds."""
+        bucket = self.buckets.get(route) if settings.ADMISSION_ENABLED else None
+        wait = bucket.take() if bucket is not None else 0.0
+        if wait:
+            self.record_shed(route, "rate_limited")
+        return wait
+
+    def saturated(self, stage: str) -> bool:
+        """Whether a new request would be turned away at ``stage`` right now."""
+        limiter = self.stages[stage]
+        return (
+            settings.ADMISSION_ENABLED
+            and limiter.active >= limiter.limit
+            and limiter.queued >= limiter.max_queue
+        )
+
+    @asynccontextmanager
+    async def slot(self, stage: str) -> AsyncIterator[None]:
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        limiter = self.stages[stage]
+        try:
+            await limiter.acquire(remaining())
+        except Overloaded as e:
+            self.record_shed(stage, e.reason.replace(" ", "_"))
+            raise
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            shed = dict(self.shed)
+        return {
+            "enabled": settings.ADMISSION_ENABLED,
+            "stages": {name: limiter.stats() for name, limiter in self.stages.items()},
+            "shed": shed,
+        }
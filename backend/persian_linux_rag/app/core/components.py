@@ -0,0 +1,201 @@
+import os
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
+from langchain_cohere import ChatCohere
+from .config import settings
+from .deps import (
+    get_async_cohere_client,
+    get_chroma_client,
+    get_cohere_client,
+    pooled_cohere_clients,
+)
+
+if TYPE_CHECKING:
+    from ..adapters.embeddings_lc import CachingQueryEmbedder
+
+
+def _pooled(model):
+    model.client, model.async_client = pooled_cohere_clients()
+    return model
+
+
+class Components:
+    """Clients and the compiled chain, built once per process and reused.
+
+    Every attribute is built on first access, so mock mode never touches
+    Cohere or Chroma. The FastAPI lifespan calls ``warm_up()`` in live mode
+    so the first request does not pay the construction cost. Keyword
+    arguments pre-seed attributes (handy for tests and benchmarks).
+    """
+
+    def __init__(self, **overrides: Any):
+        self.__dict__.update(overrides)
+
+    @cached_property
+    def embedder(self) -> "CachingQueryEmbedder":
+        from ..adapters.embeddings_lc import (
+            get_cached_query_embedder,
+            get_query_embedder,
+        )
+
+        return get_cached_query_embedder(_pooled(get_query_embedder()))
+
+    @cached_property
+    def llm(self) -> ChatCohere:
+        llm = ChatCohere(
+            model=settings.COHERE_CHAT_MODEL,
+            temperature=0.2,
+            cohere_api_key=settings.COHERE_API_KEY,
+            base_url=settings.COHERE_BASE_URL,
+        )
+        return _pooled(llm)
+
+    @cached_property
+    def stream_llm(self) -> ChatCohere:
+        llm = ChatCohere(
+            model=settings.COHERE_CHAT_MODEL,
+            temperature=0.2,
+            streaming=True,
+            cohere_api_key=settings.COHERE_API_KEY,
+            base_url=settings.COHERE_BASE_URL,
+        )
+        return _pooled(llm)
+
+    @cached_property
+    def rerank_client(self):
+        return get_cohere_client()
+
+    @cached_property
+    def async_rerank_client(self):
+        return get_async_cohere_client()
+
+    @cached_property
+    def rerank_batcher(self):
+        from ..adapters.cohere_client import build_rerank_batcher
+
+        return build_rerank_batcher()
+
+    @cached_property
+    def rerank_policy(self):
+        from ..adapters.rerank_policy import RerankPolicy
+
+        return RerankPolicy()
+
+    @cached_property
+    def admission(self):
+        from .admission import Admission
+
+        return Admission()
+
+    @cached_property
+    def flights(self):
+        from ..adapters.singleflight import SingleFlight
+
+        return SingleFlight("answer")
+
+    @cached_property
+    def stream_flights(self):
+        from ..adapters.singleflight import StreamFlight
+
+        return StreamFlight("stream")
+
+    @cached_property
+    def chroma_client(self):
+        return get_chroma_client()
+
+    @cached_property
+    def collection(self):
+        # Raises (and so is not cached) while the collection is missing.
+        client = self.chroma_client
+        if not client:
+            raise RuntimeError("Chroma client not available")
+        return client.get_collection(settings.CHROMA_COLLECTION)
+
+    @cached_property
+    def shard_collections(self) -> dict:
+        """CHROMA_SHARDS collections by name; raises while any is missing."""
+        from ..adapters.vectordb import shard_specs
+
+        client = self.chroma_client
+        if not client:
+            raise RuntimeError("Chroma client not available")
+        return {name: client.get_collection(name) for name, _ in shard_specs()}
+
+    @cached_property
+    def local_index(self):
+        from ..adapters.local_index import load_local_index
+
+        return load_local_index(self.collection)
+
+    @cached_property
+    def bm25_index(self):
+        from ..adapters.sparse import load_bm25_index
+
+        return load_bm25_index(self.collection)
+
+    @cached_property
+    def shard_bm25_indexes(self) -> dict:
+        """One BM25 index per CHROMA_SHARDS collection, under BM25_INDEX_PATH/<name>."""
+        from ..adapters.sparse import load_bm25_index
+
+        return {
+            name: load_bm25_index(collection, os.path.join(settings.BM25_INDEX_PATH, name))
+            for name, collection in self.shard_collections.items()
+        }
+
+    @cached_property
+    def lc_retriever(self):
+        from ..graphs.query_chain import _make_lc_retriever
+
+        return _make_lc_retriever(self.embedder)
+
+    @cached_property
+    def answer_cache(self):
+        from ..adapters.answer_cache import build_answer_cache
+
+        return build_answer_cache()
+
+    @cached_property
+    def chain(self):
+        from ..graphs.query_chain import build_chain
+
+        return build_chain(self.llm)
+
+    def reset(self, *names: str) -> None:
+        """Drop cached attributes so they are rebuilt on next access."""
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    def close(self) -> None:
+        """Flush state worth keeping across restarts."""
+        embedder = self.__dict__.get("embedder")
+        if hasattr(embedder, "save"):
+            embedder.save()
+
+    def warm_up(self) -> None:
+        self.embedder
+        self.llm
+        self.stream_llm
+        self.rerank_client
+        self.async_rerank_client
+        self.rerank_batcher
+        try:
+            from ..adapters.vectordb import refresh_collection_count
+
+            if settings.CHROMA_SHARDS:
+                refresh_collection_count()
+            else:
+                refresh_collection_count(self.collection)
+        except Exception:
+            pass  # reported on the first query instead
+        if settings.RETRIEVER_IMPL.lower() == "lc":
+            self.lc_retriever
+        if settings.RETRIEVER_IMPL.lower() == "local":
+            self.local_index
+        if settings.HYBRID_SEARCH:
+            if settings.CHROMA_SHARDS:
+                self.shard_bm25_indexes
+            else:
+                self.bm25_index
+        self.answer_cache
+        self.chain
@@ -13,18 +13,107 @@ class Settings(BaseSettings):
     COHERE_CHAT_MODEL: str = "command-r-08-2024"
     COHERE_EMBED_MODEL: str = "embed-multilingual-v3.0"
     COHERE_RERANK_MODEL: str = "rerank-multilingual-v3.0"
+    COHERE_BASE_URL: str | None = None  # override for proxies / local fakes
+    HTTP_MAX_CONNECTIONS: int = 20
+    COHERE_TIMEOUT: float = 300.0  # seconds per request (long generations included)
 
     # Chroma
     CHROMA_PATH: str = "./collections/llm_corpus"
     CHROMA_COLLECTION: str = "llm_corpus"
+    CHROMA_COUNT_TTL: float = 60.0  # seconds between emptiness re-checks
+    CHROMA_MAX_WORKERS: int = 8  # bounded executor for blocking Chroma calls
+
+    # Sharded retrieval (raw retriever): search several collections in parallel
+    CHROMA_SHARDS: str = ""  # e.g. "stallman_org=en,wikipedia_fa=fa,linuxbook"; empty = CHROMA_COLLECTION only
+    CHROMA_SHARD_ROUTING: bool = True  # skip shards tagged with another language than the question's
+    CHROMA_SHARD_QUOTA: int = 0  # max hits per shard in the merged top-k before backfill; 0 = no cap
 
     # RAG knobs
     RETRIEVE_K: int = 12
     FETCH_K: int = 60
     RERANK_TOP_N: int = 6
 
-    RETRIEVER_IMPL: str = "raw"  # "raw" | "lc"
-    RETRIEVER_SEARCH_TYPE: str = "mmr"  # "mmr" | "similarity"
+    # Adaptive reranking: skip or shrink the rerank call when retrieval is confident
+    RERANK_ADAPTIVE: bool = False
+    RERANK_SKIP_MARGIN: float = 0.15  # top-1 minus top-2 dense similarity
+    RERANK_SCORE_WINDOW: float = 0.2  # drop hits scoring this far below the top one
+    RERANK_MIN_CANDIDATES: int = 4
+    RERANK_MAX_CANDIDATES: int = 8  # 0 = no cap
+    RERANK_LEXICAL_PREFILTER: bool = True  # order the shortlist by query-token overlap
+
+    # Context packing: merge overlapping chunks, drop near-duplicates, trim to budget
+    CONTEXT_TOKEN_BUDGET: int = 3000  # estimated tokens; 0 = unlimited
+    CONTEXT_TOKEN_BUDGETS: str = ""  # per chat model, e.g. "command-r-08-2024=3000,command-r7b-12-2024=1500"
+    CONTEXT_DEDUP_THRESHOLD: float = 0.9  # shingle containment; >= 1 disables
+    CONTEXT_MIN_PASSAGE_TOKENS: int = 64  # don't add a trimmed tail shorter than this
+
+    RETRIEVER_IMPL: str = "raw"  # "raw" | "lc" | "local"
+    LOCAL_INDEX_PATH: str = "./collections/local_index"  # RETRIEVER_IMPL=local export
+    LOCAL_INDEX_QUANTIZATION: str = "none"  # "none" | "int8" | "binary" first pass over compact codes
+    LOCAL_INDEX_RESCORE_K: int = 0  # candidates rescored in float32 after that pass; 0 = FETCH_K
+    LOCAL_INDEX_ANN: str = "none"  # "none" | "ivf" (approximate, for million-chunk corpora)
+    IVF_NLIST: int = 0  # k-means lists; 0 = 4 * sqrt(chunks)
+    IVF_NPROBE: int = 16  # lists scanned per query: higher = better recall, slower
+    IVF_TRAIN_SAMPLE: int = 100_000  # rows sampled to train the centroids
+    RETRIEVER_SEARCH_TYPE: str = "mmr"  # "mmr" | "similarity" (all retriever impls)
+    MMR_LAMBDA: float = 0.7  # 1 = pure relevance, 0 = max diversity
+
+    # Hybrid retrieval: BM25 over chunk text fused with dense hits (RRF)
+    HYBRID_SEARCH: bool = False
+    BM25_INDEX_PATH: str = "./collections/bm25_index"  # with CHROMA_SHARDS, one subdirectory per shard
+    SPARSE_K: int = 12
+    RRF_K: int = 60
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+
+    # Ingestion (POST /ingest)
+    INGEST_SOURCES: str = "../data"  # comma-separated files, directories or URLs
+    INGEST_CHUNK_SIZE: int = 1200
+    INGEST_CHUNK_OVERLAP: int = 150
+    INGEST_WORKERS: int = 1  # processes for normalize + split; 0 = one per CPU
+    INGEST_UNIT_PAGES: int = 64  # pages per process-pool work unit
+    INGEST_EMBED_BATCH: int = 96  # Cohere accepts up to 96 texts per embed call
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_MAX_RETRIES: int = 6
+    INGEST_BACKOFF_BASE: float = 2.0  # seconds, doubled per attempt
+    INGEST_MANIFEST_PATH: str = "./collections/ingest_manifest.sqlite3"
+    INGEST_STREAM_FLUSH_DOCS: int = 16  # crawler --ingest: pages per flush
+    INGEST_STREAM_FLUSH_S: float = 2.0  # ... or max seconds a page waits
+
+    # Micro-batching of concurrent embed / rerank calls (max <= 1 disables)
+    EMBED_BATCH_MAX: int = 32
+    EMBED_BATCH_WAIT_MS: float = 5.0
+    RERANK_BATCH_MAX: int = 16
+    RERANK_BATCH_WAIT_MS: float = 5.0
+
+    # Query-embedding cache (keyed on the Persian-normalized question)
+    QUERY_EMBED_CACHE_SIZE: int = 10000
+    QUERY_EMBED_CACHE_PATH: str | None = None  # e.g. ./cache/query_embeddings.npz
+
+    # Admission control for the live /ask and /ask/stream pipeline (load shedding)
+    ADMISSION_ENABLED: bool = False
+    ADMISSION_DEADLINE_S: float = 20.0  # a request waits for stage slots at most this long in total
+    ADMISSION_RETRY_AFTER_S: float = 2.0  # Retry-After sent with 503s
+    EMBED_MAX_CONCURRENCY: int = 16
+    EMBED_MAX_QUEUE: int = 64
+    RERANK_MAX_CONCURRENCY: int = 8
+    RERANK_MAX_QUEUE: int = 16  # past this (or the deadline) rerank is skipped, not waited for
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_QUEUE: int = 32
+    RATE_LIMITS: str = ""  # per route "requests/s:burst", e.g. "ask=5:20,ask_stream=5:20"
+
+    # Request coalescing: identical (normalized) in-flight questions share one pipeline run
+    SINGLE_FLIGHT: bool = True
+
+    # Instrumentation: /metrics, Server-Timing on /ask, stage timings in /ask/stream
+    METRICS_ENABLED: bool = False
+
+    # Answer cache
+    ANSWER_CACHE_BACKEND: str = "memory"  # "memory" | "sqlite" | "off"
+    ANSWER_CACHE_PATH: str = "./cache/answers.sqlite3"
+    ANSWER_CACHE_MAX_ENTRIES: int = 2000
+    ANSWER_CACHE_TTL: float = 24 * 3600.0  # seconds; 0 = no expiry
+    ANSWER_CACHE_SIM_THRESHOLD: float = 1.0  # cosine; >= 1 disables the semantic layer (opt in, e.g. 0.95)
 
 
 settings = Settings()
@@ -1,11 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .config import settings
 
 _cohere_client = None
+_async_cohere_client = None
+_http_clients = None
+_pooled_clients = None
 _chroma_client = None
+_chroma_executor = None
+_chroma_thread = threading.local()
+_components = None
+_ingest_jobs = None
 
 def get_mode() -> str:
     return (settings.MODE or "mock").lower()
 
+def _http_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+    )
+
+def _shared_http():
+    """(sync, async) httpx clients behind every Cohere client in this process."""
+    global _http_clients
+    if _http_clients is None:
+        import httpx
+        _http_clients = (
+            httpx.Client(limits=_http_limits(), timeout=settings.COHERE_TIMEOUT),
+            httpx.AsyncClient(limits=_http_limits(), timeout=settings.COHERE_TIMEOUT),
+        )
+    return _http_clients
+
+def _cohere_kwargs() -> dict:
+    # timeout and client_name as langchain-cohere sets them on its own clients
+    kw = {
+        "api_key": settings.COHERE_API_KEY,
+        "timeout": settings.COHERE_TIMEOUT,
+        "client_name": "langchain:partner",
+    }
+    if settings.COHERE_BASE_URL:
+        kw["base_url"] = settings.COHERE_BASE_URL
+    return kw
+
+def pooled_cohere_clients():
+    """(sync, async) Cohere v1 SDK clients on one pooled httpx pair per process.
+
+    langchain-cohere builds its own clients with httpx defaults; the registry
+    swaps these in so LLM and embedding calls share HTTP_MAX_CONNECTIONS.
+    """
+    global _pooled_clients
+    if _pooled_clients is None:
+        import cohere
+        http, ahttp = _shared_http()
+        _pooled_clients = (
+            cohere.Client(**_cohere_kwargs(), httpx_client=http),
+            cohere.AsyncClient(**_cohere_kwargs(), httpx_client=ahttp),
+        )
+    return _pooled_clients
+
 def get_cohere_client():
     global _cohere_client
     if _cohere_client is not None:
@@ -14,11 +68,25 @@ def get_cohere_client():
         return None
     try:
         import cohere
-        _cohere_client = cohere.ClientV2(api_key=settings.COHERE_API_KEY)
+        # The same pooled HTTP client as the LLM and embedding calls.
+        _cohere_client = cohere.ClientV2(**_cohere_kwargs(), httpx_client=_shared_http()[0])
         return _cohere_client
     except Exception:
         return None
 
+def get_async_cohere_client():
+    global _async_cohere_client
+    if _async_cohere_client is not None:
+        return _async_cohere_client
+    if not settings.COHERE_API_KEY:
+        return None
+    try:
+        import cohere
+        _async_cohere_client = cohere.AsyncClientV2(**_cohere_kwargs(), httpx_client=_shared_http()[1])
+        return _async_cohere_client
+    except Exception:
+        return None
+
 def get_chroma_client():
     global _chroma_client
     if _chroma_client is not None:
@@ -29,3 +97,50 @@ def get_chroma_client():
         return _chroma_client
     except Exception:
         return None
+
+def _mark_chroma_thread():
+    _chroma_thread.active = True
+
+def on_chroma_executor() -> bool:
+    """True on a chroma executor thread: blocking on another of its tasks there can deadlock."""
+    return getattr(_chroma_thread, "active", False)
+
+def get_chroma_executor() -> ThreadPoolExecutor:
+    """Bounded pool for blocking Chroma calls made from async handlers."""
+    global _chroma_executor
+    if _chroma_executor is None:
+        _chroma_executor = ThreadPoolExecutor(
+            max_workers=settings.CHROMA_MAX_WORKERS,
+            thread_name_prefix="chroma",
+            initializer=_mark_chroma_thread,
+        )
+    return _chroma_executor
+
+def get_ingest_jobs():
+    """Background ingestion job registry (one worker thread)."""
+    global _ingest_jobs
+    if _ingest_jobs is None:
+        from ..ingest.jobs import IngestJobs
+        _ingest_jobs = IngestJobs()
+    return _ingest_jobs
+
+def get_components():
+    """Process-wide component registry (see core/components.py)."""
+    global _components
+    if _components is None:
+        from .components import Components
+        _components = Components()
+    return _components
+
+def init_components(warm: bool = False):
+    """Create a fresh registry; with warm=True build every live component now."""
+    global _components
+    from .components import Components
+    _components = Components()
+    if warm:
+        _components.warm_up()
+    return _components
+
+def reset_components() -> None:
+    global _components
+    _components = None
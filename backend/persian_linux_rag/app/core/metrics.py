@@ -0,0 +1,159 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from .config import settings
+
+# seconds; covers a cached embedding (sub-ms) up to a long LLM answer
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "rag_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# per-request stage breakdown (seconds), set by the /ask handlers
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Process-wide counters, gauges and latency histograms in Prometheus text format.
+
+    Every entry point returns immediately when METRICS_ENABLED is off, so
+    instrumented hot paths pay one attribute lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+            snapshot = [(key, list(h.counts), h.sum, h.count) for key, h in histograms]
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_fmt(labels)} {value:g}")
+        for (name, labels), value in gauges:
+            metric = f"{PREFIX}{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{_fmt(labels)} {value:g}")
+        for (name, labels), counts, total, count in snapshot:
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = _fmt(labels, f'le="{le}"')
+                lines.append(f"{metric}_bucket{bucket} {cumulative}")
+            lines.append(f"{metric}_sum{_fmt(labels)} {total:.6f}")
+            lines.append(f"{metric}_count{_fmt(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Histogram ``rag_stage_seconds{stage=...}`` plus the current request's breakdown."""
+    if not settings.METRICS_ENABLED:
+        return
+    metrics.observe("stage", seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - t0)
+
+
+def start_request() -> Optional[Dict[str, float]]:
+    """Begin collecting a stage breakdown for this request (None when disabled)."""
+    if not settings.METRICS_ENABLED:
+        return None
+    stages: Dict[str, float] = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def server_timing(stages: Dict[str, float]) -> str:
+    """``Server-Timing`` header value, durations in milliseconds."""
+    return ", ".join(f"{name};dur={1000 * sec:.1f}" for name, sec in stages.items())
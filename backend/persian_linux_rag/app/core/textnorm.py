@@ -0,0 +1,128 @@
+import re
+import unicodedata
+
+# Character tables ported from the ingestion notebook so queries and
+# documents are normalized the same way.
+CHAR_FIXES = {
+    "ي": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "ﻻ": "لا",
+    "ͷ": "ک",
+    "\u0345": "ی",
+    "\u036c": "ی",
+    "ͽ": "،",
+    "“": "«",
+    "”": "»",
+    "‘": "'",
+    "’": "'",
+    "‐": "-",
+    "\u0379": "",
+    "˼": "",
+    "ʿ": "ع",
+    "ˁ": "ع",
+    "ˀ": "ء",
+}
+WS_EQUIVS = {
+    "\u00a0": " ",
+    "\u202f": " ",
+    "\u2000": " ",
+    "\u2001": " ",
+    "\u2002": " ",
+    "\u2003": " ",
+    "\u2004": " ",
+    "\u2005": " ",
+    "\u2006": " ",
+    "\u2007": " ",
+    "\u2008": " ",
+    "\u2009": " ",
+    "\u200a": " ",
+    "\u2060": " ",
+    "\u00ad": "",
+}
+FORMAT_CHARS = "".join(
+    [
+        "\u200e",
+        "\u200f",
+        "\u202a",
+        "\u202b",
+        "\u202d",
+        "\u202e",
+        "\u202c",
+        "\u2066",
+        "\u2067",
+        "\u2068",
+        "\u2069",
+        "\ufeff",
+    ]
+)
+ZWNJ = "\u200c"
+
+# One translate() pass instead of a replace() per table entry.
+TRANSLATE_TABLE = str.maketrans(
+    {
+        **WS_EQUIVS,
+        **{ch: None for ch in FORMAT_CHARS},
+        **CHAR_FIXES,
+    }
+)
+PERSIAN_DIACRITICS = re.compile(r"[\u064b-\u065f\u0670\u06d6-\u06ed]")
+_ZWNJ_RUNS = re.compile(r"\s*\u200c[\s\u200c]*")
+_SPACES = re.compile(r"\s+")
+_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+_EDGE_PUNCT = re.compile(r"^[\s.,:;!?؟،؛«»\"'()]+|[\s.,:;!?؟،؛«»\"'()]+$")
+
+
+def normalize_persian(text: str) -> str:
+    """Fold letter variants, unify ZWNJ/whitespace and strip diacritics."""
+    text = unicodedata.normalize("NFKC", text).translate(TRANSLATE_TABLE)
+    text = PERSIAN_DIACRITICS.sub("", text)
+    # a ZWNJ next to a space (or repeated) carries no information
+    text = _ZWNJ_RUNS.sub(lambda m: " " if m.group(0).strip(ZWNJ) else ZWNJ, text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def query_key(text: str) -> str:
+    """Exact-match key for a question: normalized, case/digit folded."""
+    text = normalize_persian(text).casefold().translate(_DIGITS)
+    return _EDGE_PUNCT.sub("", text.replace(ZWNJ, " "))
+
+
+# Latin identifiers keep flags and inner punctuation: --recursive, systemd-resolved,
+# python3.11, g++. Persian words keep their ZWNJ so compounds can be split below.
+_TOKEN = re.compile(
+    r"(?:--?)?[a-z0-9_]+(?:[.\-+/][a-z0-9_]+)*\+*"
+    r"|[\u0621-\u064a\u066e-\u06d3\u06d5\u06fa-\u06ff\u200c]+"
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Search tokens for mixed Persian/English text (BM25, lexical overlap).
+
+    Compounds are indexed whole and by part: "systemd-resolved" also yields
+    "systemd" and "resolved"; "نرم\u200cافزار" yields "نرمافزار", "نرم", "افزار".
+    """
+    text = normalize_persian(text).casefold().translate(_DIGITS)
+    out: list[str] = []
+    for tok in _TOKEN.findall(text):
+        if tok[0] == ZWNJ or tok[-1] == ZWNJ:
+            tok = tok.strip(ZWNJ)
+            if not tok:
+                continue
+        if ZWNJ in tok:
+            parts = [p for p in tok.split(ZWNJ) if p]
+            out.append("".join(parts))
+            out.extend(parts)
+            continue
+        out.append(tok)
+        bare = tok.lstrip("-")
+        if bare != tok:
+            out.append(bare)
+        if any(c in bare for c in ".-/"):
+            out.extend(p for p in re.split(r"[.\-/]", bare) if p)
+    return out
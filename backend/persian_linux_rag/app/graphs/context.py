@@ -0,0 +1,142 @@
+import math
+import re
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from ..core.config import settings
+
+# Rough BPE-style estimate without a tokenizer round-trip: ASCII words cost
+# about one token per 4 chars, Persian/Arabic script about one per 3, and
+# every punctuation mark one. Errs high, so the budget is rarely overrun.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?؟؛\n]")
+MERGE_GAP = 2  # chars the splitter may strip between two adjacent chunks
+
+
+def estimate_tokens(text: str) -> int:
+    total = 0
+    for m in _TOKEN_RE.finditer(text):
+        word = m.group()
+        total += math.ceil(len(word) / (4 if word.isascii() else 3))
+    return total
+
+
+def context_token_budget(model: Optional[str] = None) -> int:
+    """CONTEXT_TOKEN_BUDGETS ("model=tokens,...") entry for ``model``, else the default."""
+    model = model or settings.COHERE_CHAT_MODEL
+    for item in settings.CONTEXT_TOKEN_BUDGETS.split(","):
+        name, _, budget = item.partition("=")
+        if name.strip() == model and budget.strip():
+            return int(budget)
+    return settings.CONTEXT_TOKEN_BUDGET
+
+
+def _span(doc: Document) -> Optional[Tuple[tuple, int, int]]:
+    meta = doc.metadata or {}
+    start = meta.get("start_index")
+    if not isinstance(start, int) or not meta.get("source"):
+        return None
+    return (meta["source"], meta.get("page")), start, start + len(doc.page_content)
+
+
+def _merge(a: Document, b: Document) -> Optional[Document]:
+    """Union of two spans of the same page, or None if they are not contiguous."""
+    sa, sb = _span(a), _span(b)
+    if sa is None or sb is None or sa[0] != sb[0]:
+        return None
+    (_, a_start, a_end), (_, b_start, b_end) = sa, sb
+    if b_start < a_start:
+        a, b, a_start, a_end, b_start, b_end = b, a, b_start, b_end, a_start, a_end
+    if b_start > a_end + MERGE_GAP:
+        return None
+    if b_end <= a_end:
+        # b lies inside a; trust the offsets only if the text agrees
+        inner = a.page_content[b_start - a_start : b_end - a_start]
+        text = a.page_content if inner == b.page_content else None
+    elif b_start >= a_end:
+        text = a.page_content + " " + b.page_content
+    else:
+        overlap = a_end - b_start
+        same = a.page_content[-overlap:] == b.page_content[:overlap]
+        text = a.page_content + b.page_content[overlap:] if same else None
+    if text is None:
+        return None
+    return Document(page_content=text, metadata={**a.metadata, "start_index": a_start})
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + n]) for i in range(len(words) - n + 1)}
+
+
+def _truncate(text: str, budget: int) -> str:
+    # cut at the last sentence end that fits, else at a word boundary
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    head = text[:lo]
+    ends = list(_SENTENCE_END.finditer(head))
+    if ends and ends[-1].end() > lo // 2:
+        return head[: ends[-1].end()].rstrip()
+    return head.rsplit(" ", 1)[0].rstrip() + " …"
+
+
+def pack_context(
+    docs: List[Document], budget: Optional[int] = None
+) -> Tuple[str, List[Document]]:
+    """Pack reranked docs into the prompt context; returns (context, cited docs).
+
+    Overlapping or adjacent chunks of the same source page (by ``start_index``)
+    are merged into one passage at the better-ranked position, passages that
+    are near-duplicates of an earlier one (CONTEXT_DEDUP_THRESHOLD shingle
+    containment) are dropped, and passages are added in rank order until the
+    token budget is spent, the last one trimmed to fit. The returned docs are
+    the passages in ``[i]`` order, so citations match the markers.
+    """
+    budget = context_token_budget() if budget is None else budget
+    passages: List[Document] = []
+    for doc in docs:
+        for i, kept in enumerate(passages):
+            merged = _merge(kept, doc)
+            if merged is not None:
+                passages[i] = merged
+                break
+        else:
+            passages.append(doc)
+
+    threshold = settings.CONTEXT_DEDUP_THRESHOLD
+    unique: List[Document] = []
+    seen: List[set] = []
+    for doc in passages:
+        grams = _shingles(doc.page_content)
+        if threshold < 1 and grams and any(
+            len(grams & other) >= threshold * len(grams) for other in seen
+        ):
+            continue
+        unique.append(doc)
+        seen.append(grams)
+
+    packed: List[Document] = []
+    used = 0
+    for doc in unique:
+        cost = estimate_tokens(doc.page_content) + 3  # "[i] " + separator
+        if budget <= 0 or used + cost <= budget:
+            packed.append(doc)
+            used += cost
+            continue
+        remaining = budget - used - 3
+        if remaining >= settings.CONTEXT_MIN_PASSAGE_TOKENS or not packed:
+            text = _truncate(doc.page_content, max(remaining, 1))
+            packed.append(Document(page_content=text, metadata=doc.metadata))
+        break
+
+    context = "\n\n".join(f"[{i}] {d.page_content}" for i, d in enumerate(packed, start=1))
+    return context, packed
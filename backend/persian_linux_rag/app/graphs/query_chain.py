@@ -1,11 +1,14 @@
+import asyncio
 import re
-from typing import List, Dict
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Optional
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import (
     RunnableLambda,
     RunnableParallel,
-    RunnablePassthrough,
+    RunnablePick,
 )
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import SystemMessage, HumanMessage
@@ -13,9 +16,20 @@ from langchain_cohere import ChatCohere
 from ..models.schemas import AskResponse, Citation
 from ..core.config import settings
 from ..adapters.embeddings_lc import get_query_embedder
-from ..adapters.vectordb import retrieve_by_embedding
-from ..adapters.cohere_client import rerank_with_cohere
-from ..core.deps import get_chroma_client
+from ..adapters.vectordb import (
+    aretrieve_by_embedding,
+    aretrieve_sparse,
+    collection_count,
+    corpus_version,
+)
+from ..adapters.sparse import rrf_fuse
+from ..adapters.answer_cache import CachedAnswer
+from ..adapters.cohere_client import arerank_with_cohere
+from ..core.admission import Overloaded
+from ..core.deps import get_chroma_client, get_chroma_executor, get_components
+from ..core.metrics import metrics, timed
+from ..core.textnorm import query_key
+from .context import estimate_tokens, pack_context
 
 SYSTEM_PROMPT = (
     "You are a concise, accurate assistant focused on GNU/Linux and free software. "
@@ -24,13 +38,6 @@ SYSTEM_PROMPT = (
 )
 
 
-def _format_context(docs: List[Document]) -> str:
-    parts = []
-    for i, d in enumerate(docs, start=1):
-        parts.append(f"[{i}] {d.page_content}")
-    return "\n\n".join(parts)
-
-
 def _detect_lang(text: str) -> str:
     """Return 'fa' if Persian/Arabic script is present, else 'en'."""
     return "fa" if re.search(r"[\u0600-\u06FF]", text) else "en"
@@ -56,7 +63,7 @@ def mock_answer(question: str, top_k: int) -> AskResponse:
     )
 
 
-def _make_lc_retriever():
+def _make_lc_retriever(embedder=None):
     try:
         try:
             from langchain_chroma import Chroma as LCChroma
@@ -69,7 +76,7 @@ def _make_lc_retriever():
         raise RuntimeError(
             f"Chroma client not available. CHROMA_PATH={settings.CHROMA_PATH!r}"
         )
-    embedder = get_query_embedder()
+    embedder = embedder or get_query_embedder()
     vectordb = LCChroma(
         client=client,
         collection_name=settings.CHROMA_COLLECTION,
@@ -78,7 +85,7 @@ def _make_lc_retriever():
     search_kwargs = {
         "k": settings.RETRIEVE_K,
         "fetch_k": settings.FETCH_K,
-        "lambda_mult": 0.7,
+        "lambda_mult": settings.MMR_LAMBDA,
     }
     retriever = vectordb.as_retriever(
         search_type=settings.RETRIEVER_SEARCH_TYPE,
@@ -87,25 +94,45 @@ def _make_lc_retriever():
     return retriever
 
 
-def _retrieve_runner(inputs: Dict):
+async def _aretrieve_sparse(question: str) -> List[Document]:
+    with timed("sparse_search"):
+        return await aretrieve_sparse(question, k=settings.SPARSE_K, lang=_detect_lang(question))
+
+
+async def _aretrieve_runner(inputs: Dict):
+    with timed("retrieve"):
+        return await _aretrieve(inputs)
+
+
+async def _aretrieve(inputs: Dict):
     question = inputs["question"]
+    components = get_components()
     if settings.RETRIEVER_IMPL.lower() == "lc":
-        retriever = _make_lc_retriever()
-        docs = retriever.invoke(question)
+        docs = await components.lc_retriever.ainvoke(question)
         return {"question": question, "retrieved_docs": docs}
-    embedder = get_query_embedder()
-    q_emb = embedder.embed_query(question)
-    docs = retrieve_by_embedding(q_emb, k=settings.RETRIEVE_K)
+    # the keyword lookup needs no embedding: run it while the query is embedded
+    sparse = (
+        asyncio.ensure_future(_aretrieve_sparse(question)) if settings.HYBRID_SEARCH else None
+    )
+    try:
+        q_emb = inputs.get("query_embedding")
+        if q_emb is None:
+            async with components.admission.slot("embed"):
+                with timed("embed"):
+                    q_emb = await components.embedder.aembed_query(question)
+        with timed("vector_search"):
+            docs = await aretrieve_by_embedding(
+                q_emb, k=settings.RETRIEVE_K, lang=_detect_lang(question)
+            )
+        if sparse is not None:
+            docs = rrf_fuse([docs, await sparse], k=settings.RETRIEVE_K)
+    finally:
+        if sparse is not None and not sparse.done():
+            sparse.cancel()
     return {"question": question, "retrieved_docs": docs}
 
 
-def _rerank_runner(inputs: Dict):
-    question = inputs["question"]
-    docs: List[Document] = inputs["retrieved_docs"]
-    if not docs:
-        return {"question": question, "ranked_docs": []}
-    texts = [d.page_content for d in docs]
-    resp = rerank_with_cohere(question, texts, settings.RERANK_TOP_N)
+def _apply_rerank(question: str, docs: List[Document], resp) -> Dict:
     ranked_docs: List[Document] = []
     for item in resp.results:
         idx = item.index
@@ -113,10 +140,44 @@ def _rerank_runner(inputs: Dict):
     return {"question": question, "ranked_docs": ranked_docs}
 
 
+def _plan_rerank(question: str, docs: List[Document]):
+    """(shortlist for the reranker, or None with the final ranking when skipped)."""
+    plan = get_components().rerank_policy.plan(question, docs)
+    picked = [docs[i] for i in plan.indices]
+    if not plan.rerank:
+        return None, picked[: settings.RERANK_TOP_N]
+    return picked, None
+
+
+async def _arerank_runner(inputs: Dict):
+    question = inputs["question"]
+    docs: List[Document] = inputs["retrieved_docs"]
+    if not docs:
+        return {"question": question, "ranked_docs": []}
+    shortlist, ranked = _plan_rerank(question, docs)
+    if shortlist is None:
+        return {"question": question, "ranked_docs": ranked}
+    texts = [d.page_content for d in shortlist]
+    try:
+        async with get_components().admission.slot("rerank"):
+            with timed("rerank"):
+                resp = await arerank_with_cohere(question, texts, settings.RERANK_TOP_N)
+    except Overloaded:
+        # degrade rather than queue: keep the retrieval order
+        return {"question": question, "ranked_docs": shortlist[: settings.RERANK_TOP_N]}
+    return _apply_rerank(question, shortlist, resp)
+
+
 def _prepare_prompt_inputs(inputs: Dict):
+    with timed("prompt"):
+        return _prepare_prompt(inputs)
+
+
+def _prepare_prompt(inputs: Dict):
     question = inputs["question"]
-    ranked_docs: List[Document] = inputs["ranked_docs"]
-    context = _format_context(ranked_docs)
+    # passages are merged / dropped / trimmed; ranked_docs follows the [i] markers
+    context, ranked_docs = pack_context(inputs["ranked_docs"])
+    metrics.inc("context_tokens", estimate_tokens(context))
     lang = _detect_lang(question)
     lang_directive = "Answer in English." if lang == "en" else "به فارسی پاسخ بده."
     return {
@@ -127,10 +188,40 @@ def _prepare_prompt_inputs(inputs: Dict):
     }
 
 
-def build_chain():
-    retriever = RunnableLambda(_retrieve_runner)
-    reranker = RunnableLambda(_rerank_runner)
-    prep = RunnableLambda(_prepare_prompt_inputs)
+def _inline(func):
+    """RunnableLambda that stays on the event loop under ainvoke (no thread hop)."""
+
+    async def afunc(inputs):
+        return func(inputs)
+
+    return RunnableLambda(func, afunc=afunc)
+
+
+def record_llm_usage(message) -> None:
+    """Token counters from the provider's usage metadata, when it reports any."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            metrics.inc("llm_tokens", usage[kind], kind=kind.split("_")[0])
+
+
+def _timed_llm(llm):
+    """The LLM step, timed as stage "llm" (its answer only arrives whole here)."""
+
+    async def acall(messages, config):
+        async with get_components().admission.slot("llm"):
+            with timed("llm"):
+                out = await llm.ainvoke(messages, config)
+        record_llm_usage(out)
+        return out
+
+    return RunnableLambda(acall)
+
+
+def build_chain(llm=None):
+    retriever = RunnableLambda(_aretrieve_runner)
+    reranker = RunnableLambda(_arerank_runner)
+    prep = _inline(_prepare_prompt_inputs)
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", SYSTEM_PROMPT),
@@ -140,50 +231,36 @@ def build_chain():
             ),
         ]
     )
-    llm = ChatCohere(
+    llm = llm or ChatCohere(
         model=settings.COHERE_CHAT_MODEL,
         temperature=0.2,
         cohere_api_key=settings.COHERE_API_KEY,
+        base_url=settings.COHERE_BASE_URL,
     )
     parser = StrOutputParser()
 
-    pipeline = (
-        RunnableParallel(question=RunnablePassthrough()) | retriever | reranker | prep
-    )
+    # Input: {"question": str, "query_embedding": optional precomputed vector}
+    pipeline = retriever | reranker | prep
 
     answer_chain = (
-        pipeline
-        | (
-            lambda x: {
-                "question": x["question"],
-                "context": x["context"],
-                "lang_directive": x["lang_directive"],
-            }
-        )
+        RunnablePick(["question", "context", "lang_directive"])
         | prompt
-        | llm
+        | _timed_llm(llm)
         | parser
     )
 
-    final = RunnableParallel(
+    # Retrieve -> rerank -> prep runs once; its output fans out to the LLM
+    # branch and the citations branch.
+    final = pipeline | RunnableParallel(
         answer=answer_chain,
-        ranked_docs=pipeline | RunnableLambda(lambda x: x["ranked_docs"]),
+        ranked_docs=RunnablePick("ranked_docs"),
     )
     return final
 
 
-def prepare_prompt_bundle(question: str) -> Dict:
-    ctx = _retrieve_runner({"question": question})
-    ctx = _rerank_runner(ctx)
-    prep = _prepare_prompt_inputs(ctx)
-    messages = [
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(
-            content=f"{prep['lang_directive']}\n\nQuestion:\n{question}\n\nContext:\n{prep['context']}"
-        ),
-    ]
+def _citations(docs: List[Document]) -> List[Citation]:
     citations = []
-    for d in prep["ranked_docs"]:
+    for d in docs:
         meta = d.metadata or {}
         citations.append(
             Citation(
@@ -195,35 +272,172 @@ def prepare_prompt_bundle(question: str) -> Dict:
                 url=meta.get("url"),
             )
         )
+    return citations
+
+
+def _bundle(question: str, prep: Dict) -> Dict:
+    messages = [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"{prep['lang_directive']}\n\nQuestion:\n{question}\n\nContext:\n{prep['context']}"
+        ),
+    ]
     return {
         "messages": messages,
-        "citations": citations,
+        "citations": _citations(prep["ranked_docs"]),
         "ranked_docs": prep["ranked_docs"],
         "lang_directive": prep["lang_directive"],
     }
 
 
-def answer_question_lc(question: str, top_k: int) -> AskResponse:
-    chain = build_chain()
-    out = chain.invoke(question)
-    docs: List[Document] = out["ranked_docs"][:top_k] if out.get("ranked_docs") else []
-    citations = []
-    for d in docs:
-        meta = d.metadata or {}
-        citations.append(
-            Citation(
-                source=meta.get("source")
-                or meta.get("doc_id")
-                or meta.get("id")
-                or "unknown",
-                snippet=d.page_content[:220],
-                url=meta.get("url"),
-            )
+async def aprepare_prompt_bundle(question: str, query_embedding=None) -> Dict:
+    async def run():
+        ctx = await _aretrieve_runner(
+            {"question": question, "query_embedding": query_embedding}
         )
+        ctx = await _arerank_runner(ctx)
+        return _bundle(question, _prepare_prompt_inputs(ctx))
+
+    return await get_components().flights.run(("bundle", query_key(question)), run)
+
+
+@dataclass
+class CacheLookup:
+    entry: Optional[CachedAnswer] = None
+    layer: Optional[str] = None  # "exact" | "semantic"
+    embedding: Optional[List[float]] = None
+    generation: Optional[str] = None
+
+
+def _corpus_generation() -> Optional[str]:
+    # Both parts are persistent, so workers and restarts agree: the manifest's
+    # corpus version changes with every ingest, the collection count (cached
+    # in vectordb) also catches writes made without the manifest.
+    try:
+        return f"{corpus_version()}:{collection_count()}"
+    except Exception:
+        return None
+
+
+def _exact_lookup(cache, question: str):
+    gen = _corpus_generation()
+    return gen, cache.get_exact(question, gen)
+
+
+async def alookup_exact_answer(question: str) -> CacheLookup:
+    """The exact-match layer alone: no embedding, so no stage slot is taken."""
+    cache = get_components().answer_cache
+    if cache is None:
+        return CacheLookup()
+    # the corpus count and a SQLite backend block: keep them off the event loop
+    gen, entry = await asyncio.get_running_loop().run_in_executor(
+        get_chroma_executor(), _exact_lookup, cache, question
+    )
+    if entry is not None:
+        metrics.inc("answer_cache", layer="exact")
+        return CacheLookup(entry, "exact", None, gen)
+    return CacheLookup(generation=gen)
+
+
+async def alookup_cached_answer(question: str) -> CacheLookup:
+    cache = get_components().answer_cache
+    if cache is None:
+        return CacheLookup()
+    lookup = await alookup_exact_answer(question)
+    if lookup.entry is not None:
+        return lookup
+    gen = lookup.generation
+    async with get_components().admission.slot("embed"):
+        with timed("embed"):
+            q_emb = await get_components().embedder.aembed_query(question)
+    entry = await asyncio.get_running_loop().run_in_executor(
+        get_chroma_executor(), cache.get_similar, q_emb, gen
+    )
+    metrics.inc("answer_cache", layer="semantic" if entry else "miss")
+    return CacheLookup(entry, "semantic" if entry else None, q_emb, gen)
+
+
+def store_cached_answer(
+    question: str, answer: str, citations: List[Citation], lookup: CacheLookup
+) -> None:
+    cache = get_components().answer_cache
+    if cache is None or not answer:
+        return
+    cache.put(
+        question,
+        answer,
+        [c.model_dump() for c in citations],
+        lookup.embedding,
+        lookup.generation,
+    )
+
+
+async def astore_cached_answer(
+    question: str, answer: str, citations: List[Citation], lookup: CacheLookup
+) -> None:
+    await asyncio.get_running_loop().run_in_executor(
+        get_chroma_executor(), store_cached_answer, question, answer, citations, lookup
+    )
+
+
+def _cached_response(lookup: CacheLookup, top_k: int) -> AskResponse:
+    citations = [Citation(**c) for c in lookup.entry.citations[:top_k]]
     return AskResponse(
-        answer=out["answer"],
+        answer=lookup.entry.answer,
         citations=citations,
+        used_k=len(citations),
+        mode="live",
+        notes=f"cache: {lookup.layer}",
+    )
+
+
+def _to_response(out: Dict, top_k: int) -> AskResponse:
+    docs: List[Document] = out["ranked_docs"][:top_k] if out.get("ranked_docs") else []
+    return AskResponse(
+        answer=out["answer"],
+        citations=_citations(docs),
         used_k=len(docs),
         mode="live",
         notes=None,
     )
+
+
+async def _aanswer(question: str):
+    """(cache lookup, chain output or None on a cache hit); shared by coalesced callers."""
+    lookup = await alookup_cached_answer(question)
+    if lookup.entry is not None:
+        return lookup, None
+    out = await get_components().chain.ainvoke(
+        {"question": question, "query_embedding": lookup.embedding}
+    )
+    await astore_cached_answer(question, out["answer"], _citations(out["ranked_docs"]), lookup)
+    return lookup, out
+
+
+async def aanswer_question_lc(question: str, top_k: int) -> AskResponse:
+    flights = get_components().flights
+    lookup, out = await flights.run(("answer", query_key(question)), lambda: _aanswer(question))
+    if out is None:
+        return _cached_response(lookup, top_k)
+    return _to_response(out, top_k)
+
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    # One loop for every blocking call: the registry's async HTTP clients
+    # stay bound to the loop they were first used on.
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="answer-loop", daemon=True).start()
+    return _sync_loop
+
+
+def answer_question_lc(question: str, top_k: int) -> AskResponse:
+    """Blocking entry point for scripts; runs on a long-lived background loop."""
+    future = asyncio.run_coroutine_threadsafe(aanswer_question_lc(question, top_k), _background_loop())
+    return future.result()
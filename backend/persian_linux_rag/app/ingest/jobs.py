@@ -0,0 +1,91 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .pipeline import IngestStats, run_ingest
+
+MAX_FINISHED_JOBS = 50
+
+
+@dataclass
+class IngestJob:
+    sources: List[str]
+    dry_run: bool = False
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"  # queued | running | done | failed
+    stats: IngestStats = field(default_factory=IngestStats)
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "sources": self.sources,
+            "dry_run": self.dry_run,
+            "progress": self.stats.to_dict() if self.status != "queued" else None,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class IngestJobs:
+    """Background ingestion jobs, run one at a time so writes never interleave."""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+    def submit(self, sources: List[str], dry_run: bool = False) -> IngestJob:
+        job = IngestJob(sources=list(sources), dry_run=dry_run)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job: IngestJob) -> None:
+        from ..adapters.vectordb import invalidate_collection
+        from ..core.deps import get_components
+
+        job.status = "running"
+        job.stats = IngestStats()
+        try:
+            run_ingest(job.sources, stats=job.stats, dry_run=job.dry_run)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+            if not job.dry_run and (job.stats.chunks or job.stats.chunks_deleted):
+                # queries pick up the new collection handle, count and side indices;
+                # answers cached on disk before this run are stale, not just old
+                invalidate_collection()
+                cache = get_components().answer_cache
+                if cache is not None:
+                    cache.clear()
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.finished is not None]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
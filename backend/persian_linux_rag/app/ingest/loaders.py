@@ -0,0 +1,75 @@
+import gzip
+import os
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
+
+# Loaders are imported lazily: pypdfium2 / bs4 are only needed for the
+# file types that use them.
+SUFFIXES = (".pdf", ".html", ".htm", ".html.gz", ".txt", ".md")
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def html_document(soup, source: str) -> Document:
+    """Document from already-parsed HTML, shaped like BSHTMLLoader's output.
+
+    The crawler hands over the soup it parsed for link extraction, so a
+    streamed page is parsed once.
+    """
+    title = soup.title.string if soup.title and soup.title.string else ""
+    return Document(page_content=soup.get_text(), metadata={"source": source, "title": str(title)})
+
+
+def load_file(path: str) -> Iterator[Document]:
+    suffix = os.path.splitext(path)[1].lower()
+    if path.lower().endswith(".html.gz"):
+        # compressed archive written by the crawler's --ingest mode
+        from bs4 import BeautifulSoup
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield html_document(BeautifulSoup(f.read(), "html.parser"), path)
+        return
+    if suffix == ".pdf":
+        from langchain_community.document_loaders import PyPDFium2Loader
+
+        loader = PyPDFium2Loader(path)
+    elif suffix in (".html", ".htm"):
+        from langchain_community.document_loaders import BSHTMLLoader
+
+        loader = BSHTMLLoader(path, open_encoding="utf-8")
+    elif suffix in (".txt", ".md"):
+        from langchain_community.document_loaders import TextLoader
+
+        loader = TextLoader(path, encoding="utf-8")
+    else:
+        raise ValueError(f"Unsupported file type: {path!r}")
+    # lazy_load yields page by page, so a large PDF is never held whole
+    yield from loader.lazy_load()
+
+
+def iter_source_files(source: str) -> Iterator[str]:
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUFFIXES):
+                    yield os.path.join(root, name)
+    elif os.path.isfile(source):
+        yield source
+    else:
+        raise FileNotFoundError(f"Ingestion source not found: {source!r}")
+
+
+def iter_documents(sources: Iterable[str]) -> Iterator[Document]:
+    """Yield raw Documents from files, directories and URLs one at a time."""
+    for source in sources:
+        if _is_url(source):
+            from langchain_community.document_loaders import WebBaseLoader
+
+            yield from WebBaseLoader(source, header_template={"User-Agent": "Mozilla/5.0"}).lazy_load()
+            continue
+        for path in iter_source_files(source):
+            yield from load_file(path)
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class IngestManifest:
+    """What has been indexed: source content hashes and the chunks they map to.
+
+    Chunk ids are hashes of the chunk text, so identical chunks from mirrored
+    pages share one row in Chroma and one embedding. ``chunks`` holds ids that
+    are actually stored in the collection (written after each upsert) with the
+    metadata stored alongside them; ``source_chunks`` is replaced per source at
+    the end of a run, and any chunk no source references any more is an orphan
+    to delete. A shared chunk whose stored metadata cites a source that no
+    longer holds it is re-pointed at one that does.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "source TEXT PRIMARY KEY, hash TEXT NOT NULL, updated REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS source_chunks ("
+                "source TEXT NOT NULL, chunk_id TEXT NOT NULL, meta TEXT NOT NULL, "
+                "PRIMARY KEY (source, chunk_id));"
+                "CREATE INDEX IF NOT EXISTS source_chunks_chunk ON source_chunks (chunk_id);"
+                "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, meta TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            )
+
+    def source_hash(self, source: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM sources WHERE source = ?", (source,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stored_chunks(self, ids: Iterable[str]) -> Set[str]:
+        ids = list(ids)
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                part = ids[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
+
+    def add_chunks(self, items: Iterable[Tuple[str, dict]]) -> None:
+        """Record (chunk id, metadata) pairs as written to the collection."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, meta) VALUES (?, ?)",
+                [(i, _dumps(meta)) for i, meta in items],
+            )
+
+    def sources_under(self, roots: Iterable[str]) -> List[str]:
+        """Known sources that a run over ``roots`` is responsible for."""
+        with self._lock:
+            known = [r[0] for r in self._conn.execute("SELECT source FROM sources")]
+        prefixes = [os.path.join(r, "") for r in roots if os.path.isdir(r)]
+        roots = set(roots)
+        return [s for s in known if s in roots or s.startswith(tuple(prefixes))]
+
+    def commit_sources(
+        self, updated: Dict[str, tuple], removed: Iterable[str], dry_run: bool = False
+    ) -> Tuple[List[str], Dict[str, dict]]:
+        """Record {source: (hash, {chunk_id: metadata})}, drop ``removed``.
+
+        Returns the orphan chunk ids and {chunk_id: metadata} for stored chunks
+        whose metadata no longer matches any source holding them (the caller
+        rewrites those and records them with ``add_chunks``). With ``dry_run``
+        the changes are rolled back afterwards.
+        """
+        removed = list(removed)
+        now = time.time()
+        with self._lock, self._conn:
+            for source in list(updated) + removed:
+                self._conn.execute("DELETE FROM source_chunks WHERE source = ?", (source,))
+            for source in removed:
+                self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            for source, (digest, chunks) in updated.items():
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sources (source, hash, updated) VALUES (?, ?, ?)",
+                    (source, digest, now),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO source_chunks (source, chunk_id, meta) VALUES (?, ?, ?)",
+                    [(source, i, _dumps(meta)) for i, meta in chunks.items()],
+                )
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE chunk_id NOT IN "
+                "(SELECT chunk_id FROM source_chunks)"
+            ).fetchall()
+            # the first surviving holder (by source) becomes the chunk's citation
+            stale = self._conn.execute(
+                "SELECT c.chunk_id, MIN(s.source || char(0) || s.meta) FROM chunks c "
+                "JOIN source_chunks s ON s.chunk_id = c.chunk_id "
+                "WHERE NOT EXISTS (SELECT 1 FROM source_chunks o "
+                "WHERE o.chunk_id = c.chunk_id AND o.meta = c.meta) "
+                "GROUP BY c.chunk_id"
+            ).fetchall()
+            if dry_run:
+                self._conn.rollback()
+        repointed = {cid: json.loads(held.split("\0", 1)[1]) for cid, held in stale}
+        return [r[0] for r in rows], repointed
+
+    def delete_chunks(self, ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(i,) for i in ids])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def corpus_version(self) -> Optional[str]:
+        return self.get_meta("corpus_version")
+
+    def bump_corpus_version(self) -> str:
+        """Record that the collection changed; readers key caches on this value."""
+        version = uuid.uuid4().hex
+        self.set_meta("corpus_version", version)
+        return version
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _dumps(meta: dict) -> str:
+    return json.dumps(meta, ensure_ascii=False, sort_keys=True)
+
+
+def read_corpus_version(path: str) -> Optional[str]:
+    """The manifest's corpus version, read-only (None without a manifest)."""
+    try:
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
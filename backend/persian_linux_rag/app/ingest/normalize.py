@@ -0,0 +1,50 @@
+import re
+import unicodedata
+
+from ..core.textnorm import PERSIAN_DIACRITICS, TRANSLATE_TABLE
+
+# Port of the notebook's normalize_pdf_text_advanced. Character tables are
+# shared with query normalization (core/textnorm) and applied in one
+# translate() pass; every regex is compiled once at import.
+PUA_BULLETS = "\ue039\ue03a\ue03b\ue03c\ue049"
+_PUA_LINE_START = re.compile(r"(?m)^[ \t]*[" + PUA_BULLETS + r"][ \t]*")
+_PUA_TABLE = str.maketrans({ch: " - " for ch in PUA_BULLETS})
+_STAR_BULLET = re.compile(r"(?m)^\s*\*\s+")
+_LONE_AMPERSAND = re.compile(r"(?<=\s)&(?=\s)")
+_HSPACE = re.compile(r"[ \t]+")
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([،,:;!؟.])")
+_NO_SPACE_AFTER_PUNCT = re.compile(r"([،,:;!؟.])([^\s\n])")
+# the notebook's lookbehind lacked \n, so every paragraph break became "\n "
+_SOFT_NEWLINE = re.compile(r"(?<![.!؟:؛\-\n])\n(?!\n)")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+class _DocumentTable(dict):
+    """TRANSLATE_TABLE that also deletes unassigned (Cn) code points.
+
+    Categories are looked up once per distinct code point and memoized, so
+    translate() stays a C-level dict lookup per character.
+    """
+
+    def __missing__(self, cp: int):
+        value = None if unicodedata.category(chr(cp)) == "Cn" else cp
+        self[cp] = value
+        return value
+
+
+_DOCUMENT_TABLE = _DocumentTable(TRANSLATE_TABLE)
+
+
+def normalize_document_text(text: str) -> str:
+    """Clean extracted PDF/HTML text before splitting and embedding."""
+    text = unicodedata.normalize("NFKC", text).translate(_DOCUMENT_TABLE)
+    text = _PUA_LINE_START.sub("• ", text).translate(_PUA_TABLE)
+    text = _STAR_BULLET.sub("• ", text)
+    text = _LONE_AMPERSAND.sub(" و ", text)
+    text = PERSIAN_DIACRITICS.sub("", text)
+    text = _HSPACE.sub(" ", text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _NO_SPACE_AFTER_PUNCT.sub(r"\1 \2", text)
+    text = _SOFT_NEWLINE.sub(" ", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
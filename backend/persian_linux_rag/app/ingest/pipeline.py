@@ -0,0 +1,385 @@
+import hashlib
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby, islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ..core.config import settings
+from .loaders import iter_documents
+from .manifest import IngestManifest
+from .normalize import normalize_document_text
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+SEPARATORS = ["\n\n", "\n", "؛", "؟", ".", "!", "،", " ", ""]
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class IngestStats:
+    dry_run: bool = False
+    documents: int = 0  # loaded Documents (PDF pages, HTML files, ...)
+    sources: int = 0
+    sources_unchanged: int = 0  # content hash matched the manifest; not split
+    sources_removed: int = 0
+    chunks: int = 0  # embedded and upserted (or, in a dry run, that would be)
+    chunks_reused: int = 0  # already stored by an earlier run
+    duplicates: int = 0  # identical text seen earlier in this run
+    chunks_deleted: int = 0
+    chunks_repointed: int = 0  # shared chunks now cited under another source
+    legacy_deleted: int = 0  # rows the manifest never wrote (notebook-built ids)
+    batches: int = 0
+    retries: int = 0
+    started: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        elapsed = time.time() - self.started
+        out = {k: v for k, v in self.__dict__.items() if k != "started"}
+        out["elapsed_s"] = round(elapsed, 2)
+        out["chunks_per_s"] = round(self.chunks / elapsed, 1) if elapsed > 0 else 0.0
+        return out
+
+
+def make_splitter(
+    chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None
+) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or settings.INGEST_CHUNK_SIZE,
+        chunk_overlap=settings.INGEST_CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+        separators=SEPARATORS,
+        add_start_index=True,
+        length_function=len,
+    )
+
+
+def chunk_id(doc: Document) -> str:
+    # content-addressed: the same text from two mirrors is one chunk; its
+    # metadata cites one holder and is re-pointed when that holder drops it
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def source_digest(pages: List[Document]) -> str:
+    h = hashlib.sha1()
+    for page in pages:
+        h.update(page.page_content.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _clean_metadata(meta: dict) -> dict:
+    # Chroma accepts only scalar metadata values
+    out = {}
+    for key, value in meta.items():
+        if value is None:
+            continue
+        out[key] = value if isinstance(value, (str, int, float, bool)) else str(value)
+    return out
+
+
+def iter_chunks(docs: Iterable[Document], splitter=None) -> Iterator[Document]:
+    """Normalize and split one document at a time."""
+    splitter = splitter or make_splitter()
+    for doc in docs:
+        text = normalize_document_text(doc.page_content)
+        if not text:
+            continue
+        clean = Document(page_content=text, metadata=_clean_metadata(doc.metadata))
+        for chunk in splitter.split_documents([clean]):
+            if chunk.page_content.strip():
+                yield chunk
+
+
+def batched(items: Iterable, n: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+Group = Tuple[Any, List[Document]]
+_worker_splitter = None
+
+
+def _split_unit(unit: list, chunk_size: int, chunk_overlap: int) -> list:
+    # Runs in a worker process. Pages and chunks cross the process boundary
+    # as (text, metadata) tuples: pickling pydantic Documents costs more
+    # than the splitting itself.
+    global _worker_splitter
+    if _worker_splitter is None or (
+        _worker_splitter._chunk_size,
+        _worker_splitter._chunk_overlap,
+    ) != (chunk_size, chunk_overlap):
+        _worker_splitter = make_splitter(chunk_size, chunk_overlap)
+    out = []
+    for key, pages in unit:
+        docs = (Document(page_content=text, metadata=meta) for text, meta in pages)
+        out.append((key, [(c.page_content, c.metadata) for c in iter_chunks(docs, _worker_splitter)]))
+    return out
+
+
+def _units(groups: Iterable[Group], unit_pages: int) -> Iterator[List[Group]]:
+    unit, size = [], 0
+    for key, pages in groups:
+        unit.append((key, [(p.page_content, p.metadata) for p in pages]))
+        size += len(pages)
+        if size >= unit_pages:
+            yield unit
+            unit, size = [], 0
+    if unit:
+        yield unit
+
+
+def _as_documents(results: list) -> Iterator[Group]:
+    for key, chunks in results:
+        yield key, [Document(page_content=text, metadata=meta) for text, meta in chunks]
+
+
+def ingest_workers() -> int:
+    return settings.INGEST_WORKERS if settings.INGEST_WORKERS > 0 else os.cpu_count() or 1
+
+
+def split_groups(groups: Iterable[Group], workers: Optional[int] = None) -> Iterator[Group]:
+    """Normalize + split ``(key, pages)`` groups, yielding ``(key, chunks)`` in input order.
+
+    With more than one worker, groups are packed into units of about
+    INGEST_UNIT_PAGES pages and fanned out to a process pool; at most
+    ``2 * workers`` units are in flight, so output streams with bounded memory.
+    """
+    workers = ingest_workers() if workers is None else workers
+    if workers <= 1:
+        splitter = make_splitter()
+        for key, pages in groups:
+            yield key, list(iter_chunks(pages, splitter))
+        return
+    args = (settings.INGEST_CHUNK_SIZE, settings.INGEST_CHUNK_OVERLAP)
+    # spawn: forking a process that runs server/embedding threads is unsafe
+    ctx = multiprocessing.get_context("spawn")
+    inflight: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        try:
+            for unit in _units(groups, settings.INGEST_UNIT_PAGES):
+                inflight.append(pool.submit(_split_unit, unit, *args))
+                if len(inflight) >= 2 * workers:
+                    yield from _as_documents(inflight.popleft().result())
+            while inflight:
+                yield from _as_documents(inflight.popleft().result())
+        finally:
+            for future in inflight:
+                future.cancel()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    msg = str(exc).lower()
+    return (
+        "429" in msg
+        or "toomanyrequests" in msg
+        or "rate limit" in msg
+        or "timeout" in msg
+        or "connection" in msg
+    )
+
+
+def embed_with_retry(
+    embed_fn: EmbedFn, texts: List[str], stats: Optional[IngestStats] = None
+) -> List[List[float]]:
+    """Call ``embed_fn`` with exponential backoff + jitter on transient errors."""
+    for attempt in range(1, settings.INGEST_MAX_RETRIES + 1):
+        try:
+            return embed_fn(texts)
+        except Exception as e:
+            if attempt == settings.INGEST_MAX_RETRIES or not _is_retryable(e):
+                raise
+            if stats is not None:
+                stats.retries += 1
+            delay = settings.INGEST_BACKOFF_BASE * 2 ** (attempt - 1)
+            time.sleep(delay + random.uniform(0.0, delay / 2))
+    raise RuntimeError("unreachable")
+
+
+def default_embed_fn() -> EmbedFn:
+    from ..adapters.embeddings_lc import get_query_embedder
+
+    # embed_documents sends input_type="search_document"
+    return get_query_embedder().embed_documents
+
+
+def get_or_create_collection():
+    from ..core.deps import get_chroma_client
+
+    client = get_chroma_client()
+    if not client:
+        raise RuntimeError(f"Chroma client not available. CHROMA_PATH={settings.CHROMA_PATH!r}")
+    return client.get_or_create_collection(settings.CHROMA_COLLECTION)
+
+
+def upsert_chunks(collection, chunks: List[Document], vectors: List[List[float]]) -> None:
+    collection.upsert(
+        ids=[chunk_id(c) for c in chunks],
+        documents=[c.page_content for c in chunks],
+        metadatas=[c.metadata for c in chunks],
+        embeddings=vectors,
+    )
+
+
+def _source_of(doc: Document) -> str:
+    return str(doc.metadata.get("source", ""))
+
+
+def _untracked_ids(collection, manifest: IngestManifest, page_size: int = 1000) -> List[str]:
+    ids: List[str] = []
+    offset = 0
+    while True:
+        page = collection.get(include=[], limit=page_size, offset=offset)["ids"]
+        stored = manifest.stored_chunks(page)
+        ids.extend(i for i in page if i not in stored)
+        if len(page) < page_size:
+            return ids
+        offset += page_size
+
+
+def run_ingest(
+    sources: Iterable[str],
+    collection=None,
+    embed_fn: Optional[EmbedFn] = None,
+    stats: Optional[IngestStats] = None,
+    docs: Optional[Iterable[Document]] = None,
+    manifest: Optional[IngestManifest] = None,
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+) -> IngestStats:
+    """load -> normalize -> split -> batch embed -> upsert, streaming and incremental.
+
+    Sources whose content hash matches the manifest are skipped before
+    splitting; of the rest, only chunks not already stored are embedded.
+    Sources under ``sources`` that no longer exist lose their chunks, and
+    chunks no source references are deleted. With ``dry_run`` nothing is
+    embedded or written and ``stats`` describes the diff.
+
+    The first successful run against a manifest also deletes collection rows
+    the manifest did not record: a collection built by the notebooks has
+    random UUID ids, which would otherwise sit next to their content-addressed
+    copies. Keep INGEST_MANIFEST_PATH pointing at the manifest that built the
+    collection, or every row it does not know about is dropped once.
+
+    At most INGEST_EMBED_CONCURRENCY batches are being embedded at once and
+    upserts happen on the calling thread in submission order, so memory
+    stays bounded by ``concurrency * INGEST_EMBED_BATCH`` chunks.
+    """
+    sources = list(sources)
+    stats = stats or IngestStats()
+    stats.dry_run = dry_run
+    own_manifest = manifest is None
+    manifest = manifest or IngestManifest(settings.INGEST_MANIFEST_PATH)
+    if docs is None:
+        # the loaders yield one file (or URL) at a time: group as they stream
+        groups = groupby(iter_documents(sources), key=_source_of)
+    else:
+        # pushed documents may interleave sources
+        grouped: dict = {}
+        for doc in docs:
+            grouped.setdefault(_source_of(doc), []).append(doc)
+        groups = grouped.items()
+    migrate = not dry_run and manifest.get_meta("legacy_swept") is None
+    updated: dict = {}  # source -> (digest, chunk ids)
+    planned: set = set()
+
+    def changed_sources() -> Iterator[Group]:
+        for source, group in groups:
+            pages = list(group)
+            stats.documents += len(pages)
+            if source in updated:  # the same file under two overlapping roots
+                continue
+            stats.sources += 1
+            digest = source_digest(pages)
+            updated[source] = None
+            if manifest.source_hash(source) == digest:
+                stats.sources_unchanged += 1
+                continue
+            yield (source, digest), pages
+
+    def new_chunks() -> Iterator[Document]:
+        for (source, digest), split in split_groups(changed_sources(), workers):
+            chunks = {}
+            for chunk in split:
+                chunks.setdefault(chunk_id(chunk), chunk)
+            updated[source] = (digest, {cid: c.metadata for cid, c in chunks.items()})
+            stored = manifest.stored_chunks(chunks)
+            for cid, chunk in chunks.items():
+                if cid in stored:
+                    stats.chunks_reused += 1
+                elif cid in planned:
+                    stats.duplicates += 1
+                else:
+                    planned.add(cid)
+                    yield chunk
+
+    try:
+        if dry_run:
+            stats.chunks = sum(1 for _ in new_chunks())
+        else:
+            _embed_and_upsert(new_chunks(), collection, embed_fn, stats, manifest)
+        removed = [s for s in manifest.sources_under(sources) if s not in updated]
+        changed = {s: v for s, v in updated.items() if v is not None}
+        orphans, repointed = manifest.commit_sources(changed, removed, dry_run=dry_run)
+        stats.sources_removed = len(removed)
+        stats.chunks_deleted = len(orphans)
+        stats.chunks_repointed = len(repointed)
+        if not dry_run and (orphans or repointed or migrate):
+            collection = collection if collection is not None else get_or_create_collection()
+            for batch in batched(orphans, 500):
+                collection.delete(ids=batch)
+            manifest.delete_chunks(orphans)
+            for batch in batched(repointed.items(), 500):
+                collection.update(ids=[i for i, _ in batch], metadatas=[m for _, m in batch])
+                manifest.add_chunks(batch)
+            if migrate:
+                legacy = _untracked_ids(collection, manifest)
+                for batch in batched(legacy, 500):
+                    collection.delete(ids=batch)
+                stats.legacy_deleted = len(legacy)
+                manifest.set_meta("legacy_swept", str(time.time()))
+    finally:
+        changed_rows = stats.chunks + stats.chunks_deleted + stats.chunks_repointed + stats.legacy_deleted
+        if not dry_run and changed_rows:
+            # even a failed run may have upserted batches: the corpus changed
+            manifest.bump_corpus_version()
+        if own_manifest:
+            manifest.close()
+    return stats
+
+
+def _embed_and_upsert(chunks, collection, embed_fn, stats, manifest) -> None:
+    collection = collection if collection is not None else get_or_create_collection()
+    embed_fn = embed_fn or default_embed_fn()
+    concurrency = max(1, settings.INGEST_EMBED_CONCURRENCY)
+    inflight: deque = deque()
+
+    def drain_one():
+        batch, future = inflight.popleft()
+        upsert_chunks(collection, batch, future.result())
+        manifest.add_chunks((chunk_id(c), c.metadata) for c in batch)
+        stats.batches += 1
+        stats.chunks += len(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest-embed") as pool:
+        try:
+            for batch in batched(chunks, settings.INGEST_EMBED_BATCH):
+                texts = [c.page_content for c in batch]
+                inflight.append((batch, pool.submit(embed_with_retry, embed_fn, texts, stats)))
+                if len(inflight) >= concurrency:
+                    drain_one()
+            while inflight:
+                drain_one()
+        finally:
+            for _, future in inflight:
+                future.cancel()
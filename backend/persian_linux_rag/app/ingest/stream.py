@@ -0,0 +1,96 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from ..core.config import settings
+from .manifest import IngestManifest
+from .pipeline import EmbedFn, IngestStats, default_embed_fn, get_or_create_collection, run_ingest
+
+
+class StreamingIngestor:
+    """Push Documents in as they arrive; they are indexed in small flushes.
+
+    A flush runs ``run_ingest`` over the pending documents once
+    INGEST_STREAM_FLUSH_DOCS have queued up or the oldest has waited
+    INGEST_STREAM_FLUSH_S, so a crawled page is searchable seconds after it
+    is fetched. Flushes run on one background thread, one at a time; a new
+    flush waits for the previous one, which throttles the producer to the
+    embedding rate. Sources are incremental per document (manifest hash), and
+    chunks already stored are never re-embedded.
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        embed_fn: Optional[EmbedFn] = None,
+        manifest: Optional[IngestManifest] = None,
+        flush_docs: Optional[int] = None,
+        flush_s: Optional[float] = None,
+    ):
+        self.stats = IngestStats()
+        self.flush_docs = flush_docs or settings.INGEST_STREAM_FLUSH_DOCS
+        self.flush_s = settings.INGEST_STREAM_FLUSH_S if flush_s is None else flush_s
+        self._collection = collection
+        self._embed_fn = embed_fn
+        self._own_manifest = manifest is None
+        self._manifest = manifest or IngestManifest(settings.INGEST_MANIFEST_PATH)
+        self._pending: List[Document] = []
+        self._oldest = 0.0
+        self._future: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-stream")
+
+    def add(self, doc: Document) -> None:
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append(doc)
+        if (
+            len(self._pending) >= self.flush_docs
+            or time.monotonic() - self._oldest >= self.flush_s
+        ):
+            self.flush()
+
+    def flush(self, wait: bool = False) -> None:
+        if self._pending:
+            docs, self._pending = self._pending, []
+            self._wait()
+            self._future = self._executor.submit(self._run, docs)
+        if wait:
+            self._wait()
+
+    def _wait(self) -> None:
+        # re-raises an embedding / upsert failure from the previous flush
+        if self._future is not None:
+            future, self._future = self._future, None
+            future.result()
+
+    def _run(self, docs: List[Document]) -> None:
+        if self._collection is None:
+            self._collection = get_or_create_collection()
+        if self._embed_fn is None:
+            self._embed_fn = default_embed_fn()
+        # no roots: a flush never treats sources outside it as removed
+        run_ingest(
+            [],
+            collection=self._collection,
+            embed_fn=self._embed_fn,
+            stats=self.stats,
+            docs=docs,
+            manifest=self._manifest,
+            workers=1,
+        )
+
+    def close(self) -> None:
+        try:
+            self.flush(wait=True)
+        finally:
+            self._executor.shutdown(wait=True)
+            if self._own_manifest:
+                self._manifest.close()
+
+    def __enter__(self) -> "StreamingIngestor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
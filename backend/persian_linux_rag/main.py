@@ -1,26 +1,44 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 from .app.core.config import settings
+from .app.core.deps import get_components, get_mode, init_components, reset_components
 from .app.api.health import router as health_router
+from .app.api.metrics import router as metrics_router
 from .app.api.ask import router as ask_router
 from .app.api.ask_stream import router as ask_stream_router
 from .app.api.sources import router as sources_router
 from .app.api.ingest import router as ingest_router
 from .app.api.feedback import router as feedback_router
+from .app.api.cache import router as cache_router
+from .app.api.stats import router as stats_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build clients, retriever and chain once; requests reuse them.
+    init_components(warm=get_mode() == "live")
+    yield
+    get_components().close()
+    reset_components()
 
 
 def create_app() -> FastAPI:
     app = FastAPI(
+        lifespan=lifespan,
         title="Persian Linux RAG – Backend (LangChain)",
         default_response_class=ORJSONResponse,
         version="0.1.1",
     )
     app.include_router(health_router, prefix="")
+    app.include_router(metrics_router, prefix="")
     app.include_router(ask_router, prefix="")
     app.include_router(ask_stream_router, prefix="")
     app.include_router(sources_router, prefix="")
     app.include_router(ingest_router, prefix="")
     app.include_router(feedback_router, prefix="")
+    app.include_router(cache_router, prefix="")
+    app.include_router(stats_router, prefix="")
     return app
 
 
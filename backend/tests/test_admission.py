@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from persian_linux_rag.app.core import admission
+from persian_linux_rag.app.core.admission import Overloaded, StageLimiter, parse_rate_limits
+from persian_linux_rag.app.graphs import query_chain
+
+
+def test_stage_limiter_queues_then_sheds():
+    async def main():
+        limiter = StageLimiter("llm", limit=1, max_queue=1)
+        await limiter.acquire(1.0)
+        waiter = asyncio.ensure_future(limiter.acquire(1.0))
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.queued) == (1, 1)
+
+        with pytest.raises(Overloaded) as full:
+            await limiter.acquire(1.0)  # queue is full: refused at once
+        assert full.value.reason == "queue full"
+
+        limiter.release()  # handed to the waiter
+        await waiter
+        assert (limiter.active, limiter.queued) == (1, 0)
+
+        with pytest.raises(Overloaded) as late:
+            await limiter.acquire(0.05)  # cannot get a slot before the deadline
+        assert late.value.reason == "deadline" and limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(main())
+
+
+def test_token_bucket_per_route(monkeypatch):
+    buckets = parse_rate_limits("ask=1:2, ask_stream=0.5")
+    assert set(buckets) == {"ask", "ask_stream"}
+    ask = buckets["ask"]
+    assert ask.take() == 0 and ask.take() == 0
+    assert 0 < ask.take() <= 1.0
+
+
+def test_overloaded_rerank_is_skipped_and_rate_limit_returns_429(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.main import app
+    from test_query_chain import _install_fakes
+
+    _, calls = _install_fakes(monkeypatch)
+    monkeypatch.setattr(admission.settings, "MODE", "live")
+    monkeypatch.setattr(admission.settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "RERANK_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(admission.settings, "RERANK_MAX_QUEUE", 0)
+    monkeypatch.setattr(admission.settings, "RATE_LIMITS", "ask=0.01:2")
+    from persian_linux_rag.app.core import deps
+
+    gate = deps.get_components().admission
+    gate.stages["rerank"].active = 1  # the only rerank slot is taken
+
+    client = TestClient(app)
+    r = client.post("/ask", json={"question": "What is Linux?", "top_k": 2})
+    assert r.status_code == 200 and r.json()["answer"] == "Linux is a kernel."
+    assert [c["source"] for c in r.json()["citations"]] == ["s0", "s1"]  # retrieval order
+    assert calls["rerank"] == 0
+
+    client.post("/ask", json={"question": "Another question", "top_k": 2})
+    r = client.post("/ask", json={"question": "A third one", "top_k": 2})
+    assert r.status_code == 429 and int(r.headers["retry-after"]) >= 1
+    assert gate.stats()["shed"] == {"rerank:queue_full": 2, "ask:rate_limited": 1}
+
+
+def test_saturated_llm_sheds_uncached_stream_with_503(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.app.core import deps
+    from persian_linux_rag.main import app
+    from test_query_chain import _install_fakes
+
+    _, calls = _install_fakes(monkeypatch)
+    monkeypatch.setattr(admission.settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(admission.settings, "LLM_MAX_QUEUE", 0)
+    deps.get_components().admission.stages["llm"].active = 1
+
+    r = TestClient(app).post("/ask/stream", json={"question": "What is Linux?"})
+    assert r.status_code == 503 and r.headers["retry-after"] == "2"
+    assert calls == {"retrieve": 0, "rerank": 0}
+
+
+def test_saturated_llm_still_streams_cached_answers(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.app.adapters.answer_cache import AnswerCache, MemoryAnswerBackend
+    from persian_linux_rag.app.core import deps
+    from persian_linux_rag.main import app
+    from test_query_chain import _install_fakes, _sse_events
+
+    embedder, calls = _install_fakes(monkeypatch)
+    monkeypatch.setattr(query_chain, "collection_count", lambda: 3)
+    monkeypatch.setattr(admission.settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(admission.settings, "LLM_MAX_QUEUE", 0)
+    cache = AnswerCache(MemoryAnswerBackend(10), ttl=0, threshold=1.0)
+    cache.put("What is Linux?", "A kernel.", [{"source": "s0", "snippet": "x", "url": None}])
+    deps._components.answer_cache = cache
+    gate = deps.get_components().admission
+    gate.stages["llm"].active = gate.stages["llm"].limit
+
+    r = TestClient(app).post("/ask/stream", json={"question": "what is linux"})
+    assert r.status_code == 200
+    tokens = [e[1] for e in _sse_events(r.text) if e[0] == "token"]
+    assert "".join(tokens) == "A kernel." and _sse_events(r.text)[-1] == ("done", "done")
+    assert calls == {"retrieve": 0, "rerank": 0} and embedder.calls == 0
+    assert gate.stats()["shed"] == {}
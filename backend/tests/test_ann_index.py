@@ -0,0 +1,86 @@
+import numpy as np
+
+from persian_linux_rag.app.adapters import local_index
+from persian_linux_rag.app.adapters.ann_index import IVFIndex, read_ivf_info
+from persian_linux_rag.app.adapters.local_index import LocalIndex, load_local_index
+
+
+class GrowingCollection:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.n = len(vectors)
+
+    def count(self):
+        return self.n
+
+    def get(self, offset=0, limit=None, include=()):
+        rows = range(offset, min(self.n, offset + (limit or self.n)))
+        return {
+            "ids": [f"c{i}" for i in rows],
+            "embeddings": [self.vectors[i] for i in rows],
+            "documents": [f"text {i}" for i in rows],
+            "metadatas": [{"source": f"s{i}"} for i in rows],
+        }
+
+
+def _clustered(rng, n, dim, clusters=20):
+    centers = rng.standard_normal((clusters, dim))
+    x = centers[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_recall_grows_with_nprobe_and_full_probe_is_exact():
+    rng = np.random.default_rng(0)
+    vectors = _clustered(rng, 2000, 16)
+    ivf = IVFIndex.build(vectors, nlist=32, sample=2000)
+    exact = LocalIndex([f"c{i}" for i in range(2000)], [""] * 2000, [{}] * 2000, vectors)
+    approx = LocalIndex(exact.ids, exact.texts, exact.metadatas, vectors, ann=ivf)
+
+    queries = vectors[rng.integers(0, 2000, 30)] + 0.05 * rng.standard_normal((30, 16)).astype(np.float32)
+    recall = {}
+    for nprobe in (1, 4, 32):
+        approx.nprobe = nprobe
+        hits = sum(len(set(exact.top_k(q, 10)[0]) & set(approx.top_k(q, 10)[0])) for q in queries)
+        recall[nprobe] = hits / 300
+    assert recall[1] <= recall[4] <= recall[32] == 1.0
+    assert recall[4] > 0.9
+    assert sorted(ivf.probe(queries[0] / np.linalg.norm(queries[0]), 32)) == list(range(2000))
+
+
+def test_new_chunks_are_appended_without_retraining(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    vectors = _clustered(rng, 600, 8)
+    collection = GrowingCollection(vectors.tolist())
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_PATH", str(tmp_path))
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_ANN", "ivf")
+    monkeypatch.setattr(local_index.settings, "IVF_NLIST", 8)
+    monkeypatch.setattr(local_index.settings, "IVF_NPROBE", 8)
+
+    collection.n = 500
+    index = load_local_index(collection)
+    centroids = index.ann.centroids.copy()
+    assert len(index) == len(index.ann) == 500 and read_ivf_info(str(tmp_path))["trained_on"] == 500
+
+    collection.n = 600
+    exported = []
+    monkeypatch.setattr(local_index, "export_collection", lambda *a, **kw: exported.append(a))
+    index = load_local_index(collection)
+
+    assert not exported  # appended, not re-exported
+    assert len(index) == len(index.ann) == 600
+    assert np.array_equal(index.ann.centroids, centroids)
+    assert read_ivf_info(str(tmp_path)) == {"count": 600, "nlist": 8, "trained_on": 500}
+    docs = index.search(vectors[550], k=1)
+    assert docs[0].metadata["id"] == "c550" and docs[0].page_content == "text 550"
+
+
+def test_centroid_sums_include_every_row_when_last_lists_are_empty(monkeypatch):
+    from persian_linux_rag.app.adapters import ann_index
+
+    x = np.array([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]], dtype=np.float32)
+    # everything lands in list 0, lists 1 and 2 stay empty
+    monkeypatch.setattr(ann_index, "assign_lists", lambda v, c: np.zeros(len(v), dtype=np.int32))
+    centroids = ann_index.train_centroids(x, nlist=3, iters=1, sample=3)
+
+    mean = x.sum(axis=0) / np.linalg.norm(x.sum(axis=0))
+    assert np.allclose(centroids[0], mean, atol=1e-6)
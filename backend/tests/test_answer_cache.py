@@ -0,0 +1,74 @@
+import pytest
+
+from persian_linux_rag.app.adapters.answer_cache import (
+    AnswerCache,
+    MemoryAnswerBackend,
+    SQLiteAnswerBackend,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteAnswerBackend(str(tmp_path / "answers.sqlite3"), max_entries=2)
+    return MemoryAnswerBackend(max_entries=2)
+
+
+def test_exact_hit_uses_persian_normalization(backend):
+    cache = AnswerCache(backend, ttl=0, threshold=1.0)
+    cache.put("لينوكس چيست؟", "answer", [{"source": "s", "snippet": "x", "url": None}])
+
+    hit = cache.get_exact("لینوکس  چیست")
+
+    assert hit is not None and hit.answer == "answer"
+    assert cache.stats()["hits_exact"] == 1
+
+
+def test_semantic_hit_above_threshold(backend):
+    cache = AnswerCache(backend, ttl=0, threshold=0.9)
+    cache.put("لینوکس چیست", "answer", [], embedding=[1.0, 0.0, 0.0])
+
+    assert cache.get_similar([0.99, 0.05, 0.0]).answer == "answer"
+    assert cache.get_similar([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["hits_semantic"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_generation_change_and_lru_eviction(backend):
+    cache = AnswerCache(backend, ttl=0, threshold=1.0)
+    cache.put("a", "A", [], generation="1")
+    cache.put("b", "B", [], generation="1")
+    cache.get_exact("a", generation="1")
+    cache.put("c", "C", [], generation="1")
+
+    assert cache.get_exact("b", generation="1") is None  # least recently used
+    assert cache.get_exact("a", generation="2") is None  # corpus changed
+    assert cache.get_exact("c", generation="1").answer == "C"
+
+
+def test_semantic_index_updates_in_place(backend):
+    cache = AnswerCache(backend, ttl=0, threshold=0.9)
+    cache.put("a", "A", [], embedding=[1.0, 0.0, 0.0])
+    assert cache.get_similar([1.0, 0.0, 0.0]).answer == "A"  # first lookup loads rows
+
+    backend.items = lambda: pytest.fail("index rebuilt from the backend")
+    cache.put("b", "B", [], embedding=[0.0, 1.0, 0.0])
+    cache.put("a", "A2", [], embedding=[0.0, 0.0, 1.0])  # replaces a's row
+    assert cache.get_similar([0.0, 0.0, 1.0]).answer == "A2"
+    assert cache.get_similar([1.0, 0.0, 0.0]) is None
+
+    cache.put("c", "C", [], embedding=[1.0, 0.0, 0.0])  # evicts b (max_entries=2)
+    assert cache.get_similar([0.0, 1.0, 0.0]) is None
+    assert cache.get_similar([1.0, 0.0, 0.0]).answer == "C"
+
+
+def test_sqlite_stores_float32_embeddings(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    AnswerCache(SQLiteAnswerBackend(path, 10), ttl=0, threshold=0.9).put(
+        "a", "A", [], embedding=[0.6, 0.8]
+    )
+
+    reopened = AnswerCache(SQLiteAnswerBackend(path, 10), ttl=0, threshold=0.9)
+    blob = reopened.backend._conn.execute("SELECT embedding FROM answers").fetchone()[0]
+    assert len(blob) == 2 * 4
+    assert reopened.get_similar([0.6, 0.8]).answer == "A"
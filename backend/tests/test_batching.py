@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from persian_linux_rag.app.adapters import cohere_client
+from persian_linux_rag.app.adapters.batching import MicroBatcher
+
+
+def test_concurrent_submits_share_one_batch():
+    seen = []
+
+    async def batch_fn(items):
+        seen.append(list(items))
+        return [i * 10 for i in items]
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch=8, max_wait=0.01)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3))), batcher
+
+    results, batcher = asyncio.run(main())
+
+    assert results == [0, 10, 20]
+    assert seen == [[0, 1, 2]]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_short_batch_result_fails_every_caller():
+    async def batch_fn(items):
+        return [i * 10 for i in items[:-1]]
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch=8, max_wait=0.01)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), 1.0
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_rerank_batch_groups_same_query(monkeypatch):
+    calls = []
+
+    async def fake_direct(query, docs, top_n):
+        calls.append((query, list(docs)))
+        # score = doc length, so longer docs rank first
+        ranked = sorted(range(len(docs)), key=lambda i: -len(docs[i]))[:top_n]
+        return SimpleNamespace(
+            results=[SimpleNamespace(index=i, relevance_score=len(docs[i])) for i in ranked]
+        )
+
+    monkeypatch.setattr(cohere_client, "_arerank_direct", fake_direct)
+    out = asyncio.run(
+        cohere_client._rerank_batch(
+            [("q", ["a", "ccc"], 2), ("q", ["bb", "ccc"], 1), ("other", ["x"], 1)]
+        )
+    )
+
+    assert sorted(calls) == [("other", ["x"]), ("q", ["a", "ccc", "bb"])]
+    assert [r.index for r in out[0].results] == [1, 0]
+    assert [r.index for r in out[1].results] == [1]
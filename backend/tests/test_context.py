@@ -0,0 +1,60 @@
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.core.config import settings
+from persian_linux_rag.app.graphs.context import (
+    context_token_budget,
+    estimate_tokens,
+    pack_context,
+)
+
+PAGE = " ".join(f"جمله شماره {i} درباره لینوکس است." for i in range(60))
+
+
+def _chunk(start, end, source="book.pdf", page=3):
+    return Document(
+        page_content=PAGE[start:end],
+        metadata={"source": source, "page": page, "start_index": start},
+    )
+
+
+def test_overlapping_chunks_merge_and_duplicates_drop():
+    docs = [
+        _chunk(400, 900),
+        Document(page_content="متن دیگری از منبع دوم", metadata={"source": "web"}),
+        _chunk(750, 1250),  # overlaps the first by 150 chars
+        _chunk(400, 900, source="mirror.pdf"),  # same text, other source
+        _chunk(0, 300),  # same page, not contiguous
+    ]
+    context, packed = pack_context(docs, budget=0)
+
+    assert [d.metadata["source"] for d in packed] == ["book.pdf", "web", "book.pdf"]
+    assert packed[0].page_content == PAGE[400:1250]
+    assert packed[0].metadata["start_index"] == 400
+    assert context.startswith("[1] " + PAGE[400:1250]) and "\n\n[3] " in context
+    assert "[4]" not in context
+
+
+def test_budget_trims_in_rank_order(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_MIN_PASSAGE_TOKENS", 10)
+    docs = [_chunk(i * 300, i * 300 + 250, page=i) for i in range(4)]
+    full = sum(estimate_tokens(d.page_content) + 3 for d in docs)
+    budget = full - 40
+
+    context, packed = pack_context(docs, budget=budget)
+    assert len(packed) == 4 and estimate_tokens(context) <= budget
+    assert packed[:3] == docs[:3]
+    assert docs[3].page_content.startswith(packed[3].page_content)
+
+    # a tail below CONTEXT_MIN_PASSAGE_TOKENS is left out
+    _, packed = pack_context(docs, budget=full - estimate_tokens(docs[3].page_content))
+    assert packed == docs[:3]
+
+
+def test_token_budget_per_model(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_TOKEN_BUDGET", 3000)
+    monkeypatch.setattr(settings, "CONTEXT_TOKEN_BUDGETS", "small-model=800, big-model=6000")
+    assert context_token_budget("small-model") == 800
+    assert context_token_budget("big-model") == 6000
+    assert context_token_budget("other") == 3000
+    assert estimate_tokens("Linux kernel") == 4
+    assert estimate_tokens("لینوکس!") == 3
@@ -0,0 +1,47 @@
+import asyncio
+
+from persian_linux_rag.app.adapters.embeddings_lc import BatchingQueryEmbedder, CachingQueryEmbedder
+
+
+class CountingBase:
+    def __init__(self):
+        self.seen = []
+
+    def embed_query(self, text):
+        self.seen.append(text)
+        return [float(len(text)), 1.0]
+
+
+def test_query_embedder_normalizes_and_persists(tmp_path):
+    path = str(tmp_path / "q.npz")
+    base = CountingBase()
+    emb = CachingQueryEmbedder(base, max_entries=10, path=path)
+
+    first = emb.embed_query("لينوكس چيست")
+    assert emb.embed_query("لینوکس  چیست") == first
+    assert base.seen == ["لینوکس چیست"]
+    emb.save()
+
+    reloaded = CachingQueryEmbedder(CountingBase(), max_entries=10, path=path)
+    assert reloaded.embed_query("لینوکس چیست") == first
+    assert reloaded.stats()["hits"] == 1
+
+
+class BatchBase:
+    def __init__(self):
+        self.calls = []
+
+    async def aembed(self, texts, input_type):
+        self.calls.append((list(texts), input_type))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_concurrent_queries_share_one_deduplicated_embed_call():
+    base = BatchBase()
+
+    async def main():
+        emb = BatchingQueryEmbedder(base, max_batch=8, max_wait=0.01)
+        return await asyncio.gather(*(emb.aembed_query(q) for q in ("ls", "chmod", "ls")))
+
+    assert asyncio.run(main()) == [[2.0, 1.0], [5.0, 1.0], [2.0, 1.0]]
+    assert base.calls == [(["ls", "chmod"], "search_query")]
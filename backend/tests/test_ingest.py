@@ -0,0 +1,263 @@
+import gzip
+import os
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.core.config import settings
+from persian_linux_rag.app.ingest.manifest import IngestManifest
+from persian_linux_rag.app.ingest.normalize import normalize_document_text
+from persian_linux_rag.app.ingest.pipeline import run_ingest, split_groups
+from persian_linux_rag.app.ingest.stream import StreamingIngestor
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for row in zip(ids, documents, metadatas, embeddings):
+            self.rows[row[0]] = row[1:]
+
+    def update(self, ids, metadatas):
+        for i, meta in zip(ids, metadatas):
+            text, _, vector = self.rows[i]
+            self.rows[i] = (text, meta, vector)
+
+    def get(self, include, limit, offset):
+        return {"ids": list(self.rows)[offset : offset + limit]}
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+
+class FlakyEmbedder:
+    def __init__(self, fail_times=1):
+        self.fail_times = fail_times
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("429 TooManyRequests")
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_normalize_document_text():
+    raw = "كتاب  لينوكس\nادامه\u200f جمله ، تمام.\n\n\n\nبعدی"
+    assert normalize_document_text(raw) == "کتاب لینوکس ادامه جمله، تمام.\n\nبعدی"
+
+
+def _write_corpus(root, names, tag=""):
+    (root / "sub").mkdir(parents=True, exist_ok=True)
+    for i in names:
+        (root / "sub" / f"doc{i}.txt").write_text(
+            "\n\n".join(f"پاراگراف {i}-{j}{tag} " + "لینوکس " * 20 for j in range(5)),
+            encoding="utf-8",
+        )
+
+
+def test_run_ingest_streams_batches_and_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(settings, "INGEST_EMBED_BATCH", 4)
+    monkeypatch.setattr(settings, "INGEST_EMBED_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "INGEST_BACKOFF_BASE", 0.0)
+    _write_corpus(tmp_path, range(3))
+    (tmp_path / "ignored.bin").write_bytes(b"\x00")
+    manifest = IngestManifest(str(tmp_path / "manifest.sqlite3"))
+
+    collection, embed = FakeCollection(), FlakyEmbedder()
+    stats = run_ingest([str(tmp_path)], collection=collection, embed_fn=embed, manifest=manifest)
+
+    assert stats.documents == 3
+    assert stats.chunks == len(collection.rows) == 15
+    assert stats.retries == 1
+    assert max(embed.calls) <= 4
+    text, meta, _ = next(iter(collection.rows.values()))
+    assert meta["source"].endswith(".txt") and "start_index" in meta
+
+    # unchanged sources are skipped before splitting and embedding
+    embed = FlakyEmbedder(0)
+    stats = run_ingest([str(tmp_path)], collection=collection, embed_fn=embed, manifest=manifest)
+    assert stats.sources_unchanged == 3 and stats.chunks == 0 and embed.calls == []
+
+
+def test_incremental_reingest_diff(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_OVERLAP", 0)
+    root = tmp_path / "corpus"
+    _write_corpus(root, range(3))
+    # a mirror of doc0 only adds references, not embeddings
+    (root / "mirror.txt").write_text((root / "sub" / "doc0.txt").read_text("utf-8"), "utf-8")
+    manifest = IngestManifest(":memory:")
+    collection = FakeCollection()
+    stats = run_ingest([str(root)], collection=collection, embed_fn=FlakyEmbedder(0), manifest=manifest)
+    assert stats.sources == 4 and stats.duplicates == 5 and len(collection.rows) == 15
+    first = manifest.corpus_version()
+    assert first is not None
+
+    # edit doc1, delete doc2
+    _write_corpus(root, [1], tag="*")
+    (root / "sub" / "doc2.txt").unlink()
+    dry = run_ingest([str(root)], collection=collection, embed_fn=None, manifest=manifest, dry_run=True)
+    assert (dry.sources_unchanged, dry.sources_removed) == (2, 1)
+    assert (dry.chunks, dry.chunks_deleted) == (5, 10)
+    assert len(collection.rows) == 15  # dry run wrote nothing
+    assert manifest.corpus_version() == first
+
+    embed = FlakyEmbedder(0)
+    stats = run_ingest([str(root)], collection=collection, embed_fn=embed, manifest=manifest)
+    assert stats.to_dict()["chunks"] == 5 and sum(embed.calls) == 5
+    assert stats.chunks_deleted == 10 and len(collection.rows) == 10
+    second = manifest.corpus_version()
+    assert second != first
+
+    # removing the copy of a mirrored page that the shared chunks cite keeps
+    # them, now citing the surviving copy
+    doc0 = str(root / "sub" / "doc0.txt")
+    owners = {meta["source"] for _, meta, _ in collection.rows.values()}
+    cited = next(s for s in owners if s.endswith(("mirror.txt", "doc0.txt")))
+    os.unlink(cited)
+    stats = run_ingest([str(root)], collection=collection, embed_fn=FlakyEmbedder(0), manifest=manifest)
+    assert stats.sources_removed == 1 and stats.chunks_deleted == 0 and len(collection.rows) == 10
+    assert stats.chunks_repointed == 5
+    assert cited not in {meta["source"] for _, meta, _ in collection.rows.values()}
+    assert manifest.corpus_version() != second
+
+
+def test_first_run_replaces_legacy_uuid_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_OVERLAP", 0)
+    _write_corpus(tmp_path, range(2))
+    collection = FakeCollection()
+    # a notebook-built collection: random ids the manifest never saw
+    collection.upsert(["8d5f1c1e-uuid-a", "8d5f1c1e-uuid-b"], ["a", "b"], [{}, {}], [[0.0], [1.0]])
+    manifest = IngestManifest(":memory:")
+    stats = run_ingest([str(tmp_path)], collection=collection, embed_fn=FlakyEmbedder(0), manifest=manifest)
+    assert stats.legacy_deleted == 2 and len(collection.rows) == stats.chunks == 10
+
+    # only once: later rows the manifest does not know about are left alone
+    collection.upsert(["other"], ["c"], [{}], [[2.0]])
+    _write_corpus(tmp_path, [1], tag="*")
+    stats = run_ingest([str(tmp_path)], collection=collection, embed_fn=FlakyEmbedder(0), manifest=manifest)
+    assert stats.legacy_deleted == 0 and "other" in collection.rows
+
+
+def test_interleaved_pages_of_a_source_are_all_indexed(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_OVERLAP", 0)
+    docs = [
+        Document(page_content=f"صفحه {p} از {s} " + "لینوکس " * 20, metadata={"source": s, "page": p})
+        for p in range(2)
+        for s in ("a.pdf", "b.pdf")
+    ]
+    collection = FakeCollection()
+    stats = run_ingest([], collection=collection, embed_fn=FlakyEmbedder(0), docs=docs, manifest=IngestManifest(":memory:"))
+    assert (stats.documents, stats.sources, stats.chunks) == (4, 2, 4)
+    assert sorted((m["source"], m["page"]) for _, m, _ in collection.rows.values()) == [
+        ("a.pdf", 0), ("a.pdf", 1), ("b.pdf", 0), ("b.pdf", 1)
+    ]
+
+
+def test_parallel_split_matches_serial_order(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_UNIT_PAGES", 3)
+    groups = [
+        (i, [Document(page_content=f"صفحه {i}-{p} " + "متن " * 60, metadata={"source": f"s{i}"}) for p in range(2)])
+        for i in range(7)
+    ]
+    serial = [(k, [c.page_content for c in chunks]) for k, chunks in split_groups(groups, workers=1)]
+    parallel = [(k, [c.page_content for c in chunks]) for k, chunks in split_groups(groups, workers=2)]
+    assert parallel == serial and [k for k, _ in serial] == list(range(7))
+
+
+def test_streaming_ingestor_flushes_pages_as_they_arrive(tmp_path, monkeypatch):
+    bs4 = pytest.importorskip("bs4")
+    from persian_linux_rag.app.ingest.loaders import html_document, iter_documents
+
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_OVERLAP", 0)
+    pages = {
+        f"https://example.org/p{i}.html": f"<title>p{i}</title><p>{'لینوکس آزاد است ' * 10}{i}</p>"
+        for i in range(5)
+    }
+    collection, embed = FakeCollection(), FlakyEmbedder(0)
+    manifest = IngestManifest(":memory:")
+    with StreamingIngestor(collection, embed, manifest, flush_docs=2, flush_s=60) as ingestor:
+        for url, html in pages.items():
+            ingestor.add(html_document(bs4.BeautifulSoup(html, "html.parser"), url))
+        ingestor.flush(wait=True)
+        # two full flushes and the remainder, each indexed without waiting for the rest
+        assert ingestor.stats.sources == 5 and len(embed.calls) == 3
+    text, meta, _ = next(iter(collection.rows.values()))
+    assert meta["title"] == "p0" and meta["source"].startswith("https://")
+
+    # re-crawl of an unchanged page is skipped by content hash
+    with StreamingIngestor(collection, embed, manifest, flush_s=0) as ingestor:
+        url = next(iter(pages))
+        ingestor.add(html_document(bs4.BeautifulSoup(pages[url], "html.parser"), url))
+    assert ingestor.stats.sources_unchanged == 1 and len(embed.calls) == 3
+
+    # the crawler's compressed archive loads like a plain HTML file
+    archive = tmp_path / "p0.html.gz"
+    with gzip.open(archive, "wt", encoding="utf-8") as f:
+        f.write(pages[url])
+    (doc,) = iter_documents([str(tmp_path)])
+    assert doc.metadata == {"source": str(archive), "title": "p0"}
+
+
+def test_finished_ingest_job_invalidates_cached_answers(monkeypatch):
+    from persian_linux_rag.app.adapters import vectordb
+    from persian_linux_rag.app.adapters.answer_cache import AnswerCache, MemoryAnswerBackend
+    from persian_linux_rag.app.core import deps
+    from persian_linux_rag.app.core.components import Components
+    from persian_linux_rag.app.ingest import jobs
+
+    cache = AnswerCache(MemoryAnswerBackend(10), ttl=0, threshold=1.0)
+    cache.put("لینوکس چیست", "stale", [])
+    monkeypatch.setattr(deps, "_components", Components(answer_cache=cache))
+
+    def same_count_reingest(sources, stats, dry_run):
+        stats.chunks = stats.chunks_deleted = 3  # replaced, count unchanged
+
+    monkeypatch.setattr(jobs, "run_ingest", same_count_reingest)
+    monkeypatch.setattr(vectordb, "_version_cache", (time.monotonic(), "before"))
+    ingest = jobs.IngestJobs()
+    ingest.submit(["docs"])
+    ingest._executor.shutdown(wait=True)
+
+    assert vectordb._version_cache is None  # re-read from the manifest next time
+    assert cache.get_exact("لینوکس چیست") is None
+
+
+def test_ingest_endpoint_only_accepts_sources_under_ingest_sources(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.app.api import ingest as ingest_api
+    from persian_linux_rag.main import app
+
+    root = tmp_path / "data"
+    _write_corpus(root, [0])
+    submitted = []
+
+    class Jobs:
+        def submit(self, sources, dry_run=False):
+            submitted.append(sources)
+            return type("Job", (), {"to_dict": lambda self: {"sources": sources}})()
+
+    monkeypatch.setattr(settings, "INGEST_SOURCES", f"{root},https://example.org/docs")
+    monkeypatch.setattr(ingest_api, "get_ingest_jobs", lambda: Jobs())
+    client = TestClient(app)
+
+    for source in ("/etc/passwd", str(root / ".." / "secrets"), "https://example.org/docs", "http://169.254.169.254/"):
+        r = client.post("/ingest", json={"sources": [source], "dry_run": True})
+        assert r.status_code == 400, source
+    assert not submitted
+
+    r = client.post("/ingest", json={"sources": [str(root / "sub" / ".." / "sub")], "dry_run": True})
+    assert r.status_code == 202
+    assert submitted == [[str(root / "sub")]]
@@ -0,0 +1,93 @@
+import numpy as np
+
+from persian_linux_rag.app.adapters import local_index
+from persian_linux_rag.app.adapters.local_index import LocalIndex, export_collection
+
+
+class FakeCollection:
+    def __init__(self, vectors, prefix="c"):
+        self.vectors = vectors
+        self.prefix = prefix
+
+    def count(self):
+        return len(self.vectors)
+
+    def get(self, offset=0, limit=None, include=()):
+        rows = range(offset, min(len(self.vectors), offset + (limit or len(self.vectors))))
+        return {
+            "ids": [f"{self.prefix}{i}" for i in rows],
+            "embeddings": [self.vectors[i] for i in rows],
+            "documents": [f"text {i}" for i in rows],
+            "metadatas": [{"source": f"s{i}"} for i in rows],
+        }
+
+
+def test_export_load_and_search_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 8)).tolist()
+    export_collection(FakeCollection(vectors), str(tmp_path), page_size=7)
+
+    index = LocalIndex.load(str(tmp_path))
+    docs = index.search(vectors[13], k=3)
+
+    assert len(index) == 50
+    score = docs[0].metadata.pop("score")
+    assert docs[0].metadata == {"source": "s13", "id": "c13"}
+    assert abs(score - 1.0) < 1e-5 and docs[1].metadata["score"] < score
+    assert docs[0].page_content == "text 13"
+    assert len(docs) == 3
+
+    # lambda 1 is plain relevance, so MMR over the pool reproduces top-k
+    mmr = index.search_mmr(vectors[13], k=3, fetch_k=10, lambda_mult=1.0)
+    assert [d.metadata["id"] for d in mmr] == [d.metadata["id"] for d in docs]
+    assert mmr[0].metadata["score"] == score
+
+    # a float32 query embedding is the caller's: searching must not rescale it
+    q = np.asarray(vectors[13], dtype=np.float32) * 3
+    before = q.copy()
+    index.search(q, k=3)
+    index.top_k(q, 3)
+    assert np.array_equal(q, before)
+
+
+def test_quantized_scan_rescores_to_exact_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_index, "BLOCK_ROWS", 64)  # several blocks
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((300, 32)).tolist()
+    exact_dir = tmp_path / "exact"
+    export_collection(FakeCollection(vectors), str(exact_dir), page_size=50, quantization="none")
+    exact = LocalIndex.load(str(exact_dir))
+
+    for mode, ratio in (("int8", 4), ("binary", 32)):
+        path = tmp_path / mode
+        info = export_collection(FakeCollection(vectors), str(path), page_size=50, quantization=mode)
+        index = LocalIndex.load(str(path), rescore_k=60)
+        assert info["quantization"] == mode and index.quantization == mode
+        assert index.vectors.nbytes / index.codes.nbytes == ratio
+
+        q = np.asarray(vectors[42]) + 0.1 * rng.standard_normal(32)
+        docs = index.search(q, k=5)
+        truth = exact.search(q, k=5)
+        assert docs[0].metadata["id"] == "c42"
+        # rescored from the float32 rows: same scores as the exact index
+        assert abs(docs[0].metadata["score"] - truth[0].metadata["score"]) < 1e-6
+        assert len({d.metadata["id"] for d in docs} & {d.metadata["id"] for d in truth}) >= 4
+
+
+def test_same_count_replacement_is_re_exported(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_PATH", str(tmp_path))
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_QUANTIZATION", "none")
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_ANN", "none")
+    old = FakeCollection(rng.standard_normal((20, 4)).tolist())
+    assert local_index.load_local_index(old).ids[0] == "c0"
+
+    exported = []
+    real_export = local_index.export_collection
+    monkeypatch.setattr(local_index, "export_collection", lambda *a, **kw: exported.append(a) or real_export(*a, **kw))
+    assert local_index.load_local_index(old).ids[0] == "c0"
+    assert not exported  # unchanged: served from the export as is
+
+    new = FakeCollection(rng.standard_normal((20, 4)).tolist(), prefix="r")
+    index = local_index.load_local_index(new)
+    assert len(exported) == 1 and len(index) == 20 and index.ids[0] == "r0"
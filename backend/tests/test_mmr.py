@@ -0,0 +1,92 @@
+import numpy as np
+
+from persian_linux_rag.app.adapters import vectordb
+from persian_linux_rag.app.adapters.mmr import mmr_select
+from persian_linux_rag.app.core import deps
+from persian_linux_rag.app.core.components import Components
+
+
+def _reference_mmr(q, vectors, k, lam):
+    v = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = q / np.linalg.norm(q)
+    picked = []
+    while len(picked) < k:
+        best, best_score = None, -np.inf
+        for i in range(len(v)):
+            if i in picked:
+                continue
+            redundancy = max((float(v[i] @ v[j]) for j in picked), default=0.0)
+            score = lam * float(v[i] @ q) - (1 - lam) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        picked.append(best)
+    return picked
+
+
+def test_mmr_matches_reference_and_spreads_duplicates():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((40, 16)).astype(np.float32)
+    q = rng.standard_normal(16).astype(np.float32)
+    for lam in (1.0, 0.7, 0.3):
+        assert mmr_select(q, vectors, 8, lam) == _reference_mmr(q, vectors, 8, lam)
+
+    # three near-copies of the best hit: MMR keeps one of them, top-k keeps all
+    base = q + 0.05 * rng.standard_normal(16).astype(np.float32)
+    dupes = np.stack([base + 0.01 * rng.standard_normal(16).astype(np.float32) for _ in range(3)])
+    pool = np.vstack([dupes, vectors])
+    picked = mmr_select(q, pool, 3, 0.5)
+    assert len(set(picked) & {0, 1, 2}) == 1
+    assert mmr_select(q, pool, 100, 0.5)[:1] == picked[:1] and len(mmr_select(q, pool, 100)) == 43
+    assert mmr_select(q, np.empty((0, 16)), 3) == []
+
+
+class FakeCollection:
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def count(self):
+        return len(self.vectors)
+
+    def query(self, query_embeddings, n_results, include):
+        self.calls.append((n_results, tuple(include)))
+        q = np.asarray(query_embeddings[0])
+        sims = self.vectors @ q / np.linalg.norm(self.vectors, axis=1) / np.linalg.norm(q)
+        order = np.argsort(-sims)[:n_results]
+        out = {
+            "ids": [[f"c{i}" for i in order]],
+            "documents": [[f"text {i}" for i in order]],
+            "metadatas": [[{"source": f"s{i}"} for i in order]],
+            "distances": [[float(1 - sims[i]) for i in order]],
+        }
+        if "embeddings" in include:
+            out["embeddings"] = [self.vectors[order]]
+        return out
+
+
+def test_raw_retrieval_runs_mmr_over_one_query(monkeypatch):
+    rng = np.random.default_rng(1)
+    q = rng.standard_normal(8)
+    vectors = np.vstack([np.tile(q, (5, 1)) + 0.01 * rng.standard_normal((5, 8)), rng.standard_normal((20, 8))])
+    collection = FakeCollection(vectors)
+    monkeypatch.setattr(deps, "_components", Components(collection=collection))
+    monkeypatch.setattr(vectordb, "get_chroma_client", lambda: object())
+    monkeypatch.setattr(vectordb, "_count_cache", None)
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_IMPL", "raw")
+    monkeypatch.setattr(vectordb.settings, "FETCH_K", 15)
+    monkeypatch.setattr(vectordb.settings, "MMR_LAMBDA", 0.5)
+
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_SEARCH_TYPE", "similarity")
+    plain = vectordb.retrieve_by_embedding(q.tolist(), k=4)
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_SEARCH_TYPE", "mmr")
+    diverse = vectordb.retrieve_by_embedding(q.tolist(), k=4)
+
+    near_copies = {f"c{i}" for i in range(5)}
+    assert {d.metadata["id"] for d in plain} <= near_copies
+    assert len({d.metadata["id"] for d in diverse} & near_copies) < 4
+    assert diverse[0].metadata["id"] == plain[0].metadata["id"]
+    assert abs(diverse[0].metadata["score"] - 1.0) < 0.01
+    assert [n for n, _ in collection.calls] == [4, 15]
+    assert "embeddings" in collection.calls[1][1]
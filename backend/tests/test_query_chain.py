@@ -0,0 +1,243 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from persian_linux_rag.app.adapters.answer_cache import AnswerCache, MemoryAnswerBackend
+from persian_linux_rag.app.core import deps
+from persian_linux_rag.app.core.components import Components
+from persian_linux_rag.app.graphs import query_chain
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.1, 0.2, 0.3]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def _install_fakes(monkeypatch):
+    embedder = CountingEmbedder()
+    calls = {"retrieve": 0, "rerank": 0}
+    docs = [
+        Document(page_content=f"chunk {i}", metadata={"source": f"s{i}"})
+        for i in range(3)
+    ]
+
+    def fake_retrieve(q_emb, k, lang=None):
+        calls["retrieve"] += 1
+        return list(docs)
+
+    def fake_rerank(query, texts, top_n):
+        calls["rerank"] += 1
+        return SimpleNamespace(
+            results=[SimpleNamespace(index=i) for i in reversed(range(len(texts)))]
+        )
+
+    async def afake_retrieve(q_emb, k, lang=None):
+        return fake_retrieve(q_emb, k)
+
+    async def afake_rerank(query, texts, top_n):
+        return fake_rerank(query, texts, top_n)
+
+    monkeypatch.setattr(query_chain.settings, "RETRIEVER_IMPL", "raw")
+    monkeypatch.setattr(query_chain, "aretrieve_by_embedding", afake_retrieve)
+    monkeypatch.setattr(query_chain, "arerank_with_cohere", afake_rerank)
+    monkeypatch.setattr(
+        deps,
+        "_components",
+        Components(
+            embedder=embedder,
+            llm=FakeListChatModel(responses=["Linux is a kernel."]),
+            answer_cache=None,
+        ),
+    )
+    return embedder, calls
+
+
+def test_answer_question_lc_retrieves_and_reranks_once(monkeypatch):
+    embedder, calls = _install_fakes(monkeypatch)
+
+    resp = query_chain.answer_question_lc("What is Linux?", top_k=2)
+
+    assert resp.answer == "Linux is a kernel."
+    assert [c.source for c in resp.citations] == ["s2", "s1"]
+    assert embedder.calls == 1
+    assert calls == {"retrieve": 1, "rerank": 1}
+
+
+def test_blocking_calls_share_one_event_loop(monkeypatch):
+    _install_fakes(monkeypatch)
+    loops = []
+    fake = query_chain.aretrieve_by_embedding
+
+    async def recording_retrieve(q_emb, k, lang=None):
+        loops.append(asyncio.get_running_loop())
+        return await fake(q_emb, k, lang)
+
+    monkeypatch.setattr(query_chain, "aretrieve_by_embedding", recording_retrieve)
+    query_chain.answer_question_lc("What is Linux?", top_k=2)
+    query_chain.answer_question_lc("What is GNU?", top_k=2)
+
+    assert len(loops) == 2 and loops[0] is loops[1] and not loops[0].is_closed()
+
+
+def test_aanswer_question_lc_retrieves_and_reranks_once(monkeypatch):
+    embedder, calls = _install_fakes(monkeypatch)
+
+    resp = asyncio.run(query_chain.aanswer_question_lc("What is Linux?", top_k=2))
+
+    assert resp.answer == "Linux is a kernel."
+    assert [c.source for c in resp.citations] == ["s2", "s1"]
+    assert embedder.calls == 1
+    assert calls == {"retrieve": 1, "rerank": 1}
+
+
+def test_answer_cache_skips_pipeline_on_repeat(monkeypatch):
+    embedder, calls = _install_fakes(monkeypatch)
+    cache = AnswerCache(MemoryAnswerBackend(10), ttl=0, threshold=0.99)
+    deps._components.answer_cache = cache
+    monkeypatch.setattr(query_chain, "collection_count", lambda: 3)
+
+    first = query_chain.answer_question_lc("What is Linux?", top_k=2)
+    again = query_chain.answer_question_lc("  what is linux ", top_k=2)
+
+    assert again.answer == first.answer
+    assert again.notes == "cache: exact"
+    assert [c.source for c in again.citations] == ["s2", "s1"]
+    assert calls == {"retrieve": 1, "rerank": 1}
+    # the cache-miss embedding was reused by retrieval, not recomputed
+    assert embedder.calls == 1
+
+
+def test_components_are_built_once(monkeypatch):
+    comps = Components(llm=FakeListChatModel(responses=["ok"]))
+    monkeypatch.setattr(deps, "_components", comps)
+    assert deps.get_components() is comps
+    assert comps.chain is comps.chain
+
+
+def test_cohere_models_share_one_pool_with_the_configured_timeout(monkeypatch):
+    monkeypatch.setattr(deps.settings, "COHERE_API_KEY", "test-key")
+    monkeypatch.setattr(deps.settings, "COHERE_TIMEOUT", 123.0)
+    for name in ("_http_clients", "_pooled_clients", "_cohere_client", "_async_cohere_client"):
+        monkeypatch.setattr(deps, name, None)
+    comps = Components()
+
+    embeddings = getattr(comps.embedder.base, "base", comps.embedder.base)  # under the batcher
+    models = [embeddings, comps.llm, comps.stream_llm]
+    assert all(m.client is models[0].client and m.async_client is models[0].async_client for m in models)
+    http, ahttp = deps._shared_http()
+    assert comps.rerank_client._client_wrapper.httpx_client.httpx_client is http
+    assert comps.llm.client._client_wrapper.get_timeout() == 123.0
+    assert ahttp.timeout.read == 123.0
+
+
+def test_confident_retrieval_skips_rerank(monkeypatch):
+    embedder, calls = _install_fakes(monkeypatch)
+    monkeypatch.setattr(query_chain.settings, "RERANK_ADAPTIVE", True)
+    monkeypatch.setattr(query_chain.settings, "RERANK_SKIP_MARGIN", 0.15)
+
+    async def scored_retrieve(q_emb, k, lang=None):
+        calls["retrieve"] += 1
+        return [
+            Document(page_content=f"chunk {i}", metadata={"source": f"s{i}", "score": s})
+            for i, s in enumerate([0.4, 0.9, 0.5])
+        ]
+
+    monkeypatch.setattr(query_chain, "aretrieve_by_embedding", scored_retrieve)
+    resp = query_chain.answer_question_lc("What is Linux?", top_k=2)
+
+    assert [c.source for c in resp.citations] == ["s1", "s2"]
+    assert calls == {"retrieve": 1, "rerank": 0}
+    assert deps.get_components().rerank_policy.stats()["decisions"] == {"skip_margin": 1}
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines.get("event"), lines.get("data")))
+    return events
+
+
+def test_ask_stream_sends_citations_before_tokens(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.main import app
+
+    _, calls = _install_fakes(monkeypatch)
+    deps._components.stream_llm = FakeListChatModel(responses=["Linux is a kernel."])
+
+    with TestClient(app).stream("POST", "/ask/stream", json={"question": "What is Linux?", "top_k": 2}) as r:
+        body = "".join(r.iter_text())
+    assert body.startswith(":")  # the stream opens before retrieval runs
+
+    events = _sse_events(body)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "meta" and kinds[-2:] == ["timing", "done"]
+    assert set(kinds[1:-2]) == {"token"}
+    meta = json.loads(events[0][1])
+    assert [c["source"] for c in meta["citations"]] == ["s2", "s1"]
+    timing = json.loads(events[-2][1])
+    assert timing["ttfb_ms"] <= timing["retrieval_ms"] <= timing["ttft_ms"] <= timing["total_ms"]
+    assert calls == {"retrieve": 1, "rerank": 1}
+
+
+def test_ask_reports_stage_timings_and_metrics(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from persian_linux_rag.app.core.metrics import metrics
+    from persian_linux_rag.main import app
+
+    _install_fakes(monkeypatch)
+    monkeypatch.setattr(query_chain.settings, "MODE", "live")
+    client = TestClient(app)
+
+    monkeypatch.setattr(query_chain.settings, "METRICS_ENABLED", False)
+    metrics.reset()
+    r = client.post("/ask", json={"question": "What is Linux?", "top_k": 2})
+    assert r.status_code == 200 and "server-timing" not in r.headers
+    assert "disabled" in client.get("/metrics").text
+
+    monkeypatch.setattr(query_chain.settings, "METRICS_ENABLED", True)
+    r = client.post("/ask", json={"question": "What is Linux?", "top_k": 2})
+    stages = [part.split(";")[0] for part in r.headers["server-timing"].split(", ")]
+    assert {"retrieve", "embed", "vector_search", "rerank", "prompt", "llm"} <= set(stages)
+
+    text = client.get("/metrics").text
+    assert 'rag_requests_total{endpoint="ask"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="rerank",le="+Inf"} 1' in text
+    assert 'rag_stage_seconds_count{stage="llm"} 1' in text
+    assert 'rag_rerank_decisions_total{decision="full"} 1' in text
+    metrics.reset()
+
+
+def test_identical_concurrent_questions_share_one_pipeline_run(monkeypatch):
+    embedder, calls = _install_fakes(monkeypatch)
+    slow = query_chain.aretrieve_by_embedding
+
+    async def slow_retrieve(q_emb, k, lang=None):
+        await asyncio.sleep(0.05)
+        return await slow(q_emb, k)
+
+    monkeypatch.setattr(query_chain, "aretrieve_by_embedding", slow_retrieve)
+
+    async def ask_both():
+        return await asyncio.gather(
+            query_chain.aanswer_question_lc("What is Linux?", top_k=1),
+            query_chain.aanswer_question_lc("  what is linux ", top_k=3),
+        )
+
+    one, three = asyncio.run(ask_both())
+    assert calls == {"retrieve": 1, "rerank": 1}
+    assert one.answer == three.answer and (one.used_k, three.used_k) == (1, 3)
+    assert deps.get_components().flights.stats()["coalesced"] == 1
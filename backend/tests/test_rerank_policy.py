@@ -0,0 +1,59 @@
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.adapters.rerank_policy import RerankPolicy
+from persian_linux_rag.app.core.config import settings
+
+
+def _docs(scores, texts=None):
+    texts = texts or [f"chunk {i}" for i in range(len(scores))]
+    return [
+        Document(page_content=t, metadata={"id": f"c{i}", "score": s})
+        for i, (t, s) in enumerate(zip(texts, scores))
+    ]
+
+
+def _adaptive(monkeypatch, **knobs):
+    monkeypatch.setattr(settings, "RERANK_ADAPTIVE", True)
+    monkeypatch.setattr(settings, "RERANK_SKIP_MARGIN", 0.15)
+    monkeypatch.setattr(settings, "RERANK_SCORE_WINDOW", 0.2)
+    monkeypatch.setattr(settings, "RERANK_MIN_CANDIDATES", 2)
+    monkeypatch.setattr(settings, "RERANK_MAX_CANDIDATES", 3)
+    monkeypatch.setattr(settings, "RERANK_LEXICAL_PREFILTER", False)
+    for name, value in knobs.items():
+        monkeypatch.setattr(settings, name, value)
+    return RerankPolicy()
+
+
+def test_disabled_policy_sends_everything(monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_ADAPTIVE", False)
+    plan = RerankPolicy().plan("q", _docs([0.9, 0.2, 0.1]))
+    assert (plan.decision, plan.indices, plan.rerank) == ("full", [0, 1, 2], True)
+
+
+def test_dominant_hit_skips_and_window_shortlists(monkeypatch):
+    policy = _adaptive(monkeypatch)
+
+    skip = policy.plan("q", _docs([0.5, 0.8, 0.6]))
+    assert (skip.decision, skip.indices, skip.rerank) == ("skip_margin", [1, 2, 0], False)
+
+    # 0.30 and 0.25 fall outside the 0.2 window; the cap keeps the best 3
+    short = policy.plan("q", _docs([0.7, 0.65, 0.3, 0.6, 0.62, 0.25]))
+    assert (short.decision, short.indices) == ("shortlist", [0, 1, 4])
+
+    few = policy.plan("q", _docs([0.7]))
+    assert few.decision == "skip_few"
+
+    stats = policy.stats()
+    assert stats["decisions"] == {"skip_margin": 1, "shortlist": 1, "skip_few": 1}
+    assert (stats["candidates"], stats["sent_to_reranker"]) == (10, 3)
+
+
+def test_lexical_prefilter_orders_shortlist(monkeypatch):
+    policy = _adaptive(monkeypatch, RERANK_LEXICAL_PREFILTER=True, RERANK_MAX_CANDIDATES=2)
+    texts = ["درباره هسته", "مجوز فایل با chmod", "chmod و chown در لینوکس"]
+    plan = policy.plan("chmod در لینوکس", _docs([0.61, 0.6, 0.55], texts))
+    assert plan.indices == [2, 1]
+
+    # without dense scores nothing is dropped by score, only by the cap
+    unscored = [Document(page_content=t) for t in texts]
+    assert policy.plan("chmod در لینوکس", unscored).indices == [2, 1]
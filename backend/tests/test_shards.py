@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.adapters import vectordb
+from persian_linux_rag.app.core import deps
+from persian_linux_rag.app.core.components import Components
+
+
+class ShardCollection:
+    """Returns fixed cosine similarities, best first, after ``delay`` seconds."""
+
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self, prefix, sims, delay=0.0):
+        self.prefix, self.sims, self.delay = prefix, sims, delay
+        self.queries = 0
+
+    def count(self):
+        return len(self.sims)
+
+    def query(self, query_embeddings, n_results, include):
+        self.queries += 1
+        time.sleep(self.delay)
+        rows = range(min(n_results, len(self.sims)))
+        return {
+            "ids": [[f"{self.prefix}{i}" for i in rows]],
+            "documents": [[f"{self.prefix} text {i}" for i in rows]],
+            "metadatas": [[{"source": self.prefix} for _ in rows]],
+            "distances": [[1.0 - self.sims[i] for i in rows]],
+        }
+
+
+def _install(monkeypatch, shards, spec):
+    monkeypatch.setattr(deps, "_components", Components(shard_collections=shards))
+    monkeypatch.setattr(vectordb, "_count_cache", None)
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_IMPL", "raw")
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_SEARCH_TYPE", "similarity")
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARDS", spec)
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARD_ROUTING", True)
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARD_QUOTA", 0)
+
+
+def test_merge_shard_hits_by_score_with_quota_and_backfill():
+    def docs(*scores):
+        return [Document(page_content="", metadata={"score": s}) for s in scores]
+
+    hits = [docs(0.9, 0.8, 0.7), docs(0.6, 0.5)]
+    assert vectordb.merge_shard_hits(hits, 3) == [0, 1, 2]
+    assert vectordb.merge_shard_hits(hits, 3, quota=1) == [0, 3, 1]
+    # quota leaves a slot empty: filled by score from the capped shard
+    assert vectordb.merge_shard_hits([docs(0.9, 0.8, 0.7), docs(0.1)], 3, quota=1) == [0, 3, 1]
+
+
+def test_language_routing_skips_other_language_shards(monkeypatch):
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARDS", "wiki_fa=fa, stallman=en, linuxbook=*")
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARD_ROUTING", True)
+    assert vectordb.shard_specs() == [("wiki_fa", "fa"), ("stallman", "en"), ("linuxbook", None)]
+    assert vectordb.route_shards("fa") == ["wiki_fa", "linuxbook"]
+    assert vectordb.route_shards(None) == ["wiki_fa", "stallman", "linuxbook"]
+
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARDS", "stallman=en")
+    assert vectordb.route_shards("fa") == ["stallman"]  # nothing routed: search everything
+
+
+def test_sharded_retrieval_merges_by_score(monkeypatch):
+    shards = {
+        "a": ShardCollection("a", [0.9, 0.5, 0.4]),
+        "b": ShardCollection("b", [0.8, 0.7, 0.6]),
+        "fa_only": ShardCollection("f", [0.99]),
+    }
+    _install(monkeypatch, shards, "a,b,fa_only=fa")
+
+    docs = vectordb.retrieve_by_embedding([1.0, 0.0], k=3, lang="en")
+    assert [d.metadata["id"] for d in docs] == ["a0", "b0", "b1"]
+    assert [d.metadata["collection"] for d in docs] == ["a", "b", "b"]
+    assert shards["fa_only"].queries == 0
+
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARD_QUOTA", 1)
+    docs = vectordb.retrieve_by_embedding([1.0, 0.0], k=3, lang="en")
+    assert [d.metadata["id"] for d in docs] == ["a0", "b0", "b1"]
+    docs = vectordb.retrieve_by_embedding([1.0, 0.0], k=3, lang="fa")
+    assert [d.metadata["id"] for d in docs] == ["f0", "a0", "b0"]
+
+
+def test_async_fan_out_costs_the_slowest_shard(monkeypatch):
+    shards = {name: ShardCollection(name, [0.5, 0.4], delay=0.2) for name in ("a", "b", "c")}
+    _install(monkeypatch, shards, "a,b,c")
+    vectordb.collection_count()  # counted once, cached for CHROMA_COUNT_TTL
+
+    t0 = time.perf_counter()
+    docs = asyncio.run(vectordb.aretrieve_by_embedding([1.0, 0.0], k=4))
+    elapsed = time.perf_counter() - t0
+
+    assert len(docs) == 4 and {d.metadata["collection"] for d in docs} == {"a", "b", "c"}
+    assert elapsed < 0.45
+
+
+def test_sync_fan_out_on_a_chroma_thread_runs_inline(monkeypatch):
+    shards = {name: ShardCollection(name, [0.5, 0.4]) for name in ("a", "b")}
+    _install(monkeypatch, shards, "a,b")
+    monkeypatch.setattr(vectordb.settings, "CHROMA_MAX_WORKERS", 1)
+    monkeypatch.setattr(deps, "_chroma_executor", None)
+    pool = deps.get_chroma_executor()
+    try:
+        # the only worker is busy with this call: submitting the shards would hang
+        docs = pool.submit(vectordb.retrieve_by_embedding, [1.0, 0.0], 3).result(timeout=5)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    assert len(docs) == 3 and all(s.queries == 1 for s in shards.values())
+
+
+def test_hybrid_sparse_search_covers_every_routed_shard(monkeypatch):
+    from persian_linux_rag.app.adapters.sparse import BM25Index
+
+    indexes = {name: BM25Index() for name in ("a", "b", "fa_only")}
+    indexes["a"].add(["a0"], ["chmod changes file modes"], [{}])
+    indexes["b"].add(["b0", "b1"], ["chmod --recursive", "the kernel schedules"], [{}, {}])
+    indexes["fa_only"].add(["f0"], ["chmod در لینوکس"], [{}])
+    _install(monkeypatch, {}, "a,b,fa_only=fa")
+    deps._components.shard_bm25_indexes = indexes
+
+    docs = vectordb.retrieve_sparse("chmod", k=5, lang="en")
+    assert sorted(d.metadata["id"] for d in docs) == ["a0", "b0"]
+    assert {d.metadata["id"]: d.metadata["collection"] for d in docs} == {"a0": "a", "b0": "b"}
+    docs = asyncio.run(vectordb.aretrieve_sparse("chmod", k=5, lang="fa"))
+    assert sorted(d.metadata["id"] for d in docs) == ["a0", "b0", "f0"]
+
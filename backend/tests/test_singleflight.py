@@ -0,0 +1,81 @@
+import asyncio
+from contextlib import aclosing
+
+from persian_linux_rag.app.adapters.singleflight import SingleFlight, StreamFlight
+
+
+def test_concurrent_callers_share_one_run_and_its_errors():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("provider down")
+
+    async def main():
+        results = await asyncio.gather(*(flights.run("q", work) for _ in range(5)))
+        errors = await asyncio.gather(*(flights.run("q", fail) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(main())
+    assert results == ["answer"] * 5
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert len(calls) == 2
+    assert flights.stats() == {"enabled": True, "in_flight": 0, "leaders": 2, "coalesced": 6}
+
+
+def test_stream_late_joiner_replays_then_follows():
+    flights = StreamFlight()
+    produced = []
+
+    async def produce(out):
+        produced.append(1)
+        for tok in ("a", "b", "c"):
+            out.publish(tok)
+            await asyncio.sleep(0.03)
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        stream = flights.join("q", produce)
+        return [tok async for tok in stream.subscribe()]
+
+    async def main():
+        return await asyncio.gather(collect(0), collect(0.045))
+
+    first, late = asyncio.run(main())
+    assert first == late == ["a", "b", "c"]
+    assert produced == [1]
+    assert flights.stats()["coalesced"] == 1
+
+
+def test_stream_producer_is_cancelled_once_every_subscriber_leaves():
+    flights = StreamFlight()
+    finished = []
+
+    async def produce(out):
+        try:
+            for tok in ("a", "b", "c", "d"):
+                out.publish(tok)
+                await asyncio.sleep(0.03)
+        finally:
+            finished.append(asyncio.current_task().cancelling() > 0)
+
+    async def main():
+        stream = flights.join("q", produce)
+        async with aclosing(stream.subscribe()) as events:
+            async for tok in events:
+                break
+        await asyncio.sleep(0.01)
+        return stream
+
+    stream = asyncio.run(main())
+    assert finished == [True]
+    assert stream.closed and stream.subscribers == 0
+    assert flights.stats()["in_flight"] == 0
+    assert flights.stats()["abandoned"] == 1
@@ -0,0 +1,63 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from persian_linux_rag.app.adapters.sparse import BM25Index, rrf_fuse
+from persian_linux_rag.app.core.textnorm import tokenize
+
+CHUNKS = {
+    "a": "برای تغییر مجوز فایل\u200cها از دستور chmod --recursive استفاده کنید.",
+    "b": "سرویس systemd-resolved نام\u200cها را ترجمه می\u200cکند.",
+    "c": "نرم\u200cافزار آزاد به کاربر آزادی می\u200cدهد.",
+    "d": "the kernel schedules processes",
+}
+
+
+def _index():
+    index = BM25Index()
+    index.add(list(CHUNKS), list(CHUNKS.values()), [{"source": k} for k in CHUNKS])
+    return index
+
+
+def test_tokenize_splits_compounds_and_flags():
+    toks = tokenize("chmod --recursive systemd-resolved نرم\u200cافزار ۱۲")
+    for tok in ["chmod", "--recursive", "recursive", "systemd", "resolved", "نرم", "افزار", "12"]:
+        assert tok in toks
+
+
+def test_bm25_exact_terms_and_persian_parts():
+    index = _index()
+    assert index.search("chmod -R", k=2)[0].metadata["id"] == "a"
+    assert index.search("resolved", k=2)[0].metadata["id"] == "b"
+    # ZWNJ and space variants of the same compound both hit
+    assert index.search("نرم افزار", k=1)[0].metadata["id"] == "c"
+    assert index.search("نرمافزار", k=1)[0].metadata["id"] == "c"
+
+
+def test_incremental_add_remove_and_persistence(tmp_path):
+    index = _index()
+    index.remove(["a"])
+    index.add(["e"], ["chmod changes the mode bits"], [{}])
+    assert [d.metadata["id"] for d in index.search("chmod", k=5)] == ["e"]
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert len(loaded) == 4 and "a" not in loaded
+    assert [d.metadata["id"] for d in loaded.search("chmod", k=5)] == ["e"]
+    assert loaded.search("kernel", k=1)[0].page_content == CHUNKS["d"]
+
+    # the cached length norm tracks removals and reloads: same scores as a fresh build
+    fresh = BM25Index()
+    live = {cid: text for cid, text in CHUNKS.items() if cid != "a"}
+    live["e"] = "chmod changes the mode bits"
+    fresh.add(list(live), list(live.values()), [{} for _ in live])
+    for q in ("chmod", "kernel", "نرم افزار"):
+        got = dict(zip(index.ids, index.scores(q)))
+        want = dict(zip(fresh.ids, fresh.scores(q)))
+        assert all(abs(got[cid] - want[cid]) < 1e-5 for cid in live)
+        assert np.allclose(loaded.scores(q), fresh.scores(q)[[fresh.ids.index(c) for c in loaded.ids]])
+
+
+def test_rrf_prefers_docs_in_both_lists():
+    doc = lambda i: Document(page_content=i, metadata={"id": i})
+    fused = rrf_fuse([[doc("x"), doc("y")], [doc("z"), doc("y")]], k=2, rrf_k=60)
+    assert [d.metadata["id"] for d in fused] == ["y", "x"]
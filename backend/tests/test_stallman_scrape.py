@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("bs4")
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "stallman_scrape.py"
+spec = importlib.util.spec_from_file_location("stallman_scrape", SCRIPT)
+scrape = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(scrape)
+
+PAGES = {
+    "index.html": '<a href="a.html">a</a> <a href="b.html#x">b</a> <a href="private.html">p</a>',
+    "a.html": '<a href="c.html">c</a> <a href="index.html">home</a> <a href="https://gnu.org/x.html">ext</a>',
+    "b.html": "<p>b</p>",
+    "c.html": "<p>c</p>",
+    "private.html": "<p>secret</p>",
+    "robots.txt": "User-agent: *\nDisallow: /private.html\n",
+}
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    for name, body in PAGES.items():
+        (root / name).write_text(body, encoding="utf-8")
+    hits = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            hits.append((self.path, args[1] if len(args) > 1 else None))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", root, hits
+    server.shutdown()
+
+
+def _crawl(base, out, **kw):
+    return scrape.crawl(base + "/index.html", str(out), delay_min=0, delay_max=0, workers=3, **kw)
+
+
+def test_concurrent_crawl_honors_robots_and_recrawls_conditionally(site, tmp_path):
+    base, root, hits = site
+    out = tmp_path / "out"
+
+    first = _crawl(base, out)
+    assert first["saved"] == 4
+    assert sorted(os.listdir(out)) == [scrape.STATE_FILE, "a.html", "b.html", "c.html", "index.html"]
+    assert not any(path == "/private.html" for path, _ in hits)
+
+    # second pass: every page answers 304 and nothing is rewritten
+    hits.clear()
+    second = _crawl(base, out)
+    assert (second["saved"], second["unchanged"]) == (0, 4)
+    assert {code for path, code in hits if path.endswith(".html")} == {"304"}
+
+    page = root / "b.html"
+    page.write_text("<p>b, edited</p>", encoding="utf-8")
+    st = page.stat()
+    os.utime(page, (st.st_atime, st.st_mtime + 10))
+    third = _crawl(base, out)
+    assert (third["saved"], third["unchanged"]) == (1, 3)
+    assert (out / "b.html").read_text(encoding="utf-8") == "<p>b, edited</p>"
+
+
+def test_interrupted_crawl_resumes_from_saved_frontier(site, tmp_path):
+    base, _root, hits = site
+    out = tmp_path / "out"
+
+    partial_run = _crawl(base, out, max_pages=2)
+    assert partial_run["saved"] == 2 and partial_run["queued"] > 0
+
+    hits.clear()
+    rest = _crawl(base, out)
+    fetched = [path for path, _ in hits if path.endswith(".html")]
+    assert rest["saved"] == 2
+    assert len(fetched) == len(set(fetched)) == 2  # nothing fetched twice
+    assert len([f for f in os.listdir(out) if f.endswith(".html")]) == 4
+
+
+def test_compressed_archive_and_page_callback(site, tmp_path):
+    base, _root, _hits = site
+    out = tmp_path / "out"
+    seen = []
+
+    _crawl(base, out, compress=True, on_page=lambda url, soup: seen.append((url, soup.get_text())))
+    assert sorted(url.rsplit("/", 1)[1] for url, _ in seen) == ["a.html", "b.html", "c.html", "index.html"]
+    assert (base + "/b.html", "b") in seen
+    assert sorted(f for f in os.listdir(out) if f != scrape.STATE_FILE)[0] == "a.html.gz"
+
+    # a 304 re-crawl still hands each page over, parsed from the archive
+    seen.clear()
+    again = _crawl(base, out, compress=True, on_page=lambda url, soup: seen.append((url, soup.get_text())))
+    assert again["unchanged"] == 4 and (base + "/b.html", "b") in seen
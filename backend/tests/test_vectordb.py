@@ -0,0 +1,33 @@
+import pytest
+
+from persian_linux_rag.app.adapters import vectordb
+from persian_linux_rag.app.core import deps
+from persian_linux_rag.app.core.components import Components
+
+
+class StaleCollection:
+    metadata = {"hnsw:space": "cosine"}
+
+    def count(self):
+        return 1
+
+    def query(self, *a, **kw):
+        raise ConnectionError("handle is stale")
+
+
+def test_query_error_keeps_side_indices(monkeypatch):
+    comps = Components(collection=StaleCollection())
+    comps.local_index = comps.bm25_index = object()
+    monkeypatch.setattr(deps, "_components", comps)
+    monkeypatch.setattr(vectordb, "_count_cache", None)
+    monkeypatch.setattr(vectordb, "get_chroma_client", lambda: object())
+    monkeypatch.setattr(vectordb, "_available_collections", lambda: [])
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_IMPL", "raw")
+    monkeypatch.setattr(vectordb.settings, "RETRIEVER_SEARCH_TYPE", "similarity")
+    monkeypatch.setattr(vectordb.settings, "CHROMA_SHARDS", "")
+
+    with pytest.raises(RuntimeError, match="handle is stale"):
+        vectordb.retrieve_by_embedding([1.0, 0.0], k=1)
+    # only the handle and count are refetched; the side indices stay warm
+    assert "collection" not in comps.__dict__ and vectordb._count_cache is None
+    assert "local_index" in comps.__dict__ and "bm25_index" in comps.__dict__
@@ -6,26 +6,42 @@ Saves files under data/html by default.
 
 Usage:
   python scripts/stallman_scrape.py --base-url https://stallman.org --out-dir data/html --max-pages 500
+  python scripts/stallman_scrape.py --workers 4          # concurrent, same per-host politeness
+  cd backend && python ../scripts/stallman_scrape.py --out-dir ../data/html --ingest --compress
 
 Notes:
-- Respects robots.txt.
+- Respects robots.txt (including Crawl-delay).
 - Adds a browser-like User-Agent.
-- Retries on transient errors, with polite randomized delays.
+- Retries on transient errors, with polite randomized delays per host.
 - Only saves .html pages from the same site.
+- Crawl state (seen URLs, frontier, ETag/Last-Modified per page) is kept in
+  <out-dir>/.crawl_state.json: an interrupted crawl resumes where it stopped,
+  and a re-crawl sends conditional requests so unchanged pages are skipped.
+- --ingest streams each fetched page into the backend's ingestion
+  pipeline (normalize, split, batch embed, upsert) as it is fetched, reusing
+  the soup parsed for link extraction. Run it from backend/ so .env and the
+  collection paths resolve as they do for the server. --compress archives
+  pages as .html.gz.
 """
 import argparse
+import gzip
+import json
 import os
+import threading
 import time
 import random
 import sys
 import re
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse, urldefrag, urlunparse
 import requests
 from bs4 import BeautifulSoup
 from urllib import robotparser
 
 DEF_UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
-SEEN = set()
+STATE_FILE = ".crawl_state.json"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
 
 def clean_url(u: str) -> str:
     """Normalize URL (remove fragments, strip tracking querystrings)."""
@@ -53,10 +69,10 @@ def safe_filename_from_url(u: str) -> str:
     name = re.sub(r"[^A-Za-z0-9._\-]", "_", name)
     return name
 
-def request_get(session: requests.Session, url: str, retries=3, timeout=20):
+def request_get(session: requests.Session, url: str, retries=3, timeout=20, headers=None):
     for i in range(retries):
         try:
-            resp = session.get(url, timeout=timeout)
+            resp = session.get(url, timeout=timeout, headers=headers)
             if 200 <= resp.status_code < 300:
                 return resp
             if resp.status_code in (429, 500, 502, 503, 504):
@@ -69,7 +85,128 @@ def request_get(session: requests.Session, url: str, retries=3, timeout=20):
             time.sleep(delay)
     return None
 
-def crawl(base_url: str, out_dir: str, max_pages: int = 0, delay_min=0.5, delay_max=1.5, user_agent=DEF_UA):
+class CrawlState:
+    """Frontier (deque + membership set), seen URLs and per-page validators.
+
+    Persisted as JSON so an interrupted crawl can resume. URLs that were in
+    flight when the state was saved go back to the front of the frontier.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.frontier = deque()
+        self.queued = set()
+        self.seen = set()
+        self.inflight = set()
+        self.validators = {}  # url -> {"etag", "last_modified", "file"}
+
+    def push(self, url):
+        if url not in self.seen and url not in self.queued:
+            self.frontier.append(url)
+            self.queued.add(url)
+
+    def pop(self):
+        url = self.frontier.popleft()
+        self.queued.discard(url)
+        return url
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.seen = set(data.get("seen", []))
+        self.validators = data.get("validators", {})
+        for url in data.get("frontier", []):
+            self.push(url)
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "seen": sorted(self.seen - self.inflight),
+            "frontier": sorted(self.inflight) + list(self.frontier),
+            "validators": self.validators,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+class HostThrottle:
+    """Spaces requests to the same host by a random delay, across all workers."""
+
+    def __init__(self, delay_min, delay_max):
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + random.uniform(self.delay_min, self.delay_max)
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def extract_links(soup, url: str, base_netloc: str):
+    links = set()
+    for a in soup.find_all("a", href=True):
+        full = clean_url(urljoin(url, a["href"]))
+        if is_internal_html(full, base_netloc):
+            links.add(full)
+    return sorted(links)
+
+
+def _open_archive(path, mode="r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def fetch_page(url, out_dir, validators, session, throttle, compress=False):
+    """Fetch and parse one page; returns (status, soup or None, new validators or None)."""
+    headers = {}
+    cached = validators.get(url)
+    if cached and os.path.exists(os.path.join(out_dir, cached["file"])):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    throttle.wait(urlparse(url).netloc)
+    resp = request_get(session, url, headers=headers or None)
+    if resp is None:
+        return None, None, None
+    if resp.status_code == 304:
+        # unchanged: links come from the archived copy, nothing is rewritten
+        with _open_archive(os.path.join(out_dir, cached["file"])) as f:
+            return 304, BeautifulSoup(f.read(), "html.parser"), None
+    if resp.status_code != 200 or "text/html" not in resp.headers.get("Content-Type", ""):
+        return resp.status_code, None, None
+    fname = safe_filename_from_url(url) + (".gz" if compress else "")
+    with _open_archive(os.path.join(out_dir, fname), "w") as f:
+        f.write(resp.text)
+    new = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "file": fname,
+    }
+    return 200, BeautifulSoup(resp.text, "html.parser"), new
+
+
+def crawl(base_url: str, out_dir: str, max_pages: int = 0, delay_min=0.5, delay_max=1.5,
+          user_agent=DEF_UA, workers: int = 1, state_path=None, resume=True, save_every=25,
+          compress=False, on_page=None):
+    """Crawl ``base_url``, calling ``on_page(url, soup)`` for every page fetched.
+
+    Unchanged (304) pages are passed too, parsed from the archive: the ingest
+    manifest skips them by content hash, and a page whose earlier ingestion
+    was interrupted is picked up again.
+    """
     os.makedirs(out_dir, exist_ok=True)
     parsed_base = urlparse(base_url)
     base_netloc = parsed_base.netloc
@@ -81,75 +218,130 @@ def crawl(base_url: str, out_dir: str, max_pages: int = 0, delay_min=0.5, delay_
         rp.read()
     except Exception:
         pass
+    crawl_delay = rp.crawl_delay(user_agent) or 0
+    throttle = HostThrottle(max(delay_min, crawl_delay), max(delay_max, crawl_delay))
+
+    state = CrawlState(state_path if state_path is not None else os.path.join(out_dir, STATE_FILE))
+    if resume and state.load() and state.frontier:
+        print(f"Resuming: {len(state.frontier)} queued, {len(state.seen)} seen")
+    else:
+        # fresh pass; validators from earlier passes still make requests conditional
+        state.seen.clear()
+        state.frontier.clear()
+        state.queued.clear()
+        state.push(clean_url(base_url))
 
-    sess = requests.Session()
-    sess.headers.update({"User-Agent": user_agent})
-
-    to_visit = [base_url]
-    saved = 0
-
-    while to_visit:
-        url = to_visit.pop(0)
-        url = clean_url(url)
-        if url in SEEN:
-            continue
-        SEEN.add(url)
-
-        if not rp.can_fetch(user_agent, url):
-            print(f"Skip by robots: {url}")
-            continue
-
-        resp = request_get(sess, url)
-        if resp is None:
-            print(f"Failed: {url} (no response)")
-            continue
-        if resp.status_code != 200:
-            print(f"HTTP {resp.status_code}: {url}")
-            continue
-        ct = resp.headers.get("Content-Type", "")
-        if "text/html" not in ct:
-            continue
-
-        fname = safe_filename_from_url(url)
-        fpath = os.path.join(out_dir, fname)
-        with open(fpath, "w", encoding="utf-8") as f:
-            f.write(resp.text)
-        saved += 1
-        print(f"Saved: {fpath}")
+    local = threading.local()
 
-        try:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            links = set()
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                full = urljoin(url, href)
-                full = clean_url(full)
-                if is_internal_html(full, base_netloc):
-                    links.add(full)
-            for link in sorted(links):
-                if link not in SEEN and link not in to_visit:
-                    to_visit.append(link)
-        except Exception as e:
-            print(f"Parse error on {url}: {e}")
-
-        if max_pages and saved >= max_pages:
-            break
-
-        time.sleep(random.uniform(delay_min, delay_max))
-
-    print(f"Done. Saved {saved} HTML files to {out_dir}.")
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.headers.update({"User-Agent": user_agent})
+        return local.session
+
+    def work(url):
+        return fetch_page(url, out_dir, state.validators, session(), throttle, compress)
+
+    saved = unchanged = processed = 0
+    inflight = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="crawl")
+    try:
+        while state.frontier or inflight:
+            while state.frontier and len(inflight) < max(1, workers):
+                if max_pages and processed + len(inflight) >= max_pages:
+                    break
+                url = state.pop()
+                if url in state.seen:
+                    continue
+                state.seen.add(url)
+                if not rp.can_fetch(user_agent, url):
+                    print(f"Skip by robots: {url}")
+                    continue
+                state.inflight.add(url)
+                inflight[pool.submit(work, url)] = url
+            if not inflight:
+                break
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = inflight.pop(future)
+                state.inflight.discard(url)
+                try:
+                    status, soup, new = future.result()
+                except Exception as e:
+                    print(f"Failed: {url} ({e})")
+                    continue
+                if status is None:
+                    print(f"Failed: {url} (no response)")
+                    continue
+                if soup is None:
+                    if status != 200:
+                        print(f"HTTP {status}: {url}")
+                    continue
+                processed += 1
+                if status == 304:
+                    unchanged += 1
+                else:
+                    saved += 1
+                    state.validators[url] = new
+                    print(f"Saved: {os.path.join(out_dir, new['file'])}")
+                if on_page is not None:
+                    on_page(url, soup)
+                try:
+                    links = extract_links(soup, url, base_netloc)
+                    for link in links:
+                        state.push(link)
+                except Exception as e:
+                    print(f"Parse error on {url}: {e}")
+                if processed % save_every == 0:
+                    state.save()
+            if max_pages and processed >= max_pages:
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        state.save()
+
+    print(f"Done. Saved {saved} HTML files to {out_dir} ({unchanged} unchanged).")
+    return {"saved": saved, "unchanged": unchanged, "queued": len(state.frontier)}
 
 def main():
     ap = argparse.ArgumentParser(description="Download internal HTML pages from stallman.org (polite crawler)." )
     ap.add_argument("--base-url", default="https://stallman.org", help="Starting URL (default: https://stallman.org)")
     ap.add_argument("--out-dir", default="data/html", help="Destination directory (default: data/html)")
-    ap.add_argument("--max-pages", type=int, default=0, help="Max pages to save (0 = no limit)")
+    ap.add_argument("--max-pages", type=int, default=0, help="Max pages to fetch (0 = no limit)")
     ap.add_argument("--delay-min", type=float, default=0.5)
     ap.add_argument("--delay-max", type=float, default=1.5)
     ap.add_argument("--user-agent", default=DEF_UA)
+    ap.add_argument("--workers", type=int, default=1, help="Concurrent fetches (politeness is per host)")
+    ap.add_argument("--state", default=None, help=f"Crawl state file (default: <out-dir>/{STATE_FILE})")
+    ap.add_argument("--no-resume", action="store_true", help="Ignore a saved frontier and start over")
+    ap.add_argument("--compress", action="store_true", help="Archive pages gzip-compressed (.html.gz)")
+    ap.add_argument("--ingest", action="store_true",
+                    help="Stream new/changed pages into the index as they are fetched (run from backend/)")
     args = ap.parse_args()
-    crawl(args.base_url, args.out_dir, max_pages=args.max_pages,
-          delay_min=args.delay_min, delay_max=args.delay_max, user_agent=args.user_agent)
+
+    ingestor = on_page = None
+    if args.ingest:
+        sys.path.insert(0, BACKEND_DIR)
+        from persian_linux_rag.app.ingest.loaders import html_document
+        from persian_linux_rag.app.ingest.stream import StreamingIngestor
+
+        ingestor = StreamingIngestor()
+
+        def on_page(url, soup):
+            ingestor.add(html_document(soup, url))
+
+    try:
+        crawl(args.base_url, args.out_dir, max_pages=args.max_pages,
+              delay_min=args.delay_min, delay_max=args.delay_max, user_agent=args.user_agent,
+              workers=args.workers, state_path=args.state, resume=not args.no_resume,
+              compress=args.compress, on_page=on_page)
+    except KeyboardInterrupt:
+        print("Interrupted; crawl state saved, re-run to resume.")
+        sys.exit(130)
+    finally:
+        if ingestor is not None:
+            ingestor.close()
+            print(f"Ingested: {ingestor.stats.to_dict()}")
 
 if __name__ == "__main__":
     main()